@@ -4,13 +4,54 @@ version = '0.0.1a'
 #!/usr/bin/env python3
 
 import partsfactory_constants as constants
+import partsfactory_fixed as fixed
+import partsfactory_md4
+import atexit
+import collections
+import contextlib
+import functools
 import getopt
+import gzip
+import hashlib
+import io
+import itertools
+import json
 import os
 import os.path
 import sys
+import threading
+import time
+import typing
+import urllib.parse
 import logging
-from datetime import date
-from PySide6.QtCore import QCryptographicHash, QUuid, QByteArray
+from datetime import datetime, timezone
+from uuid import uuid4
+
+# The vectorized coordinate engine (a partsfactory_numpy.CoordinateGrid) in
+# use by create_svg(), or None to use the scalar code in s_x(), s_y() and
+# s_r_y(). partsfactory_numpy (and so numpy, which is slow to import) is only
+# imported where vectorize is asked for.
+
+grid = None
+
+# The digits after the decimal point s_x(), s_y() and s_r_y() round the
+# coordinates to (0 to partsfactory_fixed.DIGITS), set by create_svg().
+
+coordinate_precision = fixed.DIGITS
+
+# The logger of the tracing (see enable_tracing()), off unless main() is
+# given --trace.
+
+trace_logger = logging.getLogger("partsfactory.trace")
+
+# Where get_uuid() gets its uuids: "stdlib" (the uuid module and a pure
+# Python MD4) or "qt" (PySide6, which is only imported if it is asked for.)
+# Or "deterministic" for part_uuid() to make them from the spec and
+# uuid_namespace instead (and build_time() to use a fixed time.)
+
+uuid_source = "stdlib"
+
+uuid_namespace = constants.DETERMINISTIC_NAMESPACE
 
 
 def convert(s):
@@ -33,9 +74,92 @@ def convert(s):
 
 def get_uuid():
 
+    # The equivalent of TextUtils::getRandText() in Fritzing app in
+    # src/utils/textutils.cpp, the MD4 hash (as 32 hex digits) of the text of
+    # a new random uuid in the form QUuid.toString() makes it
+    # ("{xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx}"), without needing Qt.
+
+    if uuid_source == "qt":
+
+        return qt_uuid()
+
+    uuid = "{" + str(uuid4()) + "}"
+
+    return partsfactory_md4.hexdigest(uuid.encode("latin-1"))
+
+
+def set_uuid_source(source, namespace=constants.DETERMINISTIC_NAMESPACE):
+
+    # Set where get_uuid() gets its uuids (see uuid_source) and the
+    # namespace of the deterministic ones, also the initializer of the
+    # catalog's process pools so the workers use the same source however
+    # they are started.
+
+    global uuid_source, uuid_namespace
+
+    uuid_source = source
+
+    uuid_namespace = namespace
+
+
+def part_uuid(spec, version):
+
+    # Return the uuid for the moduleid of spec (a tuple as for
+    # prepare_part()) at version, a new get_uuid() or in deterministic mode
+    # the first 32 hex digits of the sha256 of the spec and uuid_namespace,
+    # so the same part always has the same moduleid on any machine.
+
+    if uuid_source != "deterministic":
+
+        return get_uuid()
+
+    text = json.dumps([uuid_namespace, list(spec), version],
+                      separators=(",", ":"))
+
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def build_time():
+
+    # Return the time the parts are made at, for the <date> in the fzp and
+    # the times in a .fzpz. That is now, or in deterministic mode
+    # SOURCE_DATE_EPOCH (the reproducible builds convention) if it is set,
+    # otherwise DETERMINISTIC_EPOCH, in UTC.
+
+    if uuid_source != "deterministic":
+
+        return datetime.now()
+
+    epoch = os.environ.get("SOURCE_DATE_EPOCH",
+                           constants.DETERMINISTIC_EPOCH)
+
+    return datetime.fromtimestamp(int(epoch), timezone.utc)
+
+
+def zip_entry(filename):
+
+    # Return the ZipInfo (deflated and dated build_time()) for filename in a
+    # .fzpz, so a deterministic bundle is the same bytes every time too.
+
+    import zipfile
+
+    info = zipfile.ZipInfo(filename, max(build_time().timetuple()[:6],
+                                         (1980, 1, 1, 0, 0, 0)))
+
+    info.compress_type = zipfile.ZIP_DEFLATED
+
+    info.external_attr = 0o600 << 16
+
+    return info
+
+
+def qt_uuid():
+
     # Copied from TextUtils::getRandText() in Fritzing app in
     # src/utils/textutils.cpp and modified to run under PySide2
 
+    from PySide6.QtCore import QCryptographicHash, QUuid
+
     uuid = QUuid.createUuid().toString()
 
     # since str doesn't have .toLatin1() unlike Qstring, use a function
@@ -54,52 +178,353 @@ def get_uuid():
     return uuid_out
 
 
-def write_file(filename, data):
+def fzp_filename(moduleid, compressed=False):
 
-    # Write data to filename.
+    # The file name of the fzp for moduleid (gzipped if compressed.)
 
-    # At the moment ignore if the file exists and overwrite it.
+    if compressed:
 
-    #    if os.path.exists(fzp_filename) :
+        return "part.{0:s}.fzp.gz".format(moduleid)
 
-    #        print ('Error: File {0:s} already exists.\n'.format(fzp_filename))
+    return "part.{0:s}.fzp".format(moduleid)
 
-    #        exit(1)
 
-    # breakpoint()
+def svg_filename(view, moduleid, compressed=False):
 
-    try:
+    # The file name of the svg for view (breadboard, schematic or pcb) of
+    # moduleid, the name Fritzing uses for it in a .fzpz (or the .svgz if
+    # compressed.)
 
-        file = open(filename, 'w')
+    return "svg.{0:s}.{1:s}.{2:s}".format(view, moduleid,
+                                          "svgz" if compressed else "svg")
 
-    except os.error as e:
 
-        print("\nError: Can not open file\n\n\'{0:s}\'\n\nto write {1:s}"
-              " ({2:d})\n".format(e.filename, e.strerror, e.errno),
-              file=sys.stderr)
-        exit(1)
+def layer_image(view, moduleid, compressed=False):
+
+    # The name the fzp uses in <layers image=...> for the svg for view of
+    # moduleid. Fritzing maps "svg.<view>.<name>" to "<view>/<name>".
+
+    return "{0:s}/{1:s}.{2:s}".format(view, moduleid,
+                                      "svgz" if compressed else "svg")
+
+
+def fzpz_filename(moduleid):
+
+    # The file name of the .fzpz bundle for moduleid.
+
+    return "{0:s}.fzpz".format(moduleid)
+
+
+def shard_dir(moduleid):
+
+    # The directory (relative to the output directory) the files of moduleid
+    # go in with the sharded layout, SHARD_LEVELS levels of two hex digits
+    # such as "ab/cd". They come from a hash of the moduleid rather than the
+    # moduleid itself so the parts spread evenly whatever they are called.
+
+    digest = hashlib.sha1(moduleid.encode("utf-8")).hexdigest()
+
+    return "/".join(digest[2 * level:2 * level + 2]
+                    for level in range(constants.SHARD_LEVELS))
+
+
+def encode_lines(filename, data, compresslevel=None):
+
+    # Return data (a list or generator of lines) as the bytes of the file
+    # filename, gzipped if compresslevel (0 to 9) isn't None.
+
+    data = ("\n".join(data) + "\n").encode("utf-8")
+
+    if compresslevel is None:
+
+        return data
+
+    return gzip_bytes(filename, data, compresslevel)
+
+
+def gzip_bytes(filename, data, compresslevel):
+
+    # Return data (bytes) gzipped, as it is in every .svgz and .fzp.gz made
+    # from bytes (a part rendered on its own or a color variant spliced from
+    # another) so the same part always gives the same bytes. There is no
+    # time stamp, and nothing flushes the compressor part way (a sync flush
+    # adds bytes to the stream) so the bytes only depend on the data.
+
+    buffer = io.BytesIO()
+
+    with gzip.GzipFile(filename, "wb", compresslevel, buffer,
+                       mtime=0) as file:
+
+        file.write(data)
+
+    return buffer.getvalue()
+
+
+def write_file(filename, data, output_dir=None, fsync=False,
+               compresslevel=None, dirty=None):
+
+    # Write data (a list or one of the generate_*() generators) to filename
+    # in output_dir with atomic_file() (see write_bytes()) a line at a time,
+    # gzipped if compresslevel (0 to 9) isn't None, and return the path
+    # written. The file is the same as write_bytes() of encode_lines() but
+    # the whole of it is never in memory at once.
+
+    with atomic_file(filename, output_dir, fsync, dirty) as file:
+
+        write_lines(file, filename, data, compresslevel)
+
+    return os.path.join(output_dir or ".", filename)
+
+
+def write_lines(file, filename, data, compresslevel=None):
+
+    # Write data (lines) to file (opened to write binary) as encode_lines()
+    # would make it, a line at a time.
+
+    if compresslevel is not None:
+
+        write_gzip(file, filename, data, compresslevel)
+
+        return
 
     for line in data:
 
         # add newline to pretty print the xml.
 
-        file.write(line + "\n")
+        file.write((line + "\n").encode("utf-8"))
+
+
+def write_gzip(file, filename, data, compresslevel):
+
+    # Gzip the lines in data a line at a time in to file. How the data is
+    # split between writes doesn't change what the compressor makes (only
+    # a flush would) so this is the same bytes as gzip_bytes().
+
+    with gzip.GzipFile(filename, "wb", compresslevel, file,
+                       mtime=0) as compressed:
+
+        for line in data:
+
+            # add newline to pretty print the xml.
+
+            compressed.write((line + "\n").encode("utf-8"))
+
+
+class DigestFile:
+
+    # A file like object that passes what is written to it on to file while
+    # keeping its sha256 and size, so the manifest's (file name, sha256,
+    # size) of a file written a line at a time come from the lines as they
+    # go past rather than from the finished file.
+
+    def __init__(self, file):
+
+        self.file = file
+
+        self.sha256 = hashlib.sha256()
+
+        self.size = 0
+
+    def write(self, data):
+
+        self.sha256.update(data)
+
+        self.size += len(data)
+
+        return self.file.write(data)
+
+    def flush(self):
+
+        self.file.flush()
+
+    def hexdigest(self):
+
+        return self.sha256.hexdigest()
+
+
+def write_bytes(filename, data, output_dir=None, fsync=False, dirty=None):
+
+    # Write data (bytes) to filename in output_dir (or the current directory
+    # if output_dir is None) with atomic_file() and return the path written.
+
+    with atomic_file(filename, output_dir, fsync, dirty) as file:
+
+        file.write(data)
+
+    return os.path.join(output_dir or ".", filename)
+
+
+@contextlib.contextmanager
+def atomic_file(filename, output_dir=None, fsync=False, dirty=None):
+
+    # Open filename in output_dir (or the current directory if output_dir is
+    # None) to write (binary) to.
+
+    # The data is written to a temporary file in the same directory which is
+    # renamed over filename once it is all written, so anything else (such
+    # as another job) looking at filename sees either the old file or the
+    # whole new one, never a half written one. If fsync is True the file
+    # (and then the directory) is also flushed to disk before returning so
+    # the file survives a crash as well. If dirty (a set) isn't None the
+    # directory is added to it for fsync_dirs() to flush later instead, so a
+    # batch of files costs one directory flush rather than one each.
+
+    # Errors are raised (as OSError) rather than exiting so the caller can
+    # decide what to do about them.
+
+    if output_dir is None:
+
+        output_dir = "."
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    path = os.path.join(output_dir, filename)
+
+    # Hidden and unique so that a concurrent write to the same file or a
+    # directory listing doesn't pick it up.
+
+    temp_path = os.path.join(output_dir, ".{0:s}.{1:d}.{2:s}.tmp".format(
+                                 filename, os.getpid(), os.urandom(4).hex()))
 
     try:
 
-        file.close()
+        with open(temp_path, 'xb') as file:
 
-    except os.error as e:
+            yield file
 
-        print("\nError: Can not open file\n\n\'{0:s}\'\n\nto write {1:s}"
-              " ({2:d})\n".format(e.filename, e.strerror, e.errno),
-              file=sys.stderr)
-        exit(1)
+            if fsync:
+
+                file.flush()
+
+                os.fsync(file.fileno())
 
+        os.replace(temp_path, path)
 
-def create_pin_xml(fzp, connector, pcb_type):
+    except BaseException:
 
-    # Create the xml for a single pin in fzp then return it.
+        # Don't leave the temporary file behind.
+
+        try:
+
+            os.remove(temp_path)
+
+        except OSError:
+
+            pass
+
+        raise
+
+    if fsync:
+
+        if dirty is None:
+
+            fsync_dir(output_dir)
+
+        else:
+
+            dirty.add(output_dir)
+
+
+def fsync_dir(directory):
+
+    # Flush directory (and so the renames in to it) to disk. Not all
+    # platforms (i.e. Windows) can open a directory so ignore those.
+
+    try:
+
+        fd = os.open(directory, os.O_RDONLY)
+
+    except OSError:
+
+        return
+
+    try:
+
+        os.fsync(fd)
+
+    finally:
+
+        os.close(fd)
+
+
+def fsync_dirs(dirty):
+
+    # fsync_dir() the directories in dirty (from atomic_file()), the deepest
+    # first so a new directory is on disk before its parent, and empty it.
+
+    for directory in sorted(dirty, reverse=True):
+
+        fsync_dir(directory)
+
+    dirty.clear()
+
+
+def write_stream(stream, data):
+
+    # Write data (a list or one of the generate_*() generators) to an
+    # already open file like object such as a file or socket.makefile('w'),
+    # a line at a time so the whole file is never in memory at once.
+
+    for line in data:
+
+        # add newline to pretty print the xml.
+
+        stream.write(line + "\n")
+
+
+def compact_lines(data):
+
+    # Generate the lines of the xml in data (a list or generator of lines
+    # as create_svg() and friends make them) with the indentation removed
+    # and each element on a single line, by joining the attribute lines
+    # (anything not starting with "<") to the element they belong to.
+
+    element = None
+
+    for line in data:
+
+        line = line.strip()
+
+        if element is None:
+
+            element = line
+
+        elif line.startswith("<"):
+
+            yield element
+
+            element = line
+
+        elif line.startswith("/>") or line.startswith(">"):
+
+            element += line
+
+        else:
+
+            element += " " + line
+
+    if element is not None:
+
+        yield element
+
+
+def check_precision(precision):
+
+    # Check precision is a number of digits after the decimal point we can
+    # round the coordinates to, raise ValueError if it isn't.
+
+    if isinstance(precision, bool) or precision not in range(fixed.DIGITS + 1):
+
+        raise ValueError("precision must be 0 to {0:d} not {1!r}".format(
+                         fixed.DIGITS, precision))
+
+
+def create_pin_xml(fzp, connector, pcb_type, compact=False):
+
+    # Create the xml for a single pin in fzp then return it. If compact is
+    # True leave out the indentation.
+
+    start = len(fzp)
 
     fzp.append("      <connector id=\"connector{0:d}\" type=\"male\""
                " name=\"Pin {1:d}\">".format(connector, connector + 1))
@@ -151,15 +576,24 @@ def create_pin_xml(fzp, connector, pcb_type):
 
     fzp.append("      </connector>")
 
+    if compact:
+
+        fzp[start:] = [line.strip() for line in fzp[start:]]
+
     return (fzp)
 
 
-def create_fzp(part_type, rows, columns, pitch, pcb_type, pin_order, pad_type,
-               color, version):
+def part_names(part_type, rows, columns, pitch, pcb_type, pin_order, pad_type,
+               color, version, uuid=None):
 
-    # Create the fzpxml file for the part.
+    # Create the moduleid, title and the other names for the part in a dict
+    # (or return an error string if the part isn't implemented yet.) The
+    # moduleid has the part_uuid() in it unless a uuid is given.
 
-    uuid = get_uuid()
+    if uuid is None:
+
+        uuid = part_uuid((part_type, rows, columns, pitch, pcb_type, pin_order,
+                          pad_type, color), version)
 
     # Create the fzp file name from the parameters
 
@@ -261,103 +695,135 @@ def create_fzp(part_type, rows, columns, pitch, pcb_type, pin_order, pad_type,
 
         return "2 NotImplmented yet"
 
-    fzp = []
-    fzp.append("<?xml version='1.0' encoding='UTF-8'?>")
-    fzp.append(
+    return {"moduleid": moduleid, "title": title, "label": label,
+            "family": family, "form": form, "package": package,
+            "pin_order": pin_order}
+
+
+def generate_fzp(names, part_type, rows, columns, pitch, pcb_type, pad_type,
+                 color, version, compact=False, compressed=False,
+                 precision=fixed.DIGITS):
+
+    # Generate the fzp xml for the part named by part_names() a line at a
+    # time in document order (see write_stream().) If compact is True leave
+    # out the indentation. If compressed is True the layer images are the
+    # .svgz files. At a reduced precision the Pitch property loses its
+    # trailing zeros as the coordinates do, but isn't rounded (it is the
+    # part's pitch, not a coordinate.)
+
+    if compact:
+
+        yield from compact_lines(generate_fzp(names, part_type, rows, columns,
+                                              pitch, pcb_type, pad_type,
+                                              color, version,
+                                              compressed=compressed,
+                                              precision=precision))
+
+        return
+
+    moduleid = names["moduleid"]
+
+    title = names["title"]
+
+    label = names["label"]
+
+    family = names["family"]
+
+    form = names["form"]
+
+    package = names["package"]
+
+    pin_order = names["pin_order"]
+
+    yield "<?xml version='1.0' encoding='UTF-8'?>"
+    yield (
         "<module  moduleId=\"{0:s}\" fritzingVersion=\"1.0.3\">".format(
                                                                  moduleid))
-    fzp.append("  <version>1</version>")
-    fzp.append("  <author>Python Part-o-matic</author>")
-    fzp.append("  <title>{0:s}</title>".format(title))
-    fzp.append("  <label>{0:s}</label>".format(label))
+    yield "  <version>1</version>"
+    yield "  <author>Python Part-o-matic</author>"
+    yield "  <title>{0:s}</title>".format(title)
+    yield "  <label>{0:s}</label>".format(label)
 
-    now = date.today()
+    now = build_time()
     today = now.strftime("%a %b %d %Y")
 
-    fzp.append("  <date>{0:s}</date>".format(today))
-    fzp.append("  <tags/>")
-    fzp.append("  <properties>")
-    fzp.append(
+    yield "  <date>{0:s}</date>".format(today)
+    yield "  <tags/>"
+    yield "  <properties>"
+    yield (
         "  <property name=\"family\">{0:s}</property>".format(family))
-    fzp.append(
+    yield (
         "    <property name=\"PartType\">{0:s}</property>".format(part_type))
-    fzp.append(
+    yield (
         "    <property name=\"Rows\">{0:d}</property>".format(rows))
-    fzp.append(
+    yield (
         "    <property name=\"Columns\">{0:d}</property>".format(columns))
-    fzp.append(
-        "    <property name=\"Pitch\">{0:f}</property>".format(pitch))
-    fzp.append(
+    if precision == fixed.DIGITS:
+
+        pitch_text = "{0:f}".format(pitch)
+
+    else:
+
+        pitch_text = fixed.value_text(pitch)
+
+    yield (
+        "    <property name=\"Pitch\">{0:s}</property>".format(pitch_text))
+    yield (
         "    <property name=\"Pcbtype\">{0:s}</property>".format(pcb_type))
-    fzp.append(
+    yield (
         "    <property name=\"Pinorder\">{0:s}</property>".format(pin_order))
-    fzp.append(
+    yield (
         "    <property name=\"Padtype\">{0:s}</property>".format(pad_type))
-    fzp.append(
+    yield (
         "    <property name=\"color\">{0:s}</property>".format(color))
-    fzp.append(
+    yield (
         "    <property name=\"Form\">{0:s}</property>".format(form))
-    fzp.append(
+    yield (
         "    <property name=\"version\">{0:d}</property>".format(version))
-    fzp.append(
+    yield (
         "    <property name=\"package\">{0:s}</property>".format(package))
-    fzp.append("    <property name=\"mn\"></property>")
-    fzp.append("    <property name=\"layer\"></property>")
-    fzp.append("    <property name=\"part number\"></property>")
-    fzp.append("    <property name=\"mpn\"></property>")
-    fzp.append("    <property name=\"variant\">variant 1</property>")
-    fzp.append("  </properties>")
-    fzp.append("  <description>{0:s}</description>".format(title))
-    fzp.append("  <views>")
-    fzp.append("    <iconView>")
-#    fzp.append(
-#        "      <layers image=\"breadboard/{0:s}.breadboard.svg\">".format(
-#                                                                    moduleid))
-#
-# For testing use a fixed file test_breadboard.svg
-    fzp.append("      <layers image=\"breadboard/test_breadboard.svg\">")
-    fzp.append("        <layer layerId=\"icon\"/>")
-    fzp.append("      </layers>")
-    fzp.append("    </iconView>")
-    fzp.append("    <breadboardView>")
-#    fzp.append(
-#        "      <layers image=\"breadboard/{0:s}.breadboard.svg\">".format(
-#                                                                    moduleid))
-#
-# For testing use a fixed file test_breadboard.svg
-    fzp.append("      <layers image=\"breadboard/test_breadboard.svg\">")
-    fzp.append("        <layer layerId=\"breadboard\"/>")
-    fzp.append("      </layers>")
-    fzp.append("    </breadboardView>")
-    fzp.append("    <schematicView>")
-#    fzp.append(
-#        "      <layers image=\"schematic/{0:s}.schematic.svg\">".format(
-#                                                                    moduleid))
-#
-# For testing use a fixed file test_schematic.svg
-    fzp.append("      <layers image=\"schematic/test_schematic.svg\">")
-    fzp.append("        <layer layerId=\"schematic\"/>")
-    fzp.append("      </layers>")
-    fzp.append("    </schematicView>")
-    fzp.append("    <pcbView>")
-#    fzp.append("      <layers image=\"pcb/{0:s}.pcb.svg\">".format(
-#                                                                moduleid))
-#
-# For testing use a fixed file test_pcb.svg
-    fzp.append("      <layers image=\"pcb/test_pcb.svg\">")
-    fzp.append("        <layer layerId=\"silkscreen\"/>")
+    yield "    <property name=\"mn\"></property>"
+    yield "    <property name=\"layer\"></property>"
+    yield "    <property name=\"part number\"></property>"
+    yield "    <property name=\"mpn\"></property>"
+    yield "    <property name=\"variant\">variant 1</property>"
+    yield "  </properties>"
+    yield "  <description>{0:s}</description>".format(title)
+    yield "  <views>"
+    yield "    <iconView>"
+    yield "      <layers image=\"{0:s}\">".format(
+        layer_image(constants.BREADBOARD, moduleid, compressed))
+    yield "        <layer layerId=\"icon\"/>"
+    yield "      </layers>"
+    yield "    </iconView>"
+    yield "    <breadboardView>"
+    yield "      <layers image=\"{0:s}\">".format(
+        layer_image(constants.BREADBOARD, moduleid, compressed))
+    yield "        <layer layerId=\"breadboard\"/>"
+    yield "      </layers>"
+    yield "    </breadboardView>"
+    yield "    <schematicView>"
+    yield "      <layers image=\"{0:s}\">".format(
+        layer_image(constants.SCHEMATIC, moduleid, compressed))
+    yield "        <layer layerId=\"schematic\"/>"
+    yield "      </layers>"
+    yield "    </schematicView>"
+    yield "    <pcbView>"
+    yield "      <layers image=\"{0:s}\">".format(
+        layer_image(constants.PCB, moduleid, compressed))
+    yield "        <layer layerId=\"silkscreen\"/>"
 
     if package == "THT":
 
         # No copper0 layer for SMD parts.
 
-        fzp.append("        <layer layerId=\"copper0\"/>")
+        yield "        <layer layerId=\"copper0\"/>"
 
-    fzp.append("        <layer layerId=\"copper1\"/>")
-    fzp.append("       </layers>")
-    fzp.append("     </pcbView>")
-    fzp.append("  </views>")
-    fzp.append("  <connectors>")
+    yield "        <layer layerId=\"copper1\"/>"
+    yield "       </layers>"
+    yield "     </pcbView>"
+    yield "  </views>"
+    yield "  <connectors>"
 
     connector = 0
 
@@ -365,76 +831,83 @@ def create_fzp(part_type, rows, columns, pitch, pcb_type, pin_order, pad_type,
 
         for row in range(0, rows):
 
-            fzp = create_pin_xml(fzp, connector, pcb_type)
+            yield from create_pin_xml([], connector, pcb_type)
             connector += 1
 
-    fzp.append("  </connectors>")
+    yield "  </connectors>"
 
-    fzp.append("</module>")
+    yield "</module>"
 
-    fzp_filename = 'part.test_fzp.fzp'
 
-    # breakpoint()
+def create_fzp(part_type, rows, columns, pitch, pcb_type, pin_order, pad_type,
+               color, version, output_dir=None, fsync=False, compact=False,
+               compresslevel=None):
 
-    write_file(fzp_filename, fzp)
+    # Create the fzpxml file for the part in output_dir (see write_file())
+    # and return its moduleid. If compact is True leave out the indentation.
+    # If compresslevel isn't None write a .fzp.gz that refers to the .svgz
+    # files for the views.
 
-    return moduleid
+    names = part_names(part_type, rows, columns, pitch, pcb_type, pin_order,
+                       pad_type, color, version)
 
+    if isinstance(names, str):
 
-def s_x(parm, row, pitch, stroke_width=0):
+        # Not implemented yet.
 
-    # scale and move (if needed) this pin in x. Round the result to
-    # 2 digit after the decimal to avoid 35.40000001. Drawing units
-    # are 1/1000th of an inch and that is fine for our purposes.
+        return names
 
-# *** remove me later ***
-    print("s_x parm {0:f} row {1:d} pitch {2:f}".format(parm, row, pitch))
+    compressed = compresslevel is not None
 
-    # otherwise do both move and scale. First calculate the offset of
-    # the pitch converted to 1/1000 of an inch times the row - 1 (because
-    # the row needs to start at 0 not 1 which it does now.)
+    fzp = generate_fzp(names, part_type, rows, columns, pitch, pcb_type,
+                       pad_type, color, version, compact, compressed)
 
-#    offset = float(pitch) * float(constants.PITCH_TO_THOU) * float(row - 1)
-    offset = pitch * constants.PITCH_IN_THOU * (row - 1)
+    write_file(fzp_filename(names["moduleid"], compressed), fzp, output_dir,
+               fsync, compresslevel)
 
-# *** remove me later ***
-    print("s_x offset {0:f}".format(offset))
+    return names["moduleid"]
 
-    # Than add the parameter multiplied by the pitch in 1/1000 of an inch
-    # and add it to the offset to create the parameter to return. 
 
-    scaled_param = round((parm * pitch) + offset + stroke_width, 4)
+def s_x(parm, row, pitch, stroke_width=0):
 
-# *** remove me later ***
-    print("s_x row {0:d}: return {1:s}".format(row, str(scaled_param)))
+    # scale and move (if needed) this pin in x. The calculation is done in
+    # integer units of 1/10000 of a thou (see partsfactory_fixed) which
+    # avoids 35.40000001 and gives the same answer on every platform. Drawing
+    # units are 1/1000th of an inch and that is fine for our purposes.
 
-    return str(scaled_param)
+    if grid is not None:
 
+        return grid.s_x(parm, row, pitch, stroke_width)
 
-def s_y(parm, column, pitch):
+    # otherwise do both move and scale. The offset is the pitch converted to
+    # 1/1000 of an inch times the row - 1 (because the row needs to start at
+    # 0 not 1 which it does now.) Than add the parameter multiplied by the
+    # pitch in 1/1000 of an inch and add it to the offset to create the
+    # parameter to return.
 
-    # scale and move (if needed) this pin in y. Round the result to
-    # 2 digits after the decimal to avoid 35.40000001. Drawing units
-    # are 1/1000th of an inch and that is fine for our purposes.
+    scaled_param = fixed.text(parm, pitch, row - 1, stroke_width,
+                              coordinate_precision)
 
-# *** remove me later ***
-    print("s_y parm {0:f} column {1:d} pitch {2:f}".format(parm, column, pitch))
+    return scaled_param
 
-    # otherwise do both move and scale. First calculate the offset of
-    # the pitch converted to 1/1000 of an inch times the row. Need to 
-    # subract 1 from the column to start at position 0 rather than 1.
 
-    offset = pitch * constants.PITCH_IN_THOU * (column - 1)
+def s_y(parm, column, pitch):
 
-    # Than add the parameter multiplied by the pitch in 1/1000 of an inch
-    # and add it to the offset to create the parameter to return. 
+    # scale and move (if needed) this pin in y. The calculation is done in
+    # integer units of 1/10000 of a thou the same as s_x().
 
-    scaled_param = round((parm * pitch) + offset, 4)
+    if grid is not None:
 
-# *** remove me later ***
-    print("s_y column {0:d}: return {1:s}".format(column, str(scaled_param)))
+        return grid.s_y(parm, column, pitch)
 
-    return str(scaled_param)
+    # otherwise do both move and scale. The offset is the pitch converted to
+    # 1/1000 of an inch times the column. Need to subract 1 from the column
+    # to start at position 0 rather than 1.
+
+    scaled_param = fixed.text(parm, pitch, column - 1, 0,
+                              coordinate_precision)
+
+    return scaled_param
 
 
 def s_r_y(parm, columns, column, pitch):
@@ -449,75 +922,147 @@ def s_r_y(parm, columns, column, pitch):
     # This will change the sequence 1, 2, 3, 4 in column to the sequence
     # 4, 3, 2, 1 which will place the item where we want it in the svg.
 
+    if grid is not None:
+
+        return grid.s_r_y(parm, columns, column, pitch)
+
     local_column = columns - column
 
-    # otherwise do both move and scale. First calculate the offset of the
-    # pitch converted to 1/1000 of an inch times the column.
+    # otherwise do both move and scale. The offset is the pitch converted to
+    # 1/1000 of an inch times the column, to which the parameter multiplied
+    # by the pitch is added (so the parameter only gets scaled and added
+    # once rather than for every column!).
 
-    offset = pitch * constants.PITCH_IN_THOU * local_column
+    scaled_param = fixed.text(parm, pitch, local_column, 0,
+                              coordinate_precision)
 
-    # Than add the parameter multiplied by the pitch in 1/1000 of an inch 
-    # and add it to the offset to create the parameter to return (so the 
-    # parameter only gets scaled and added once rather than for every
-    # column!). 
+    return scaled_param
 
-    scaled_param = round((parm * pitch) + offset, 4)
 
-# *** remove me later ***
-    print("s_r_y column {0:d}: return {1:s}".format(local_column, str(scaled_param)))
+# Most of the coordinates in a pin are only scaled by the pitch (row or
+# column of SCALE_ONLY) and are therefore the same for every pin in the part.
+# The functions ending in _template below create those (as the text to be
+# spliced in to the svg) and pin_template() caches them by (emitter, pitch,
+# precision) so they are only calculated once, leaving only the absolute anchors
+# (M, cx, cy, x and y) to be calculated for each pin.
 
-    return str(scaled_param)
+template_cache = {}
 
+template_stats = {"hits": 0, "misses": 0}
 
-def male_outline(svg, connector, columns, row, column, pitch, color):
 
-    # Generate an outline path and label it with the connector number.
-    # Adjust the staring position in x and y and the scale to position
-    # and size it correctly. Assumes row is horizontal and column is
-    # vertical.
+def pin_template(create, pitch):
 
-    svg.append("    <path")
+    # Return the template create() makes for this pitch, only calling
+    # create() the first time it is asked for. The emitter name is the
+    # name of the template function without the "_template".
 
-    # Create a label ending in the connector number to be unique.
+    key = (create.__name__[:-len("_template")], pitch, coordinate_precision)
 
-    svg.append("      id=\"outline" + str(connector) + "\"")
+    template = template_cache.get(key)
 
-    # Then create the path, moving and scaling the coordinates as
-    # we go. The first y needs to use s_r_y() to correctly align the
-    # absolute start value, after that the moves are relative and don't need
-    # that translation.
+    if template is None:
 
-#*** remove me later ***
-#    print("Start outline row {0:d}".format(row))
+        template_stats["misses"] += 1
 
-    svg.append("      d=\""
-               + "M " + s_x(0, row, pitch) + ","
-               + s_r_y(3.83, columns, column, pitch)
-               + " l " + s_x(3.83, constants.SCALE_ONLY, pitch)
-               + "," + s_y(-3.83, constants.SCALE_ONLY, pitch)
-               + " h " + s_x(12.1, constants.SCALE_ONLY, pitch) + " l "
-               + s_x(3.83, constants.SCALE_ONLY, pitch)
-               + "," + s_y(3.83, constants.SCALE_ONLY, pitch) + " v " 
-               + s_x(0, constants.SCALE_ONLY, pitch) + "," 
-               + s_y(12.1, constants.SCALE_ONLY, pitch) + " l " 
-               + s_x(-3.83, constants.SCALE_ONLY, pitch) + "," 
-               + s_y(3.83, constants.SCALE_ONLY, pitch) + " h " 
-               + s_y(-12.1, constants.SCALE_ONLY, pitch) + " l " 
-               + s_x(-3.83, constants.SCALE_ONLY, pitch) + "," 
-               + s_y(-3.83, constants.SCALE_ONLY, pitch) + " z\"")
+        template = create(pitch)
 
-    # Set the approriate color for the pin.
+        template_cache[key] = template
 
-    svg.append("      fill=\"" + color + "\"")
+    else:
 
-    svg.append("      stroke-width=\"0\"")
+        template_stats["hits"] += 1
 
-    svg.append("    />")
+    return template
 
-    return svg
 
+def template_cache_stats():
 
-def male_pinleft(svg, connector, columns, row, column, pitch):
+    # Return the hit and miss counts plus the number of cached templates.
+
+    return {"hits": template_stats["hits"],
+            "misses": template_stats["misses"],
+            "templates": len(template_cache)}
+
+
+def clear_template_cache():
+
+    # Empty the template cache and reset its statistics.
+
+    template_cache.clear()
+
+    template_stats["hits"] = 0
+
+    template_stats["misses"] = 0
+
+
+def male_outline_template(pitch):
+
+    # The relative part of the outline path after the starting M.
+
+    return (" l " + s_x(3.83, constants.SCALE_ONLY, pitch)
+            + "," + s_y(-3.83, constants.SCALE_ONLY, pitch)
+            + " h " + s_x(12.1, constants.SCALE_ONLY, pitch) + " l "
+            + s_x(3.83, constants.SCALE_ONLY, pitch)
+            + "," + s_y(3.83, constants.SCALE_ONLY, pitch) + " v "
+            + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(12.1, constants.SCALE_ONLY, pitch) + " l "
+            + s_x(-3.83, constants.SCALE_ONLY, pitch) + ","
+            + s_y(3.83, constants.SCALE_ONLY, pitch) + " h "
+            + s_y(-12.1, constants.SCALE_ONLY, pitch) + " l "
+            + s_x(-3.83, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-3.83, constants.SCALE_ONLY, pitch) + " z\"")
+
+
+def male_outline(svg, connector, columns, row, column, pitch, color):
+
+    # Generate an outline path and label it with the connector number.
+    # Adjust the staring position in x and y and the scale to position
+    # and size it correctly. Assumes row is horizontal and column is
+    # vertical.
+
+    svg.append("    <path")
+
+    # Create a label ending in the connector number to be unique.
+
+    svg.append("      id=\"outline" + str(connector) + "\"")
+
+    # Then create the path, moving and scaling the coordinates as
+    # we go. The first y needs to use s_r_y() to correctly align the
+    # absolute start value, after that the moves are relative and don't need
+    # that translation (and come from the template cache.)
+
+#*** remove me later ***
+#    print("Start outline row {0:d}".format(row))
+
+    svg.append("      d=\""
+               + "M " + s_x(0, row, pitch) + ","
+               + s_r_y(3.83, columns, column, pitch)
+               + pin_template(male_outline_template, pitch))
+
+    # Set the approriate color for the pin.
+
+    svg.append("      fill=\"" + color + "\"")
+
+    svg.append("      stroke-width=\"0\"")
+
+    svg.append("    />")
+
+    return svg
+
+
+def male_pinleft_template(pitch):
+
+    # The relative part of the pinleft path after the starting M.
+
+    return (" l " + s_x(2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(2, constants.SCALE_ONLY, pitch)
+            + " v " + s_x(4, constants.SCALE_ONLY, pitch)
+            + " l " + s_x(-2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(2, constants.SCALE_ONLY, pitch) + " z\"")
+
+
+def male_pinleft(svg, connector, columns, row, column, pitch):
 
     # Generate a pinleft path and label it with the connector number.
     # Adjust the staring position in x and y and the scale to position
@@ -540,11 +1085,7 @@ def male_pinleft(svg, connector, columns, row, column, pitch):
     svg.append("      d=\""
                + "M " + s_x(6, row, pitch) + ","
                + s_r_y(6, columns, column, pitch)
-               + " l " + s_x(2, constants.SCALE_ONLY, pitch) + ","
-               + s_y(2, constants.SCALE_ONLY, pitch)
-               + " v " + s_x(4, constants.SCALE_ONLY, pitch)
-               + " l " + s_x(-2, constants.SCALE_ONLY, pitch) + ","
-               + s_y(2, constants.SCALE_ONLY, pitch) + " z\"")
+               + pin_template(male_pinleft_template, pitch))
 
     # Set the approriate color for the pin.
 
@@ -557,6 +1098,16 @@ def male_pinleft(svg, connector, columns, row, column, pitch):
     return svg
 
 
+def male_pintop_template(pitch):
+
+    # The relative part of the pintop path after the starting M.
+
+    return (" h " + s_x(8, constants.SCALE_ONLY, pitch)
+            + " l " + s_x(-2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(2, constants.SCALE_ONLY, pitch) + " h "
+            + s_x(-4, constants.SCALE_ONLY, pitch) + " z\"")
+
+
 def male_pintop(svg, connector, columns, row, column, pitch):
 
     # Generate a pintop path and label it with the connector number.
@@ -578,12 +1129,9 @@ def male_pintop(svg, connector, columns, row, column, pitch):
     # relative and doesn't need that translation.
 
     svg.append("      d=\""
-               + "M " + s_x(6, row, pitch) + "," 
+               + "M " + s_x(6, row, pitch) + ","
                + s_r_y(6, columns, column, pitch)
-               + " h " + s_x(8, constants.SCALE_ONLY, pitch)
-               + " l " + s_x(-2, constants.SCALE_ONLY, pitch) + "," 
-               + s_y(2, constants.SCALE_ONLY, pitch) + " h " 
-               + s_x(-4, constants.SCALE_ONLY, pitch) + " z\"")
+               + pin_template(male_pintop_template, pitch))
 
     # Set the approriate color for the pin.
 
@@ -596,6 +1144,17 @@ def male_pintop(svg, connector, columns, row, column, pitch):
     return svg
 
 
+def male_pinright_template(pitch):
+
+    # The relative part of the pinright path after the starting M.
+
+    return (" l " + s_x(2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-2, constants.SCALE_ONLY, pitch)
+            + " v " + s_x(8, constants.SCALE_ONLY, pitch)
+            + " l " + s_x(-2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-2, constants.SCALE_ONLY, pitch) + " z\"")
+
+
 def male_pinright(svg, connector, columns, row, column, pitch):
 
     # Generate a pinright path and label it with the connector number.
@@ -619,11 +1178,7 @@ def male_pinright(svg, connector, columns, row, column, pitch):
     svg.append("      d=\""
                + "M " + s_x(12, row, pitch) + ","
                + s_r_y(8, columns, column, pitch)
-               + " l " + s_x(2, constants.SCALE_ONLY, pitch) + ","
-               + s_y(-2, constants.SCALE_ONLY, pitch)
-               + " v " + s_x(8, constants.SCALE_ONLY, pitch)
-               + " l " + s_x(-2, constants.SCALE_ONLY, pitch) + "," 
-               + s_y(-2, constants.SCALE_ONLY, pitch) + " z\"")
+               + pin_template(male_pinright_template, pitch))
 
     # Set the approriate color for the pin.
 
@@ -636,6 +1191,17 @@ def male_pinright(svg, connector, columns, row, column, pitch):
     return svg
 
 
+def male_pinbottom_template(pitch):
+
+    # The relative part of the pinbottom path after the starting M.
+
+    return (" l " + s_x(2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-2, constants.SCALE_ONLY, pitch)
+            + " h " + s_x(4, constants.SCALE_ONLY, pitch)
+            + " l " + s_x(2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(2,  constants.SCALE_ONLY, pitch) + " z\"")
+
+
 def male_pinbottom(svg, connector, columns, row, column, pitch):
 
     # Generate a pinbottom path and label it with the connector number.
@@ -659,11 +1225,7 @@ def male_pinbottom(svg, connector, columns, row, column, pitch):
     svg.append("      d=\""
                + "M " + s_x(6, row, pitch)
                + "," + s_r_y(14, columns, column, pitch)
-               + " l " + s_x(2, constants.SCALE_ONLY, pitch) + ","
-               + s_y(-2, constants.SCALE_ONLY, pitch)
-               + " h " + s_x(4, constants.SCALE_ONLY, pitch)
-               + " l " + s_x(2, constants.SCALE_ONLY, pitch) + "," 
-               + s_y(2,  constants.SCALE_ONLY, pitch) + " z\"")
+               + pin_template(male_pinbottom_template, pitch))
 
     # Set the approriate color for the pin.
 
@@ -676,6 +1238,14 @@ def male_pinbottom(svg, connector, columns, row, column, pitch):
     return svg
 
 
+def male_pinconnector_template(pitch):
+
+    # The width and height of the pinconnector rect.
+
+    return (s_x(4, constants.SCALE_ONLY, pitch),
+            s_x(4, constants.SCALE_ONLY, pitch))
+
+
 def male_pinconnector(connectors, connector, columns, row, column, pitch):
 
     # Generate a pinconnector rect and label it with the connector number.
@@ -691,6 +1261,7 @@ def male_pinconnector(connectors, connector, columns, row, column, pitch):
 #*** remove me later ***
 #   print("Start pinconnector row {0:d}".format(row))
 
+    width, height = pin_template(male_pinconnector_template, pitch)
 
     connectors.append("    <rect")
 
@@ -701,16 +1272,21 @@ def male_pinconnector(connectors, connector, columns, row, column, pitch):
     connectors.append("      fill=\"#8c8663\"")
     connectors.append("      stroke-width=\"0\"")
     connectors.append("      x=\"" + s_x(8, row, pitch) + "\"")
-    connectors.append("      width=\"" + s_x(4, constants.SCALE_ONLY, pitch)
-                                       + "\"")
+    connectors.append("      width=\"" + width + "\"")
     connectors.append("      y=\"" + s_r_y(8, columns, column, pitch) + "\"")
-    connectors.append("      height=\"" + s_x(4, constants.SCALE_ONLY, pitch)
-                                        + "\"")
+    connectors.append("      height=\"" + height + "\"")
     connectors.append("    />")
 
     return connectors
 
 
+def male_pin_no_template(pitch):
+
+    # The font-size of the schematic pin number.
+
+    return s_x(6.9, constants.SCALE_ONLY, pitch)
+
+
 def male_pin_no(svg, connector, row, column, pitch):
 
     # Create the pin number text for a schematic pin.
@@ -721,14 +1297,21 @@ def male_pin_no(svg, connector, row, column, pitch):
     svg.append("      stroke-width=\"0\"")
     svg.append("      text-anchor=\"middle\"")
     svg.append("      font-family=\"'Droid Sans'\"")
-    svg.append("      font-size=\"{0:s}\"".format(s_x(6.9,
-                                           constants.SCALE_ONLY, pitch)))
+    svg.append("      font-size=\"{0:s}\"".format(
+                                pin_template(male_pin_no_template, pitch)))
     svg.append("      x=\"" + s_x(15.4, column, pitch) + "\"")
     svg.append("      y=\"" + s_y(6.9, row, pitch) + "\"" +
                                 ">{0:s}</text>".format(str(connector)))
     return svg
 
 
+def male_line_template(pitch):
+
+    # The stroke-width of the schematic pin and arrow lines.
+
+    return s_x(1.9685, constants.SCALE_ONLY, pitch)
+
+
 def male_line1(svg, connector, row, column, pitch):
 
     # Create the upper half of a schematic arrow line.
@@ -737,8 +1320,8 @@ def male_line1(svg, connector, row, column, pitch):
     svg.append("      id=\"pinline1-" + str(connector) + "\"")
     svg.append("      fill=\"none\"")
     svg.append("      stroke=\"#000000\"")
-    svg.append("      stroke-width=\"{0:s}\"".format(s_x(1.9685,
-                                              constants.SCALE_ONLY, pitch)))
+    svg.append("      stroke-width=\"{0:s}\"".format(
+                                pin_template(male_line_template, pitch)))
     svg.append("      stroke-linecap=\"round\"")
     svg.append("      x1=\"" + s_x(38.36, column, pitch) + "\"")
     svg.append("      x2=\"" + s_x(27.36, column, pitch) + "\"")
@@ -757,8 +1340,8 @@ def male_line2(svg, connector, row, column, pitch):
     svg.append("      id=\"pinline2-" + str(connector) + "\"")
     svg.append("      fill=\"none\"")
     svg.append("      stroke=\"#000000\"")
-    svg.append("      stroke-width=\"{0:s}\"".format(s_x(1.9685,
-                                                 constants.SCALE_ONLY, pitch)))
+    svg.append("      stroke-width=\"{0:s}\"".format(
+                                pin_template(male_line_template, pitch)))
     svg.append("      stroke-linecap=\"round\"")
     svg.append("      x1=\"" + s_x(38.385, column, pitch) + "\"")
     svg.append("      x2=\"" + s_x(20.699, column, pitch) + "\"")
@@ -777,8 +1360,8 @@ def male_line3(svg, connector, row, column, pitch):
     svg.append("      id=\"pinline3-" + str(connector) + "\"")
     svg.append("      fill=\"none\"")
     svg.append("      stroke=\"#000000\"")
-    svg.append("      stroke-width=\"{0:s}\"".format(s_x(1.9685,
-                                              constants.SCALE_ONLY, pitch)))
+    svg.append("      stroke-width=\"{0:s}\"".format(
+                                pin_template(male_line_template, pitch)))
     svg.append("      stroke-linecap=\"round\"")
     svg.append("      x1=\"" + s_x(38.36, column, pitch) + "\"")
     svg.append("      x2=\"" + s_x(27.36, column, pitch) + "\"")
@@ -793,7 +1376,7 @@ def male_pin(connectors, connector, row, column, pitch):
 
     # Create the schematic pin line.
 
-    stroke_width = s_x(1.9685, constants.SCALE_ONLY, pitch)
+    stroke_width = pin_template(male_line_template, pitch)
 
     connectors.append("    <line")
     connectors.append("      id=\"connector" + str(connector) + "pin\"")
@@ -810,6 +1393,13 @@ def male_pin(connectors, connector, row, column, pitch):
     return connectors
 
 
+def male_terminal_template(pitch):
+
+    # The stroke-width of the schematic terminal rectangle.
+
+    return s_x(0, constants.SCALE_ONLY, pitch)
+
+
 def male_terminal(connectors, connector, row, column, pitch):
 
     # Create the schematic terminal rectangle.
@@ -818,8 +1408,8 @@ def male_terminal(connectors, connector, row, column, pitch):
     connectors.append("      id=\"connector" + str(connector) + "terminal\"")
     connectors.append("      fill=\"#555555\"")
     connectors.append("      stroke=\"none\"")
-    connectors.append("      stroke-width=\"{0:s}\"".format(s_x(0,
-                                                 constants.SCALE_ONLY, pitch)))
+    connectors.append("      stroke-width=\"{0:s}\"".format(
+                                pin_template(male_terminal_template, pitch)))
     connectors.append("      x=\"" + s_x(0.3, column, pitch) + "\"")
     connectors.append("      y=\"" + s_y(9.74, row, pitch) + "\"")
     connectors.append("      height=\"1\"")
@@ -845,6 +1435,14 @@ def create_male_breadboard_pin(svg, connectors, connector, columns, row,
 
     # Start of female breadboard pin code.
 
+def female_outline_template(pitch):
+
+    # The height and width of the outline rect.
+
+    return (s_y(20.68, constants.SCALE_ONLY, pitch),
+            s_x(20.68, constants.SCALE_ONLY, pitch))
+
+
 def female_outline(svg, connector, columns, row, column, pitch, color):
 
     # Generate an outline path and label it with the connector number.
@@ -852,10 +1450,6 @@ def female_outline(svg, connector, columns, row, column, pitch, color):
     # and size it correctly. Assumes row is horizontal and column is
     # vertical.
 
-#*** remove me later ***
-    print("Start outline row {0:d} column {1:d}".format(row, column))
-
-
     svg.append("    <rect")
 
     # Create a label ending in the connector number to be unique.
@@ -879,17 +1473,28 @@ def female_outline(svg, connector, columns, row, column, pitch, color):
 
     svg.append("      y=\"" + s_r_y(-1, columns, column, pitch) + "\"")
 
-    svg.append("      height=\"" + s_y(20.68, 
-                                        constants.SCALE_ONLY, pitch) + "\"")
+    height, width = pin_template(female_outline_template, pitch)
 
-    svg.append("      width=\"" + s_x(20.68, 
-                                        constants.SCALE_ONLY, pitch) + "\"")
+    svg.append("      height=\"" + height + "\"")
+
+    svg.append("      width=\"" + width + "\"")
 
     svg.append("    />")
 
     return svg
 
 
+def female_pinleft_template(pitch):
+
+    # The relative part of the pinleft path after the starting m.
+
+    return (" v " + s_x(7.6, constants.SCALE_ONLY, pitch)
+            + " l " + s_x(-2.8, constants.SCALE_ONLY, pitch) +
+                      "," + s_y(2.8, constants.SCALE_ONLY, pitch)
+            + " v " + s_y(-13.2, constants.SCALE_ONLY , pitch)
+            + " z\"")
+
+
 def female_pinleft(svg, connector, columns, row, column, pitch):
 
     # Generate a pinleft path and label it with the connector number.
@@ -910,11 +1515,7 @@ def female_pinleft(svg, connector, columns, row, column, pitch):
     svg.append("      d=\""
                + "m " + s_x(6, row, pitch) + "," + s_r_y(6, columns, column,
                                                          pitch)
-               + " v " + s_x(7.6, constants.SCALE_ONLY, pitch)
-               + " l " + s_x(-2.8, constants.SCALE_ONLY, pitch) +
-                             "," + s_y(2.8, constants.SCALE_ONLY, pitch)
-               + " v " + s_y(-13.2, constants.SCALE_ONLY , pitch)
-               + " z\"")
+               + pin_template(female_pinleft_template, pitch))
 
     # Set the approriate color for the pin.
 
@@ -927,6 +1528,17 @@ def female_pinleft(svg, connector, columns, row, column, pitch):
     return svg
 
 
+def female_pintop_template(pitch):
+
+    # The relative part of the pintop path after the starting m.
+
+    return (" h " + s_x(13.2, constants.SCALE_ONLY, pitch)
+            + " l " + s_x(-2.8, constants.SCALE_ONLY, pitch)
+            + "," + s_y(2.8, constants.SCALE_ONLY, pitch)
+            + " h " + s_x(-7.6, constants.SCALE_ONLY, pitch)
+            + " z\"")
+
+
 def female_pintop(svg, connector, columns, row, column, pitch):
 
     # Generate a pintop path and label it with the connector number.
@@ -947,11 +1559,7 @@ def female_pintop(svg, connector, columns, row, column, pitch):
     svg.append("      d=\""
                + "m " + s_x(3.24, row, pitch) + "," + s_r_y(3.24, columns,
                                                              column, pitch)
-               + " h " + s_x(13.2, constants.SCALE_ONLY, pitch)
-               + " l " + s_x(-2.8, constants.SCALE_ONLY, pitch)
-               + "," + s_y(2.8, constants.SCALE_ONLY, pitch)
-               + " h " + s_x(-7.6, constants.SCALE_ONLY, pitch)
-               + " z\"")
+               + pin_template(female_pintop_template, pitch))
 
     # Set the approriate color for the pin.
 
@@ -964,6 +1572,18 @@ def female_pintop(svg, connector, columns, row, column, pitch):
     return svg
 
 
+def female_pinright_template(pitch):
+
+    # The relative part of the pinright path after the starting m.
+
+    return (" " + s_x(2.8, constants.SCALE_ONLY, pitch)
+            + "," + s_y(-2.8, constants.SCALE_ONLY, pitch)
+            + " v " + s_x(13.2, constants.SCALE_ONLY, pitch)
+            + " l " + s_x(-2.8, constants.SCALE_ONLY, pitch)
+            + "," + s_y(-2.8, constants.SCALE_ONLY, pitch)
+            + " z\"")
+
+
 def female_pinright(svg, connector, columns, row, column, pitch):
 
     # Generate a pinright path and label it with the connector number.
@@ -984,12 +1604,7 @@ def female_pinright(svg, connector, columns, row, column, pitch):
     svg.append("      d=\""
                + "m " + s_x(13.65, row, pitch) + "," + s_r_y(6, columns, 
                                                              column, pitch)
-               + " " + s_x(2.8, constants.SCALE_ONLY, pitch)
-               + "," + s_y(-2.8, constants.SCALE_ONLY, pitch)
-               + " v " + s_x(13.2, constants.SCALE_ONLY, pitch)
-               + " l " + s_x(-2.8, constants.SCALE_ONLY, pitch)
-               + "," + s_y(-2.8, constants.SCALE_ONLY, pitch)
-               + " z\"")
+               + pin_template(female_pinright_template, pitch))
 
     # Set the approriate color for the pin.
 
@@ -1002,6 +1617,17 @@ def female_pinright(svg, connector, columns, row, column, pitch):
     return svg
 
 
+def female_pinbottom_template(pitch):
+
+    # The relative part of the pinbottom path after the starting m.
+
+    return (" h " + s_y(7, constants.SCALE_ONLY, pitch)
+            + " l " + s_x(2.8, constants.SCALE_ONLY, pitch)
+            + "," + s_y(2.8,  constants.SCALE_ONLY, pitch)
+            + " h " + s_y(-13.2, constants.SCALE_ONLY, pitch)
+            + " z\"")
+
+
 def female_pinbottom(svg, connector, columns, row, column, pitch):
 
     # Generate a pinbottom path and label it with the connector number.
@@ -1022,11 +1648,7 @@ def female_pinbottom(svg, connector, columns, row, column, pitch):
     svg.append("      d=\""
                + "m " + s_x(6, row, pitch) + "," + s_r_y(13.65, columns, 
                                                          column, pitch)
-               + " h " + s_y(7, constants.SCALE_ONLY, pitch)
-               + " l " + s_x(2.8, constants.SCALE_ONLY, pitch)
-               + "," + s_y(2.8,  constants.SCALE_ONLY, pitch)
-               + " h " + s_y(-13.2, constants.SCALE_ONLY, pitch)
-               + " z\"")
+               + pin_template(female_pinbottom_template, pitch))
 
     # Set the approriate color for the pin.
 
@@ -1039,6 +1661,14 @@ def female_pinbottom(svg, connector, columns, row, column, pitch):
     return svg
 
 
+def female_pinconnector_template(pitch):
+
+    # The width and height of the pinconnector rect.
+
+    return (s_x(7.6, constants.SCALE_ONLY, pitch),
+            s_y(7.6, constants.SCALE_ONLY, pitch))
+
+
 def female_pinconnector(connectors, connector, columns, row, column, pitch):
 
     # Generate a pinconnector rect and label it with the connector number.
@@ -1050,6 +1680,8 @@ def female_pinconnector(connectors, connector, columns, row, column, pitch):
     # can be appended to the end of the connectors to be in the correct place
     # for use by other tools.
 
+    width, height = pin_template(female_pinconnector_template, pitch)
+
     connectors.append("    <rect")
 
     # Create a label ending in the connector number followed by pin to
@@ -1059,11 +1691,9 @@ def female_pinconnector(connectors, connector, columns, row, column, pitch):
     connectors.append("      fill=\"#000000\"")
     connectors.append("      stroke-width=\"0\"")
     connectors.append("      x=\"" + s_x(6, row, pitch) + "\"")
-    connectors.append("      width=\"" + s_x(7.6, constants.SCALE_ONLY, pitch)
-                       + "\"")
+    connectors.append("      width=\"" + width + "\"")
     connectors.append("      y=\"" + s_r_y(6, columns, column, pitch) + "\"")
-    connectors.append("      height=\"" + s_y(7.6, constants.SCALE_ONLY, pitch)
-                       + "\"")
+    connectors.append("      height=\"" + height + "\"")
     connectors.append("    />")
 
     return connectors
@@ -1085,6 +1715,64 @@ def create_female_breadboard_pin(svg, connectors, connector, columns, row,
     return svg, connectors
 
 
+def create_breadboard_pin_body(svg, part_type, columns, pitch, color):
+
+    # Create the body (everything but the connector) of a single breadboard
+    # pin in a group called pinbody, for the defs of an instanced svg. Put the
+    # pin at row 1 and column columns so it isn't moved at all, and use an
+    # empty connector so the ids are plain outline, pinleft and so on.
+
+    svg.append("    <g")
+    svg.append("      id=\"pinbody\">")
+
+    if part_type == constants.MALE_HEADER:
+
+        svg = male_outline(svg, "", columns, 1, columns, pitch, color)
+        svg = male_pinleft(svg, "", columns, 1, columns, pitch)
+        svg = male_pintop(svg, "", columns, 1, columns, pitch)
+        svg = male_pinright(svg, "", columns, 1, columns, pitch)
+        svg = male_pinbottom(svg, "", columns, 1, columns, pitch)
+
+    else:
+
+        svg = female_outline(svg, "", columns, 1, columns, pitch, color)
+        svg = female_pinleft(svg, "", columns, 1, columns, pitch)
+        svg = female_pintop(svg, "", columns, 1, columns, pitch)
+        svg = female_pinright(svg, "", columns, 1, columns, pitch)
+        svg = female_pinbottom(svg, "", columns, 1, columns, pitch)
+
+    svg.append("    </g>")
+
+    return svg
+
+
+def create_breadboard_pin_use(svg, connectors, connector, part_type, columns,
+                              row, column, pitch):
+
+    # Place an instance of the pinbody from the defs where this pin goes
+    # (the offset for the row in x and the column in y) and then create the
+    # connector for the pin as usual so Fritzing can find it.
+
+    svg.append("    <use")
+    svg.append("      id=\"pin" + str(connector) + "\"")
+    svg.append("      xlink:href=\"#pinbody\"")
+    svg.append("      x=\"" + s_x(0, row, pitch) + "\"")
+    svg.append("      y=\"" + s_r_y(0, columns, column, pitch) + "\"")
+    svg.append("    />")
+
+    if part_type == constants.MALE_HEADER:
+
+        connectors = male_pinconnector(connectors, connector, columns, row,
+                                       column, pitch)
+
+    else:
+
+        connectors = female_pinconnector(connectors, connector, columns, row,
+                                         column, pitch)
+
+    return svg, connectors
+
+
 
 def create_male_schematic_pin(svg, connectors, connector, row, column, pitch):
 
@@ -1122,6 +1810,142 @@ def create_male_schematic_pin(svg, connectors, connector, row, column, pitch):
     return svg, connectors
 
 
+def pcb_circle_template(pitch):
+
+    # The radius and stroke-width of a THT circle pad.
+
+    return (s_x(5.70866, constants.SCALE_ONLY, pitch),
+            s_x(3.937, constants.SCALE_ONLY, pitch))
+
+
+def pcb_oblong_template(pitch):
+
+    # The radius and stroke-width of the circle in an end of column (or
+    # single column) oblong pad.
+
+    return (s_x(4.2, constants.SCALE_ONLY, pitch),
+            s_x(0.9, constants.SCALE_ONLY, pitch))
+
+
+def pcb_oblong_middle_template(pitch):
+
+    # The radius and stroke-width of the circle in a middle column oblong
+    # pad.
+
+    return (s_x(4.75, constants.SCALE_ONLY, pitch),
+            s_x(2, constants.SCALE_ONLY, pitch))
+
+
+def pcb_oblong_single_template(pitch):
+
+    # The relative part of the single column oblong path after the
+    # starting m.
+
+    return (" c "
+            + s_x(0, constants.SCALE_ONLY, pitch)
+            + "," + s_y(2.7, constants.SCALE_ONLY, pitch) + " "
+            + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(7.2, constants.SCALE_ONLY, pitch) + " "
+            + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(10, constants.SCALE_ONLY, pitch) + " "
+            + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(3.9, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-2.6, constants.SCALE_ONLY, pitch) + ","
+            + s_y(5.4, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.3, constants.SCALE_ONLY, pitch) + ","
+            + s_y(5.5, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-2.6, constants.SCALE_ONLY, pitch) + ","
+            + s_y(0, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.3, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-1.5, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.3, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-5.5, constants.SCALE_ONLY, pitch) + " "
+            + "v " + s_y(-10.28, constants.SCALE_ONLY, pitch)
+            + " c " + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-3.1, constants.SCALE_ONLY, pitch) + " "
+            + s_x(2.6, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-4.8, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-4.8, constants.SCALE_ONLY, pitch) + " "
+            + s_x(2.7, constants.SCALE_ONLY, pitch) + ","
+            + s_y(0, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.3, constants.SCALE_ONLY, pitch) + ","
+            + s_y(1.5, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.4, constants.SCALE_ONLY, pitch) + ","
+            + s_y(4.9, constants.SCALE_ONLY, pitch) + " z\"")
+
+
+def pcb_oblong_bottom_template(pitch):
+
+    # The relative part of the bottom (column 1) oblong path after the
+    # starting m.
+
+    return (" c "
+            + s_x(3.2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(0, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(2.6, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(4.9, constants.SCALE_ONLY, pitch) + " "
+            + " v " + s_x(8.3, constants.SCALE_ONLY, pitch)
+            + " c "
+            + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(2.3, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-2.6, constants.SCALE_ONLY, pitch) + ","
+            + s_y(4.1, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(4.1, constants.SCALE_ONLY, pitch) + " v "
+            + s_x(0, constants.SCALE_ONLY, pitch) + " c "
+            + s_x(-3.2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(0, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-1.8, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-4.1, constants.SCALE_ONLY, pitch) + " v "
+            + s_x(-8.4, constants.SCALE_ONLY, pitch) + " c "
+            + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-2.2, constants.SCALE_ONLY, pitch) + " "
+            + s_x(2.7, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-4.8, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-4.8, constants.SCALE_ONLY, pitch) + " z\"")
+
+
+def pcb_oblong_top_template(pitch):
+
+    # The relative part of the top (last column) oblong path after the
+    # starting m.
+
+    return (" c "
+            + s_x(3.2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(0, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(2.6, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(4.9, constants.SCALE_ONLY, pitch) + " v "
+            + s_x(8.3, constants.SCALE_ONLY, pitch) + " c "
+            + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(2.3, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-2.6, constants.SCALE_ONLY, pitch) + ","
+            + s_y(4.1, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(4.1, constants.SCALE_ONLY, pitch) + " v "
+            + s_x(0, constants.SCALE_ONLY, pitch) + " c "
+            + s_x(-3.2, constants.SCALE_ONLY, pitch) + ","
+            + s_y(0, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-1.8, constants.SCALE_ONLY, pitch) + " "
+            + s_x(-5.9, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-4.1, constants.SCALE_ONLY, pitch) + " v "
+            + s_x(-8.4, constants.SCALE_ONLY, pitch) + " c "
+            + s_x(0, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-2.2, constants.SCALE_ONLY, pitch) + " "
+            + s_x(2.7, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-4.8, constants.SCALE_ONLY, pitch) + " "
+            + s_x(5.86, constants.SCALE_ONLY, pitch) + ","
+            + s_y(-4.8, constants.SCALE_ONLY, pitch) + " z\"")
+
+
 def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                    pcb_type, pad_type):
 
@@ -1157,6 +1981,8 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
 
         if pad_type == constants.CIRCLE:
 
+            radius, stroke_width = pin_template(pcb_circle_template, pitch)
+
             connectors.append("     <circle")
 
             # For THT label is "pin"
@@ -1169,14 +1995,13 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
             # Scale the default radius value (hard code a row of 0 to trigger
             # only a scale).
 
-            connectors.append("       r=\""
-                             + s_x(5.70866, constants.SCALE_ONLY, pitch) + "\"")
+            connectors.append("       r=\"" + radius + "\"")
 
             # Scale the default stroke-width value (hard code a row of 0 to
             # trigger only a scale).
 
             connectors.append("       stroke-width=\""
-                              + s_x(3.937, constants.SCALE_ONLY, pitch) + "\"")
+                              + stroke_width + "\"")
 
 
 #            if pitch < constants.PITCH_2MM:
@@ -1239,40 +2064,11 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                 svg.append("      d=\""
                            + "m " + s_x(16.3, row, pitch) + ","
                            + s_y(8.8, column, pitch)
-                           + " c "
-                           + s_x(0, constants.SCALE_ONLY, pitch)
-                           + "," + s_y(2.7, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(0, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(7.2, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(0, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(10, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(0, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(3.9, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-2.6, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(5.4, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.3, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(5.5, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-2.6, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(0, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.3, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-1.5, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.3, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-5.5, constants.SCALE_ONLY, pitch) + " "
-                           + "v " + s_y(-10.28, constants.SCALE_ONLY, pitch)
-                           + " c " + s_x(0, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-3.1, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(2.6, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-4.8, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.2, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-4.8, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(2.7, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(0, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.3, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(1.5, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.4, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(4.9, constants.SCALE_ONLY, pitch) + " z\"")
+                           + pin_template(pcb_oblong_single_template, pitch))
                 svg.append("    />")
 
+                radius, stroke_width = pin_template(pcb_oblong_template, pitch)
+
                 connectors.append("     <circle")
 
                 # For THT label is "pin"
@@ -1285,14 +2081,13 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                 # Scale the default radius value (hard code a row of 0 to
                 # trigger only a scale).
 
-                connectors.append("       r=\"" 
-                                + s_x(4.2, constants.SCALE_ONLY, pitch) + "\"")
+                connectors.append("       r=\"" + radius + "\"")
 
                 # Scale the default stroke-width value (hard code a row of 0 
                 # to trigger only a scale).
 
                 connectors.append("       stroke-width=\""
-                           + s_x(0.9, constants.SCALE_ONLY, pitch) + "\"")
+                                  + stroke_width + "\"")
 
                 # Scale the default x coord value and potentially move it
                 # according to its row value.
@@ -1329,37 +2124,11 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                 svg.append("      d=\""
                            + "m " + s_x(11, row, pitch) + ","
                            + s_r_y(7.5, columns, column, pitch)
-                           + " c "
-                           + s_x(3.2, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(0, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(2.6, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(4.9, constants.SCALE_ONLY, pitch) + " "
-                           + " v " + s_x(8.3, constants.SCALE_ONLY, pitch)
-                           + " c "
-                           + s_x(0, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(2.3, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-2.6, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(4.1, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.9, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(4.1, constants.SCALE_ONLY, pitch) + " v " 
-                           + s_x(0, constants.SCALE_ONLY, pitch) + " c "
-                           + s_x(-3.2, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(0, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.9, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-1.8, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.9, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(-4.1, constants.SCALE_ONLY, pitch) + " v " 
-                           + s_x(-8.4, constants.SCALE_ONLY, pitch) + " c "
-                           + s_x(0, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-2.2, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(2.7, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-4.8, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.9, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-4.8, constants.SCALE_ONLY, pitch) + " z\"")
+                           + pin_template(pcb_oblong_bottom_template, pitch))
                 svg.append("    />")
 
+                radius, stroke_width = pin_template(pcb_oblong_template, pitch)
+
                 connectors.append("     <circle")
 
                 # For THT label is "pin"
@@ -1372,14 +2141,13 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                 # Scale the default radius value (hard code a row of 0 to
                 # trigger only a scale).
 
-                connectors.append("       r=\"" + s_x(4.2,
-                                         constants.SCALE_ONLY , pitch) + "\"")
+                connectors.append("       r=\"" + radius + "\"")
 
                 # Scale the default stroke-width value (hard code a row of 0 
                 # to trigger only a scale).
 
-                connectors.append("       stroke-width=\"" + s_x(0.9, 
-                                         constants.SCALE_ONLY, pitch) + "\"")
+                connectors.append("       stroke-width=\""
+                                  + stroke_width + "\"")
 
                 # Scale the default x coord value and potentially move it
                 # according to its row value.
@@ -1407,6 +2175,8 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                 # svg.pcb.oblong-middle-circle_single-pin-0.5mm_pcb.svg
                 # for the pin.
 
+                radius, stroke_width = pin_template(pcb_oblong_middle_template, pitch)
+
                 connectors.append("     <circle")
 
                 # For THT label is "pin"
@@ -1419,14 +2189,13 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                 # Scale the default radius value (hard code a row of 0 to
                 # trigger only a scale).
 
-                connectors.append("       r=\"" + s_x(4.75, 
-                                          constants.SCALE_ONLY, pitch) + "\"")
+                connectors.append("       r=\"" + radius + "\"")
 
                 # Scale the default stroke-width value (hard code a row of 0 
                 # to trigger only a scale).
 
-                connectors.append("       stroke-width=\"" + s_x(2, 
-                                          constants.SCALE_ONLY, pitch) + "\"")
+                connectors.append("       stroke-width=\""
+                                  + stroke_width + "\"")
 
                 # Scale the default x coord value and potentially move it
                 # according to its row value.
@@ -1463,36 +2232,12 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                 svg.append("      d=\""
                            + "m "
                            + s_x(11, row, pitch) + ","
-                           + s_r_y(3.7, columns, column, pitch) + " c "
-                           + s_x(3.2, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(0, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(2.6, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.9, constants.SCALE_ONLY, pitch) + ","
-                           + s_y(4.9, constants.SCALE_ONLY, pitch) + " v "
-                           + s_x(8.3, constants.SCALE_ONLY, pitch) + " c "
-                           + s_x(0, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(2.3, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-2.6, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(4.1, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.9, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(4.1, constants.SCALE_ONLY, pitch) + " v " 
-                           + s_x(0, constants.SCALE_ONLY, pitch) + " c "
-                           + s_x(-3.2, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(0, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.9, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-1.8, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(-5.9, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-4.1, constants.SCALE_ONLY, pitch) + " v " 
-                           + s_x(-8.4, constants.SCALE_ONLY, pitch) + " c "
-                           + s_x(0, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-2.2, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(2.7, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-4.8, constants.SCALE_ONLY, pitch) + " "
-                           + s_x(5.86, constants.SCALE_ONLY, pitch) + "," 
-                           + s_y(-4.8, constants.SCALE_ONLY, pitch) + " z\"")
+                           + s_r_y(3.7, columns, column, pitch)
+                           + pin_template(pcb_oblong_top_template, pitch))
                 svg.append("    />")
 
+                radius, stroke_width = pin_template(pcb_oblong_template, pitch)
+
                 connectors.append("     <circle")
 
                 # For THT label is "pin"
@@ -1505,14 +2250,13 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
                 # Scale the default radius value (hard code a row of 0 to
                 # trigger only a scale).
 
-                connectors.append("       r=\"" + s_x(4.2,
-                                         constants.SCALE_ONLY, pitch) + "\"")
+                connectors.append("       r=\"" + radius + "\"")
 
                 # Scale the default stroke-width value (hard code a row of 0 
                 # to trigger only a scale).
 
-                connectors.append("       stroke-width=\"" + s_x(0.9, 
-                                         constants.SCALE_ONLY, pitch) + "\"")
+                connectors.append("       stroke-width=\""
+                                  + stroke_width + "\"")
 
                 # Scale the default x coord value and potentially move it
                 # according to its row value.
@@ -1533,7 +2277,7 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
 
     else:
 
-        print("pad type {0:d} Not implemented yet".format(pad_type),
+        print("pad type {0:s} Not implemented yet".format(pad_type),
                file=sys.stderr)
 
         exit(1)
@@ -1542,15 +2286,26 @@ def create_pcb_pin(svg, connectors, connector, columns, row, column, pitch,
 
 
 def create_pin(svg, connectors, connector, svg_type, part_type, columns, row,
-               column, pitch, color, pcb_type, pad_type):
+               column, pitch, color, pcb_type, pad_type, instance=False):
 
     # Create a single pin, positioning it correctly in x and y and
     # adjusting its scale according to pitch. Note the connectors are
     # returned in connector order in list connectors so they can be
-    # appended to the end of the svg for use by other tools.
+    # appended to the end of the svg for use by other tools. If instance
+    # is True a breadboard pin is a <use> of the pinbody in the defs.
+
+    if svg_type == constants.BREADBOARD and instance:
+
+        # Create an instance of the breadboard header pin.
+
+        svg, connectors = create_breadboard_pin_use(svg, connectors,
+                                                    connector, part_type,
+                                                    columns, row, column,
+                                                    pitch)
+        return svg, connectors
 
-    if (svg_type == constants.BREADBOARD and
-        part_type == constants.MALE_HEADER):
+    elif (svg_type == constants.BREADBOARD and
+          part_type == constants.MALE_HEADER):
 
         # Create a breadboard male header pin
 
@@ -1617,14 +2372,160 @@ def create_pin(svg, connectors, connector, svg_type, part_type, columns, row,
         exit(1)
 
 
-def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
-               pin_order, pad_type, color, ref_file, layerid):
+def absolute_path(d):
+
+    # A path that starts with a relative "m" treats its first move as
+    # absolute, but a following subpath's "m" is relative to the start of
+    # the one before it. So before a path is merged change a starting "m" to
+    # "M", adding an "l" if any (relative lineto) coordinate pairs follow
+    # the move without a command of their own.
+
+    if not d.startswith("m "):
+
+        return d
+
+    start, rest = d[2:].split(" ", 1)
+
+    if not rest.lstrip()[0].isalpha():
+
+        rest = "l " + rest
+
+    return "M " + start + " " + rest
+
+
+def coalesce_paths(svg):
+
+    # Merge the <path> elements in svg that have identical attributes (other
+    # than id and d) and are in the same group into a single path with one
+    # subpath for each of them. The connectors aren't in svg (they are only
+    # appended after this) so they are left alone. Each merged path takes the
+    # place of the last of its paths so nothing that was drawn on top of one
+    # of them ends up underneath it, and is labeled with the id of the first
+    # of them without the connector number.
+
+    elements = []
+
+    merged = {}
+
+    group = 0
+
+    line_no = 0
+
+    while line_no < len(svg):
+
+        line = svg[line_no]
+
+        if line.strip() != "<path":
+
+            # Not a path, so count the groups (paths are only merged in the
+            # same group) and keep the line as is.
+
+            if line.lstrip().startswith(("<g", "</g")):
+
+                group += 1
+
+            elements.append(line)
+
+            line_no += 1
+
+            continue
+
+        # Collect the attributes of the path up to its "/>".
+
+        attributes = []
+
+        line_no += 1
+
+        while svg[line_no].strip() != "/>":
+
+            name, value = svg[line_no].strip().split("=", 1)
+
+            attributes.append((name, value[1:-1]))
+
+            line_no += 1
+
+        line_no += 1
+
+        key = (group, tuple((name, value) for name, value in attributes
+                            if name not in ("id", "d")))
+
+        paths = merged.get(key)
+
+        if paths is None:
+
+            paths = {"attributes": attributes, "d": [], "last": None}
+
+            merged[key] = paths
+
+        else:
+
+            # Remove the place holder of the previous last path.
+
+            elements[paths["last"]] = None
+
+        paths["d"].append(absolute_path(dict(attributes)["d"]))
 
-    # Create the svg for a view.
+        paths["last"] = len(elements)
+
+        elements.append(paths)
+
+    # Then put the svg back together, emitting each merged path where its
+    # last path was.
 
     svg = []
 
-    connectors = []
+    for element in elements:
+
+        if element is None:
+
+            continue
+
+        if isinstance(element, str):
+
+            svg.append(element)
+
+            continue
+
+        svg.append("    <path")
+
+        for name, value in element["attributes"]:
+
+            if name == "id":
+
+                value = value.rstrip("0123456789")
+
+            elif name == "d":
+
+                value = " ".join(element["d"])
+
+            svg.append("      {0:s}=\"{1:s}\"".format(name, value))
+
+        svg.append("    />")
+
+    return svg
+
+
+def header_text(value, shift=0):
+
+    # Return a size or position svg_header() works out in floats (in thou,
+    # or with shift 3 in inches) as text, "{0:f}" at full precision as it
+    # always has been, otherwise at coordinate_precision as the coordinates
+    # are.
+
+    if coordinate_precision == fixed.DIGITS:
+
+        return "{0:f}".format(value)
+
+    return fixed.value_text(value, coordinate_precision, shift)
+
+
+def svg_header(svg_type, part_type, rows, columns, pitch, pcb_type, pad_type,
+               color, ref_file, layerid, instance=False):
+
+    # Create the start of the svg for a view, everything up to (and
+    # including) the opening of the group(s) the pins go in.
+
+    svg = []
 
     svg.append("<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"no\"?>")
 
@@ -1672,7 +2573,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
         stroke_width = 1.968 * pitch / 1000.0
 
-        print("pcb stroke_width = {0:f}".format(stroke_width))
+        trace_logger.debug("pcb stroke_width = %f", stroke_width)
 
         height = round(float(pitch) * float(columns) * float(0.024)
                                                   + stroke_width, 5)
@@ -1693,7 +2594,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
 #        width = float(pitch) * float(rows) * float(0.0196911953125)
 
-        print("pcb viewbox = {0:f} {1:f}".format(height, width))
+        trace_logger.debug("pcb viewbox = %f %f", height, width)
 
 #        else:
 
@@ -1719,7 +2620,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
         height = round(float(pitch) * float(columns) * float(0.0198), 5)
 
-        print("else height = {0:f} columns {1:d}".format(height, columns))
+        trace_logger.debug("else height = %f columns %d", height, columns)
 
         # multiply the number of rows by the pitch (converted to inches)
         # of an element to get the correct width. Round the result to 5
@@ -1727,18 +2628,18 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
         width = round(float(pitch) * float(rows) * float(0.0198), 5)
 
-        print("else width = {0:f} rows {1:d}".format(width, rows))
+        trace_logger.debug("else width = %f rows %d", width, rows)
 
-    svg.append("  height=\"{0:f}in\"".format(height))
+    svg.append("  height=\"{0:s}in\"".format(header_text(height, 3)))
 
-    svg.append("  width=\"{0:f}in\"".format(width))
+    svg.append("  width=\"{0:s}in\"".format(header_text(width, 3)))
 
     # viewbox needs to be 1000 x width and 1000 x height (assumes height
     # and width are in inches!) to make drawing units 1/1000in.
 
-    svg.append("  viewBox=\"0 0 {0:f} {1:f}\"".format(
-        round(width * float(1000), 5),
-        round(height * float(1000), 5)))
+    svg.append("  viewBox=\"0 0 {0:s} {1:s}\"".format(
+        header_text(round(width * float(1000), 5)),
+        header_text(round(height * float(1000), 5))))
 
     svg.append("  version=\"1.2\"")
 
@@ -1748,15 +2649,38 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
     svg.append("  xmlns=\"http://www.w3.org/2000/svg\"")
 
+    # Only breadboard has instances of the pin body.
+
+    instance = instance and svg_type == constants.BREADBOARD
+
+    if instance:
+
+        # <use> needs xlink:href for Fritzing (Qt) to find the pinbody.
+
+        svg.append("  xmlns:xlink=\"http://www.w3.org/1999/xlink\"")
+
     svg.append("  xmlns:svg=\"http://www.w3.org/2000/svg\">")
 
     svg.append("  <defs")
 
     # Any defs id will do.
 
-    svg.append("    id=\"defs25\"")
+    if instance:
+
+        # Define the pin body that every pin is an instance of.
+
+        svg.append("    id=\"defs25\">")
 
-    svg.append("  />")
+        svg = create_breadboard_pin_body(svg, part_type, columns, pitch,
+                                         color)
+
+        svg.append("  </defs>")
+
+    else:
+
+        svg.append("    id=\"defs25\"")
+
+        svg.append("  />")
 
     svg.append("  <desc")
 
@@ -1807,26 +2731,19 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
                 stroke_width = (float(s_x(1.968, constants.SCALE_ONLY, pitch))
                                      * 0.5)
 
-                print("< 2mm: stroke-width {0:f}".format(stroke_width))
+                trace_logger.debug("< 2mm: stroke-width %f", stroke_width)
 
                 # If the pitch is less than 2MM, scale the stroke-width.
 
                 svg.append("      stroke-width=\"" + s_x(1.968,
                                   constants.SCALE_ONLY, pitch) + "\"") 
 
-                print("< 2mm: stroke-width {0:s}".format(s_x(1.968, constants.SCALE_ONLY, pitch)))
-
                 svg.append("      x=\"" + s_x(0.984, constants.SCALE_ONLY,
                                                          pitch) + "\"")
 
-                print("< 2mm: x {0:s}".format(s_x(0.984, constants.SCALE_ONLY, pitch)))
-
                 svg.append("      y=\"" + s_y(0.984, constants.SCALE_ONLY,
                                                          pitch) + "\"")
 
-                print("< 2mm: y {0:s}".format(s_x(0.984, 
-                                            constants.SCALE_ONLY, pitch)))
-
             else:
 
                 # If the pitch is 2mm or larger set the stroke-width to 10.
@@ -1845,9 +2762,9 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
             height = float(s_y(23.9, columns, pitch))
 
-            print("height: {0:f}".format(height))
+            trace_logger.debug("height: %f", height)
 
-            svg.append("      height=\"{0:f}\"".format(height))
+            svg.append("      height=\"{0:s}\"".format(header_text(height)))
 
             svg.append("      width=\"" + s_x(18.51, rows, pitch) + "\"")
 
@@ -1863,7 +2780,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
             svg.append("      id=\"pin0marker\"")
             svg.append("      stroke=\"#000000\"")
 
-            print("silk: pitch {0:f}".format(pitch))
+            trace_logger.debug("silk: pitch %f", pitch)
 
 #            if pitch < constants.PITCH_2MM:
 
@@ -1875,12 +2792,21 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
                 # Then emit the scaled stroke-width value. 
 
-                svg.append("      stroke-width=\"" + str(stroke_width) + "\"") 
+                if coordinate_precision == fixed.DIGITS:
+
+                    svg.append("      stroke-width=\"" + str(stroke_width)
+                               + "\"")
+
+                else:
+
+                    svg.append("      stroke-width=\""
+                               + header_text(stroke_width) + "\"")
 
                 # Set x1 to be 5 (1/2 the stroke-width) to set the start of
                 # the pin0marker.
 
-                svg.append("      x2=\"{0:f}\"".format(stroke_width))
+                svg.append("      x2=\"{0:s}\"".format(
+                               header_text(stroke_width)))
 
                 # Scale the x2 value according to the pitch
 
@@ -1900,7 +2826,8 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
                 # stroke-width is 10) plus the height of the rectangle 
                 # which was saved from the rectangle def above. 
 
-                svg.append("      y1=\"{0:f}\"".format(height + stroke_width))
+                svg.append("      y1=\"{0:s}\"".format(
+                               header_text(height + stroke_width)))
 
                 svg.append("    />")
 
@@ -1939,7 +2866,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
             # Neither of the above is an error.
 
-            print("Unknown pcb pad type {0:d}\n".format(pcb_type),
+            print("Unknown pcb pad type {0:s}\n".format(pcb_type),
                                                  file=sys.stderr)
 
             exit(1)
@@ -1948,6 +2875,14 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
         svg.append("    id=\"{0:s}\">".format(layerid))
 
+    return svg
+
+
+def pin_positions(svg_type, rows, columns, pin_order):
+
+    # Generate the connector number, row and column of each pin in a view
+    # in connector order.
+
     # connectors start at 0.
 
     connector = 0
@@ -1985,12 +2920,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
                     offset = ((column - 1) * (rows)) + row  + column - 1
 
-                    print("\nSch row: rows {0:d} row {1:d} column {2:d} offset {3:d} connector {4:d}".format(rows, row, column, offset, connector))
-
-                    svg, connectors = create_pin(svg, connectors, connector,
-                                                 svg_type, part_type, columns,
-                                                 offset, 1, pitch,
-                                                 color, pcb_type, pad_type)
+                    yield connector, offset, 1
                     connector += 1
 
         else:
@@ -2017,10 +2947,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 # *** remove me later! ***
 #                    print("\nSch col: columns {0:d} column {1:d} row {2:d} offset {3:d} connector {4:d}".format(columns, column, row, offset, connector))
 
-                    svg, connectors = create_pin(svg, connectors, connector,
-                                                 svg_type, part_type, columns,
-                                                 offset, 1, pitch, color, 
-                                                 pcb_type, pad_type)
+                    yield connector, offset, 1
 
                     connector += 1
 
@@ -2041,10 +2968,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
                 for row in range(1, rows + 1):
 
-                    svg, connectors = create_pin(svg, connectors, connector,
-                                                 svg_type, part_type, columns,
-                                                 row, column, pitch, color,
-                                                 pcb_type, pad_type)
+                    yield connector, row, column
                     connector += 1
 
             # For each column increase the offset by 1 to produce a
@@ -2066,10 +2990,7 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
                 for column in range(1, columns + 1):
 
-                    svg, connectors = create_pin(svg, connectors, connector,
-                                                 svg_type, part_type, columns,
-                                                 row, column, pitch, color,
-                                                 pcb_type, pad_type)
+                    yield connector, row, column
                     connector += 1
 
                 # For each column increase the offset by 1 to produce a
@@ -2077,11 +2998,13 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
 
                 offset += 1
 
-    # Append the connectors to the svg just before closing the svg.
 
-    for connector in (connectors):
+def svg_footer(svg_type, pcb_type):
 
-        svg.append(connector)
+    # Create the end of the svg for a view, closing the groups that
+    # svg_header() opened.
+
+    svg = []
 
     if svg_type == constants.PCB and pcb_type == constants.THT:
 
@@ -2100,9 +3023,3105 @@ def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
     return svg
 
 
-def main():
 
-    # Configure the root logging instance, even though we won't be using it
+
+def create_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
+               pin_order, pad_type, color, ref_file, layerid, vectorize=False,
+               instance=False, merge=False, compact=False,
+               precision=fixed.DIGITS):
+
+    # Create the svg for a view. If vectorize is True use the numpy
+    # coordinate engine to calculate the coordinates for all the pins at
+    # once rather than one at a time (the svg is identical either way.)
+    # If instance is True (breadboard only) define the pin body once in
+    # the defs and place each pin with a <use> rather than emitting the
+    # whole pin every time (the connectors are still emitted for each pin.)
+    # If merge is True merge the paths (other than the connectors) that
+    # share the same fill into one path per fill. If compact is True write
+    # each element on one line without indentation (see compact_lines())
+    # and round the coordinates to precision (0 to 4) digits after the
+    # decimal point.
+
+    global grid, coordinate_precision
+
+    if precision != coordinate_precision:
+
+        check_precision(precision)
+
+        saved_precision = coordinate_precision
+
+        coordinate_precision = precision
+
+        try:
+
+            return create_svg(svg_type, moduleid, part_type, rows, columns,
+                              pitch, pcb_type, pin_order, pad_type, color,
+                              ref_file, layerid, vectorize, instance, merge,
+                              compact, precision)
+
+        finally:
+
+            coordinate_precision = saved_precision
+
+    if vectorize:
+
+        import partsfactory_numpy
+
+        if partsfactory_numpy.numpy is None:
+
+            print("Error: vectorize needs numpy to be installed",
+                  file=sys.stderr)
+
+            exit(1)
+
+        grid = partsfactory_numpy.CoordinateGrid(max(rows, columns),
+                                                 coordinate_precision)
+
+        try:
+
+            return create_svg(svg_type, moduleid, part_type, rows, columns,
+                              pitch, pcb_type, pin_order, pad_type, color,
+                              ref_file, layerid, instance=instance,
+                              merge=merge, compact=compact,
+                              precision=precision)
+
+        finally:
+
+            grid = None
+
+    svg = svg_header(svg_type, part_type, rows, columns, pitch, pcb_type,
+                     pad_type, color, ref_file, layerid, instance)
+
+    connectors = []
+
+    for connector, row, column in pin_positions(svg_type, rows, columns,
+                                                pin_order):
+
+        svg, connectors = create_pin(svg, connectors, connector, svg_type,
+                                     part_type, columns, row, column, pitch,
+                                     color, pcb_type, pad_type, instance)
+
+    if merge:
+
+        # Merge the paths before the connectors are added so the connectors
+        # stay separate elements.
+
+        svg = coalesce_paths(svg)
+
+    # Append the connectors to the svg just before closing the svg.
+
+    for connector in (connectors):
+
+        svg.append(connector)
+
+    svg.extend(svg_footer(svg_type, pcb_type))
+
+    if compact:
+
+        svg = list(compact_lines(svg))
+
+    return svg
+
+
+def generate_svg(svg_type, moduleid, part_type, rows, columns, pitch,
+                 pcb_type, pin_order, pad_type, color, ref_file, layerid,
+                 vectorize=False, instance=False, compact=False,
+                 precision=fixed.DIGITS):
+
+    # Generate the same svg as create_svg() a line at a time in document
+    # order, holding one pin's body at a time, so it can be written straight
+    # to an open file or socket (see write_stream().) The connectors need to
+    # come after all the bodies so they (which are much smaller) are kept
+    # until then. There is no merge as merging the paths needs all of them
+    # at once.
+
+    global grid, coordinate_precision
+
+    if compact:
+
+        yield from compact_lines(generate_svg(
+                       svg_type, moduleid, part_type, rows, columns, pitch,
+                       pcb_type, pin_order, pad_type, color, ref_file, layerid,
+                       vectorize, instance, precision=precision))
+
+        return
+
+    if precision != coordinate_precision:
+
+        check_precision(precision)
+
+        saved_precision = coordinate_precision
+
+        coordinate_precision = precision
+
+        try:
+
+            yield from generate_svg(svg_type, moduleid, part_type, rows,
+                                    columns, pitch, pcb_type, pin_order,
+                                    pad_type, color, ref_file, layerid,
+                                    vectorize, instance, precision=precision)
+
+        finally:
+
+            coordinate_precision = saved_precision
+
+        return
+
+    if vectorize:
+
+        import partsfactory_numpy
+
+        if partsfactory_numpy.numpy is None:
+
+            print("Error: vectorize needs numpy to be installed",
+                  file=sys.stderr)
+
+            exit(1)
+
+        grid = partsfactory_numpy.CoordinateGrid(max(rows, columns),
+                                                 coordinate_precision)
+
+        try:
+
+            yield from generate_svg(svg_type, moduleid, part_type, rows,
+                                    columns, pitch, pcb_type, pin_order,
+                                    pad_type, color, ref_file, layerid,
+                                    instance=instance, precision=precision)
+
+        finally:
+
+            grid = None
+
+        return
+
+    yield from svg_header(svg_type, part_type, rows, columns, pitch, pcb_type,
+                          pad_type, color, ref_file, layerid, instance)
+
+    connectors = []
+
+    for connector, row, column in pin_positions(svg_type, rows, columns,
+                                                pin_order):
+
+        svg, connectors = create_pin([], connectors, connector, svg_type,
+                                     part_type, columns, row, column, pitch,
+                                     color, pcb_type, pad_type, instance)
+
+        yield from svg
+
+    yield from connectors
+
+    yield from svg_footer(svg_type, pcb_type)
+
+
+def pcb_reference_file(pad_type):
+
+    # Return the reference file for the pcb view with pad_type pads, which
+    # is also the check that the pad type is one we can make.
+
+    if pad_type == constants.CIRCLE:
+
+        return constants.CIRCLE_PCB_REFERENCE_FILE
+
+    elif pad_type == constants.OBLONG:
+
+        return constants.OBLONG_PCB_REFERENCE_FILE
+
+    print("Unknown pcb pad type {0:s}\n".format(pad_type), file=sys.stderr)
+
+    exit(1)
+
+
+def view_svg(svg_type, moduleid, part_type, rows, columns, pitch, pcb_type,
+             pin_order, pad_type, color, vectorize=False, instance=False,
+             merge=False, compact=False, precision=fixed.DIGITS):
+
+    # Return the lines of the svg for one view of the part, choosing the
+    # reference file, layerid and pitch for the view. The lines come from
+    # generate_svg() unless merge is set (which needs the whole svg.)
+
+    if svg_type == constants.BREADBOARD:
+
+        ref_file = constants.MALE_HEADER_BREADBOARD_REFERENCE_FILE
+
+        layerid = constants.BREADBOARD
+
+    elif svg_type == constants.SCHEMATIC:
+
+        ref_file = constants.MALE_HEADER_SCHEMATIC_REFERENCE_FILE
+
+        layerid = constants.SCHEMATIC
+
+        # Schematic is always pitch 0.1IN so set it expicitly.
+
+        pitch = constants.PITCH_0_1IN
+
+    else:
+
+        ref_file = pcb_reference_file(pad_type)
+
+        layerid = ""    # pcb has 3 layerIds not only 1!
+
+    if merge:
+
+        return create_svg(svg_type, moduleid, part_type, rows, columns, pitch,
+                          pcb_type, pin_order, pad_type, color, ref_file,
+                          layerid, vectorize, instance, merge, compact,
+                          precision)
+
+    return generate_svg(svg_type, moduleid, part_type, rows, columns, pitch,
+                        pcb_type, pin_order, pad_type, color, ref_file,
+                        layerid, vectorize, instance, compact, precision)
+
+
+def bundle_fzpz(names, part_type, rows, columns, pitch, pcb_type, pad_type,
+                color, version, vectorize=False, instance=False, merge=False,
+                compact=False, precision=fixed.DIGITS):
+
+    # Create the .fzpz (a zip of the fzp and the three svgs, named as
+    # Fritzing expects) for the part named by part_names() and return it as
+    # bytes. Each file is streamed straight in to its entry in the zip so
+    # nothing is written to disk and only the zip is ever in memory.
+
+    moduleid = names["moduleid"]
+
+    pin_order = names["pin_order"]
+
+    import zipfile
+
+    buffer = io.BytesIO()
+
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as bundle:
+
+        with bundle.open(zip_entry(fzp_filename(moduleid)), "w") as entry, \
+                io.TextIOWrapper(entry, encoding="utf-8") as stream:
+
+            write_stream(stream, generate_fzp(names, part_type, rows, columns,
+                                              pitch, pcb_type, pad_type,
+                                              color, version, compact,
+                                              precision=precision))
+
+        for svg_type in constants.VIEWS:
+
+            with bundle.open(zip_entry(svg_filename(svg_type, moduleid)),
+                             "w") as entry, \
+                    io.TextIOWrapper(entry, encoding="utf-8") as stream:
+
+                write_stream(stream, view_svg(svg_type, moduleid, part_type,
+                                              rows, columns, pitch, pcb_type,
+                                              pin_order, pad_type, color,
+                                              vectorize, instance, merge,
+                                              compact, precision))
+
+    return buffer.getvalue()
+
+
+def create_fzpz(part_type, rows, columns, pitch, pcb_type, pin_order,
+                pad_type, color, version, output_dir=None, fsync=False,
+                vectorize=False, instance=False, merge=False, compact=False,
+                precision=fixed.DIGITS):
+
+    # Create the .fzpz bundle for the part in output_dir (see write_bytes())
+    # and return its moduleid.
+
+    names = part_names(part_type, rows, columns, pitch, pcb_type, pin_order,
+                       pad_type, color, version)
+
+    if isinstance(names, str):
+
+        # Not implemented yet.
+
+        return names
+
+    fzpz = bundle_fzpz(names, part_type, rows, columns, pitch, pcb_type,
+                       pad_type, color, version, vectorize, instance, merge,
+                       compact, precision)
+
+    write_bytes(fzpz_filename(names["moduleid"]), fzpz, output_dir, fsync)
+
+    return names["moduleid"]
+
+
+# The library API, for using the factory from other Python code rather than
+# the command line: generate(PartSpec(rows=2, pitch=...)) returns the files
+# of a part as bytes without touching the filesystem, and raises exceptions
+# rather than exiting. (It isn't thread safe, make one part at a time.)
+
+
+class PartSpec(typing.NamedTuple):
+
+    # What part to make, in the same order as the spec tuples the catalog
+    # uses (so a PartSpec can be used anywhere they are.) The defaults are
+    # the command line's.
+
+    part_type: str = constants.MALE_HEADER
+    rows: int = 4
+    columns: int = 4
+    pitch: float = constants.PITCH_0_5MM
+    pcb_type: str = constants.THT
+    pin_order: str = constants.COLUMN
+    pad_type: str = constants.CIRCLE
+    color: str = constants.BRN
+
+
+class GeneratedPart(typing.NamedTuple):
+
+    # What generate() returns, the moduleid of the part and a dict of view
+    # ("fzp", "breadboard", "schematic", "pcb" or "fzpz") to its contents.
+
+    moduleid: str
+    views: dict
+
+
+# The views generate() can make, the fzp and svgs by default.
+
+PART_VIEWS = ("fzp",) + constants.VIEWS
+
+ALL_VIEWS = PART_VIEWS + ("fzpz",)
+
+
+def check_spec(spec, views=PART_VIEWS, precision=fixed.DIGITS):
+
+    # Raise ValueError if spec (a PartSpec), views or precision are wrong,
+    # or NotImplementedError if they are right but can't be made yet.
+
+    if spec.part_type not in constants.PART_TYPES.values():
+
+        raise ValueError("Unknown part type {0!r}".format(spec.part_type))
+
+    for field in ("rows", "columns"):
+
+        value = getattr(spec, field)
+
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+
+            raise ValueError("{0:s} must be an int > 0 not {1!r}".format(
+                             field, value))
+
+    if (isinstance(spec.pitch, bool)
+            or not isinstance(spec.pitch, (int, float)) or spec.pitch <= 0):
+
+        raise ValueError("pitch must be > 0 not {0!r}".format(spec.pitch))
+
+    for field, choices in (("pcb_type", constants.PCB_TYPES),
+                           ("pin_order", constants.PIN_ORDERS),
+                           ("pad_type", constants.PAD_TYPES)):
+
+        if getattr(spec, field) not in choices.values():
+
+            raise ValueError("Unknown {0:s} {1!r}".format(
+                             field, getattr(spec, field)))
+
+    if not isinstance(spec.color, str):
+
+        raise ValueError("color must be a str not {0!r}".format(spec.color))
+
+    if not valid_spec(spec):
+
+        raise ValueError("{0:s} parts can't have {1:s} pads".format(
+                         spec.pcb_type, spec.pad_type))
+
+    check_precision(precision)
+
+    # A str is a sequence too, but of characters.
+
+    if isinstance(views, str):
+
+        raise ValueError("views must be a sequence of views not the str "
+                         "{0!r}".format(views))
+
+    for view in views:
+
+        if view not in ALL_VIEWS:
+
+            raise ValueError("Unknown view {0!r}, expected one of {1:s}".format(
+                             view, ", ".join(ALL_VIEWS)))
+
+    if spec.part_type != constants.MALE_HEADER:
+
+        raise NotImplementedError("{0:s} parts are not implemented yet".format(
+                                  spec.part_type))
+
+    if spec.pad_type not in (constants.CIRCLE, constants.OBLONG):
+
+        raise NotImplementedError("{0:s} pads are not implemented yet".format(
+                                  spec.pad_type))
+
+
+def generate(spec, views=PART_VIEWS, compact=False, precision=fixed.DIGITS,
+             instance=False, merge=False, vectorize=False, parallel=False):
+
+    # Make the views (any of ALL_VIEWS) of the part spec (a PartSpec) and
+    # return them as a GeneratedPart. The other arguments are as for
+    # create_svg(), and if parallel is True the views are made at the same
+    # time with render_concurrently(). Only the views asked for are made
+    # (all of them for "fzpz".)
+
+    spec = PartSpec(*spec)
+
+    if not isinstance(views, str):
+
+        views = tuple(views)
+
+    check_spec(spec, views, precision)
+
+    if vectorize:
+
+        import partsfactory_numpy
+
+        if partsfactory_numpy.numpy is None:
+
+            raise ImportError("vectorize needs numpy to be installed")
+
+    try:
+
+        names = part_names(spec.part_type, spec.rows, spec.columns,
+                           spec.pitch, spec.pcb_type, spec.pin_order,
+                           spec.pad_type, spec.color, 1)
+
+        moduleid = names["moduleid"]
+
+        # The fzpz needs all the files, otherwise only make those wanted.
+
+        if "fzpz" in views:
+
+            wanted = PART_VIEWS
+
+        else:
+
+            wanted = [view for view in PART_VIEWS if view in views]
+
+        options = {"compresslevel": None, "compact": compact,
+                   "precision": precision, "vectorize": vectorize,
+                   "instance": instance, "merge": merge}
+
+        if parallel:
+
+            # A pool of its own, shut down before returning, rather than
+            # the view_pool the command line keeps for the next part.
+
+            import concurrent.futures
+
+            with concurrent.futures.ProcessPoolExecutor(len(wanted)) as pool:
+
+                files = dict(zip(wanted, render_concurrently(
+                                     names, spec, options, wanted, pool)))
+
+        else:
+
+            files = {view: render_file(names, spec, options, view)
+                     for view in wanted}
+
+    except SystemExit:
+
+        # Something we didn't check for above, the reason has been printed.
+
+        raise RuntimeError("Can not make {0!r}".format(spec)) from None
+
+    documents = {}
+
+    for view in views:
+
+        if view == "fzpz":
+
+            documents[view] = package_files(
+                moduleid, [files[name] for name in PART_VIEWS],
+                {"bundle": True})[0][1]
+
+        else:
+
+            documents[view] = files[view][1]
+
+    return GeneratedPart(moduleid, documents)
+
+
+def prepare_part(spec, uuid=None):
+
+    # Return the part_names() for spec, a tuple of (part_type, rows, columns,
+    # pitch, pcb_type, pin_order, pad_type, color), or None (after saying
+    # why) if it isn't a part we can make. The pad type is checked here so
+    # nothing gets written for a part that would fail at the pcb view.
+
+    (part_type, rows, columns, pitch, pcb_type, pin_order, pad_type,
+     color) = spec
+
+    names = part_names(part_type, rows, columns, pitch, pcb_type, pin_order,
+                       pad_type, color, 1, uuid)
+
+    if isinstance(names, str):
+
+        print("Error: {0:s} {1} not implemented yet ({2:s})".format(
+              part_type, spec, names), file=sys.stderr)
+
+        return None
+
+    pcb_reference_file(pad_type)
+
+    return names
+
+
+def part_file(names, spec, options, view):
+
+    # Return the (file name, lines) of view ("fzp" or one of the svg views)
+    # of the part named by names with the output settings in options.
+
+    (part_type, rows, columns, pitch, pcb_type, pin_order, pad_type,
+     color) = spec
+
+    moduleid = names["moduleid"]
+
+    pin_order = names["pin_order"]
+
+    compressed = options["compresslevel"] is not None
+
+    if view == "fzp":
+
+        return fzp_filename(moduleid, compressed), generate_fzp(
+                   names, part_type, rows, columns, pitch, pcb_type, pad_type,
+                   color, 1, options["compact"], compressed,
+                   options["precision"])
+
+    return svg_filename(view, moduleid, compressed), view_svg(
+               view, moduleid, part_type, rows, columns, pitch, pcb_type,
+               pin_order, pad_type, color, options["vectorize"],
+               options["instance"], options["merge"], options["compact"],
+               options["precision"])
+
+
+def render_file(names, spec, options, view):
+
+    # Return the part_file() for view as (file name, contents as bytes).
+
+    filename, lines = part_file(names, spec, options, view)
+
+    return filename, encode_lines(filename, lines, options["compresslevel"])
+
+
+def render_view(source, namespace, names, spec, options, view):
+
+    # The render_file() each process of render_concurrently() runs, with the
+    # uuid source and namespace of the process that asked for it. The pool
+    # may have been started (or spawned) before they were set, and the fzp's
+    # <date> depends on them (see build_time()), so they go with each view
+    # rather than being left to the pool.
+
+    set_uuid_source(source, namespace)
+
+    return render_file(names, spec, options, view)
+
+
+# The process pool render_concurrently() makes the views of a part on, made
+# when it is first needed and kept for the next part.
+
+view_pool = None
+
+
+def render_concurrently(names, spec, options, views=PART_VIEWS, pool=None):
+
+    # Return the (file name, contents as bytes) of views (by default the fzp
+    # and the three svgs) of the part named by names, as render_part() does
+    # but made at the same time, one per process, rather than one after
+    # another. They only share the moduleid (which is in names), so once
+    # that is known they can each be made on their own, and are put back in
+    # the order of views. They are made on pool (a process pool) or if that
+    # is None on view_pool.
+
+    global view_pool
+
+    if pool is None:
+
+        if view_pool is None:
+
+            import concurrent.futures
+
+            view_pool = concurrent.futures.ProcessPoolExecutor(
+                len(PART_VIEWS))
+
+        pool = view_pool
+
+    futures = [pool.submit(render_view, uuid_source, uuid_namespace, names,
+                           spec, options, view)
+               for view in views]
+
+    return [future.result() for future in futures]
+
+
+def part_bundle(names, spec, options):
+
+    # Return the .fzpz of the part named by names as bytes.
+
+    (part_type, rows, columns, pitch, pcb_type, pin_order, pad_type,
+     color) = spec
+
+    return bundle_fzpz(names, part_type, rows, columns, pitch, pcb_type,
+                       pad_type, color, 1, options["vectorize"],
+                       options["instance"], options["merge"],
+                       options["compact"], options["precision"])
+
+
+def make_part(spec, options, dirty=None):
+
+    # Create the files for one part, spec is a tuple of (part_type, rows,
+    # columns, pitch, pcb_type, pin_order, pad_type, color) and options a dict
+    # of the output settings main() collects. Return the moduleid and a list
+    # of (file name, sha256, size) of the files written, or None if the part
+    # couldn't be made (the reason has already been reported.) This is what
+    # each worker in the catalog pool runs. dirty is as for write_part().
+
+    # Each file is written a line at a time as it is generated (see
+    # stream_file()) other than with parallel views, which are made as bytes
+    # in other processes, and a bundle, which is zipped in memory (see
+    # bundle_fzpz()) before it is written.
+
+    if options["parallel_views"] or options["bundle"]:
+
+        part = render_part(spec, options)
+
+        if part is None:
+
+            return None
+
+        return write_part(part, options, dirty)
+
+    try:
+
+        names = prepare_part(spec)
+
+        if names is None:
+
+            return None
+
+        moduleid = names["moduleid"]
+
+        batch = set() if dirty is None else dirty
+
+        directory, output_dir = part_dir(moduleid, options, batch)
+
+        records = [stream_file(names, spec, options, view, directory,
+                               output_dir, batch)
+                   for view in PART_VIEWS]
+
+        if dirty is None:
+
+            fsync_dirs(batch)
+
+    except SystemExit:
+
+        # As for render_part().
+
+        return None
+
+    except OSError as e:
+
+        write_error(e)
+
+        return None
+
+    return moduleid, records
+
+
+def stream_file(names, spec, options, view, directory, output_dir, dirty):
+
+    # Write the part_file() for view in to output_dir (the part's directory,
+    # named directory relative to the output directory) a line at a time as
+    # it is generated, gzipping it on the way if there is a compresslevel,
+    # and return its (file name, sha256, size) for the manifest, taken from
+    # the bytes as they are written so the file is never in memory at once.
+
+    filename, lines = part_file(names, spec, options, view)
+
+    with atomic_file(filename, output_dir, options["fsync"], dirty) as file:
+
+        digest = DigestFile(file)
+
+        write_lines(digest, filename, lines, options["compresslevel"])
+
+    return (directory + "/" + filename if directory else filename,
+            digest.hexdigest(), digest.size)
+
+
+def file_records(files, directory=""):
+
+    # Return the (file name, sha256, size) of each (file name, contents) in
+    # files for the manifest, with the file names in directory (relative to
+    # the output directory) if there is one.
+
+    return [(directory + "/" + filename if directory else filename,
+             hashlib.sha256(data).hexdigest(), len(data))
+            for filename, data in files]
+
+
+def render_part(spec, options):
+
+    # Make the files for one part (see make_part()) but rather than writing
+    # them return the moduleid and a list of (file name, contents as bytes)
+    # for somebody else to write (or None if the part couldn't be made.)
+    # This is also the compute stage of the asyncio pipeline (see
+    # generate_catalog().)
+
+    try:
+
+        names = prepare_part(spec)
+
+        if names is None:
+
+            return None
+
+        moduleid = names["moduleid"]
+
+        if options["parallel_views"]:
+
+            # The bundle has the uncompressed files inside it.
+
+            if options["bundle"]:
+
+                files = render_concurrently(names, spec,
+                                            dict(options, compresslevel=None))
+
+                return moduleid, package_files(moduleid, files, options)
+
+            return moduleid, render_concurrently(names, spec, options)
+
+        if options["bundle"]:
+
+            return moduleid, [(fzpz_filename(moduleid),
+                               part_bundle(names, spec, options))]
+
+        return moduleid, [render_file(names, spec, options, view)
+                          for view in PART_VIEWS]
+
+    except SystemExit:
+
+        # One of the create functions found something wrong with the spec
+        # and has already said what, carry on with the rest of the catalog.
+
+        return None
+
+
+# The color and uuid the base part of a group of color variants is made with
+# (see render_variants().) Each variant's color and uuid are spliced in over
+# them so they are the same length as the real ones, and chosen so they
+# won't turn up anywhere else in a part.
+
+VARIANT_COLOR = "#0f1e2d"
+
+VARIANT_UUID = "0f1e2d3c4b5a69788796a5b4c3d2e1f0"
+
+
+def color_groups(specs):
+
+    # Generate lists of the consecutive specs in specs that only differ by
+    # color (as the catalog makes them, color is the last thing to change.)
+
+    for base, group in itertools.groupby(specs, key=lambda spec: spec[:-1]):
+
+        yield list(group)
+
+
+def find_all(data, text):
+
+    # Return the offsets of every occurrence of text in data.
+
+    offsets = []
+
+    offset = data.find(text)
+
+    while offset != -1:
+
+        offsets.append(offset)
+
+        offset = data.find(text, offset + len(text))
+
+    return offsets
+
+
+def render_variants(specs, options):
+
+    # Return [(spec, render_part(spec, options))] for specs, a group of specs
+    # that only differ by color (see color_groups().) Rather than making each
+    # of them the part is made once with VARIANT_COLOR and VARIANT_UUID,
+    # the offsets of those in each file are found and then each variant is
+    # made by copying the files and writing its color and a new uuid over
+    # them at those offsets. The colors only change the outline fill and the
+    # fzp names and properties so the files are the same as rendering each
+    # one, except that zips and gzips are made from the finished bytes. With
+    # merge (which merges paths by fill, so the color can change what is
+    # merged) or colors of another length each variant is made in full.
+
+    color_size = len(VARIANT_COLOR)
+
+    if not splice_variants(specs, options):
+
+        return [(spec, render_part(spec, options)) for spec in specs]
+
+    base_spec = specs[0][:-1] + (VARIANT_COLOR,)
+
+    # The bundle has the uncompressed names inside it.
+
+    file_options = dict(options)
+
+    if options["bundle"]:
+
+        file_options["compresslevel"] = None
+
+    try:
+
+        names = prepare_part(base_spec, VARIANT_UUID)
+
+        if names is None:
+
+            return [(spec, None) for spec in specs]
+
+        templates = [variant_file(names, base_spec, file_options, view)
+                     for view in PART_VIEWS]
+
+    except SystemExit:
+
+        return [(spec, None) for spec in specs]
+
+    parts = []
+
+    for spec in specs:
+
+        color = spec[-1].encode("ascii")
+
+        uuid = part_uuid(spec, 1)
+
+        files = []
+
+        for filename, data, color_offsets, uuid_offsets in templates:
+
+            data = bytearray(data)
+
+            for offset in color_offsets:
+
+                data[offset:offset + color_size] = color
+
+            for offset in uuid_offsets:
+
+                data[offset:offset + len(VARIANT_UUID)] = uuid.encode("ascii")
+
+            files.append((filename.replace(VARIANT_COLOR, spec[-1]).replace(
+                              VARIANT_UUID, uuid), bytes(data)))
+
+        moduleid = names["moduleid"].replace(VARIANT_COLOR, spec[-1]).replace(
+                       VARIANT_UUID, uuid)
+
+        parts.append((spec, (moduleid, package_files(moduleid, files,
+                                                     options))))
+
+    return parts
+
+
+def splice_variants(specs, options):
+
+    # Whether render_variants() makes the group specs by splicing (see
+    # there) rather than making each in full.
+
+    return (len(specs) > 1 and not options["merge"]
+            and all(len(spec[-1]) == len(VARIANT_COLOR) for spec in specs))
+
+
+def variant_file(names, spec, options, view):
+
+    # Return the file for view of the base part of render_variants() as
+    # (file name, contents as bytes (never compressed), offsets of
+    # VARIANT_COLOR, offsets of VARIANT_UUID.)
+
+    filename, lines = part_file(names, spec, options, view)
+
+    data = encode_lines(filename, lines)
+
+    return (filename, data, find_all(data, VARIANT_COLOR.encode("ascii")),
+            find_all(data, VARIANT_UUID.encode("ascii")))
+
+
+def package_files(moduleid, files, options):
+
+    # Return the files (a list of (file name, contents)) of a part as they
+    # are to be written: zipped in to a .fzpz for a bundle, gzipped if there
+    # is a compresslevel or as they are.
+
+    if options["bundle"]:
+
+        import zipfile
+
+        buffer = io.BytesIO()
+
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as bundle:
+
+            for filename, data in files:
+
+                bundle.writestr(zip_entry(filename), data)
+
+        return [(fzpz_filename(moduleid), buffer.getvalue())]
+
+    if options["compresslevel"] is not None:
+
+        return [(filename, gzip_bytes(filename, data,
+                                      options["compresslevel"]))
+                for filename, data in files]
+
+    return files
+
+
+def make_variants(specs, options):
+
+    # The make_part() of render_variants(), make and write a group of specs
+    # that only differ by color and return [(spec, part)] with part as
+    # make_part() returns it.
+
+    parts = []
+
+    # Flush the directories once for the whole group.
+
+    dirty = set()
+
+    if not splice_variants(specs, options):
+
+        # Nothing to share, so make each of them as make_part() does.
+
+        parts = [(spec, make_part(spec, options, dirty)) for spec in specs]
+
+    else:
+
+        for spec, part in render_variants(specs, options):
+
+            if part is not None:
+
+                part = write_part(part, options, dirty)
+
+            parts.append((spec, part))
+
+    try:
+
+        fsync_dirs(dirty)
+
+    except OSError as e:
+
+        # The parts may not have made it to disk after all.
+
+        write_error(e)
+
+        return [(spec, None) for spec, part in parts]
+
+    return parts
+
+
+def write_part(part, options, dirty=None):
+
+    # Write the files of a part from render_part() and return the moduleid
+    # and the file_records() (or None if they couldn't be written.) With the
+    # sharded layout the files go in the part's shard_dir() rather than in
+    # the output directory itself. They are all in the same directory with
+    # the names they have in a .fzpz, so the fzp's <layers image=...> still
+    # finds the svgs. With fsync the directories are flushed once the part
+    # is written, or if dirty (a set) isn't None added to it for the caller
+    # to fsync_dirs() once it has written a batch of parts.
+
+    moduleid, files = part
+
+    batch = set() if dirty is None else dirty
+
+    try:
+
+        directory, output_dir = part_dir(moduleid, options, batch)
+
+        for filename, data in files:
+
+            # breakpoint()
+
+            write_bytes(filename, data, output_dir, options["fsync"], batch)
+
+        if dirty is None:
+
+            fsync_dirs(batch)
+
+    except OSError as e:
+
+        write_error(e)
+
+        return None
+
+    return moduleid, file_records(files, directory)
+
+
+def part_dir(moduleid, options, dirty):
+
+    # Return the directory the files of moduleid go in, as (path relative to
+    # the output directory, "" for the output directory itself, and path to
+    # write to), making the shard directory with the sharded layout.
+
+    if not options["shard"]:
+
+        return "", options["output_dir"]
+
+    directory = shard_dir(moduleid)
+
+    return directory, make_shard(options["output_dir"], directory,
+                                 options["fsync"], dirty)
+
+
+def make_shard(output_dir, directory, fsync, dirty):
+
+    # Make the shard directory (from shard_dir()) in output_dir if it isn't
+    # there already and return its path. A new directory is only on disk
+    # once the directory it is in is flushed, so with fsync add those to
+    # dirty.
+
+    path = os.path.join(output_dir or ".", *directory.split("/"))
+
+    if os.path.isdir(path):
+
+        return path
+
+    os.makedirs(path, exist_ok=True)
+
+    if fsync:
+
+        parts = directory.split("/")
+
+        for level in range(len(parts)):
+
+            dirty.add(os.path.join(output_dir or ".", *parts[:level]))
+
+    return path
+
+
+def write_error(e):
+
+    # Report an error writing a file.
+
+    print("\nError: Can not write file\n\n\'{0}\'\n\n{1} ({2})\n".format(
+          e.filename, e.strerror, e.errno), file=sys.stderr)
+
+
+def valid_spec(spec):
+
+    # Return False for the combinations create_pcb_pin() rejects (SMD parts
+    # must have RECTANGLE pads and THT parts must not) so a sweep over all
+    # the pad types doesn't try to make them.
+
+    pcb_type = spec[4]
+
+    pad_type = spec[6]
+
+    return ((pcb_type == constants.SMD) == (pad_type == constants.RECTANGLE))
+
+
+def catalog_specs(part_types, rows, columns, pitches, pcb_types, pin_orders,
+                  pad_types, colors):
+
+    # Generate the spec of every valid part in the catalog, the cartesian
+    # product of the parameter lists, one at a time rather than building
+    # the (possibly very long) list.
+
+    for spec in itertools.product(part_types, rows, columns, pitches,
+                                  pcb_types, pin_orders, pad_types, colors):
+
+        if valid_spec(spec):
+
+            yield spec
+
+
+def run_catalog(specs, options, jobs, done=None):
+
+    # Make every part in specs, jobs at a time on a pool of processes (or in
+    # this process if jobs is 1), and return the number of parts made and
+    # the number that failed. The specs that only differ by color are made
+    # together by make_variants(). Only a few groups per job are submitted
+    # ahead of the workers so the specs are still only expanded as they are
+    # needed. If done isn't None it is called with each spec and what
+    # make_part() returned for it as they finish.
+
+    counts = {"made": 0, "failed": 0}
+
+    groups = color_groups(specs)
+
+    if jobs == 1:
+
+        for group in groups:
+
+            for spec, part in make_variants(group, options):
+
+                part_done(spec, part, counts, done)
+
+        return counts["made"], counts["failed"]
+
+    import concurrent.futures
+
+    with concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=set_uuid_source,
+            initargs=(uuid_source, uuid_namespace)) as executor:
+
+        pending = set()
+
+        for group in groups:
+
+            pending.add(executor.submit(make_variants, group, options))
+
+            if len(pending) < jobs * 4:
+
+                continue
+
+            finished, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in finished:
+
+                for spec, part in future.result():
+
+                    part_done(spec, part, counts, done)
+
+        for future in concurrent.futures.as_completed(pending):
+
+            for spec, part in future.result():
+
+                part_done(spec, part, counts, done)
+
+    return counts["made"], counts["failed"]
+
+
+def part_done(spec, part, counts, done):
+
+    # Count a finished part as made or failed and pass it on to done.
+
+    if part is None:
+
+        counts["failed"] += 1
+
+    else:
+
+        counts["made"] += 1
+
+    if done is not None:
+
+        done(spec, part)
+
+
+async def generate_catalog(specs, options, jobs, writers=4, done=None):
+
+    # The asyncio version of run_catalog(), for when writing is slow (such
+    # as to a network drive) and should overlap with the generating. It is
+    # three stages joined by bounded queues so a fast stage waits for a slow
+    # one rather than filling memory: produce_specs() feeds the specs (in
+    # color_groups()) to jobs copies of render_specs() which run
+    # render_variants() on an executor (a process pool if jobs > 1) and hand
+    # the files to writers copies of write_parts() which write them on
+    # threads. Returns the number of
+    # parts made and the number that failed, calling done (if it isn't
+    # None) as run_catalog() does. asyncio is only imported (here and in the
+    # stages) when --async asks for it as it is slow to import.
+
+    import asyncio
+    import concurrent.futures
+
+    spec_queue = asyncio.Queue(jobs * 4)
+
+    part_queue = asyncio.Queue(jobs * 4)
+
+    counts = {"made": 0, "failed": 0}
+
+    if jobs > 1:
+
+        executor = concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=set_uuid_source,
+            initargs=(uuid_source, uuid_namespace))
+
+    else:
+
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+
+    with executor:
+
+        renderers = [asyncio.create_task(render_specs(
+                         spec_queue, part_queue, executor, options))
+                     for job in range(jobs)]
+
+        outputs = [asyncio.create_task(write_parts(part_queue, options,
+                                                   counts, done))
+                   for writer in range(writers)]
+
+        await produce_specs(specs, spec_queue, jobs)
+
+        await asyncio.gather(*renderers)
+
+        # Then tell the writers there is no more to come.
+
+        for writer in range(writers):
+
+            await part_queue.put(None)
+
+        await asyncio.gather(*outputs)
+
+    return counts["made"], counts["failed"]
+
+
+async def produce_specs(specs, spec_queue, jobs):
+
+    # The first stage, queue each group of color variants followed by a None
+    # for each render_specs() to say there are no more.
+
+    for group in color_groups(specs):
+
+        await spec_queue.put(group)
+
+    for job in range(jobs):
+
+        await spec_queue.put(None)
+
+
+async def render_specs(spec_queue, part_queue, executor, options):
+
+    # The second stage, render_variants() each group on the executor and
+    # queue the parts (None for a failure) for the writers.
+
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+
+    while True:
+
+        group = await spec_queue.get()
+
+        if group is None:
+
+            return
+
+        parts = await loop.run_in_executor(executor, render_variants, group,
+                                           options)
+
+        for spec, part in parts:
+
+            await part_queue.put((spec, part))
+
+
+async def write_parts(part_queue, options, counts, done):
+
+    # The last stage, write the files of each part (on a thread so the event
+    # loop carries on) and count the parts made and failed.
+
+    import asyncio
+
+    while True:
+
+        item = await part_queue.get()
+
+        if item is None:
+
+            return
+
+        spec, part = item
+
+        if part is not None:
+
+            part = await asyncio.to_thread(write_part, part, options)
+
+        part_done(spec, part, counts, done)
+
+
+# The options that change the files made for a spec or where they go
+# (vectorize, output_dir and fsync don't) and so are part of its key in the manifest.
+
+MANIFEST_OPTIONS = ("bundle", "compresslevel", "compact", "precision",
+                    "instance", "merge", "shard")
+
+
+def spec_key(spec, options):
+
+    # Return the manifest key for spec, a hash of the spec, the options that
+    # change its files and the generator version (so a new version remakes
+    # everything.) In deterministic mode the namespace and the time (see
+    # build_time()) change the moduleid and the <date> so they are in it too,
+    # and as they are only added then a random uuid part keeps its key.
+
+    settings = {name: options[name] for name in MANIFEST_OPTIONS}
+
+    if uuid_source == "deterministic":
+
+        settings["deterministic"] = [uuid_namespace,
+                                     build_time().timestamp()]
+
+    text = json.dumps([version, list(spec), settings], sort_keys=True)
+
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_manifest(output_dir):
+
+    # Read the manifest of what is in output_dir, which maps each spec_key()
+    # to the spec, its moduleid and its files (with their sha256 and size.)
+    # No manifest (or one in an older layout) is an empty one.
+
+    empty = {"format": constants.MANIFEST_FORMAT, "parts": {}}
+
+    try:
+
+        with open(os.path.join(output_dir, constants.MANIFEST_FILE),
+                  encoding="utf-8") as file:
+
+            manifest = json.load(file)
+
+    except FileNotFoundError:
+
+        return empty
+
+    except (OSError, ValueError) as e:
+
+        print("Error: Can not read the manifest in {0:s} ({1})".format(
+              output_dir, e), file=sys.stderr)
+
+        exit(1)
+
+    if manifest.get("format") != constants.MANIFEST_FORMAT:
+
+        return empty
+
+    return manifest
+
+
+def write_manifest(output_dir, manifest, fsync=False):
+
+    # Write the manifest to output_dir (atomically like the parts.)
+
+    write_bytes(constants.MANIFEST_FILE,
+                json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"),
+                output_dir, fsync)
+
+
+def outputs_intact(entry, output_dir):
+
+    # Return True if all of the files of a manifest entry are still in
+    # output_dir at the size they were written. Only the size is checked
+    # (reading every file to check its hash would take as long as making
+    # it again.)
+
+    for filename, record in entry["files"].items():
+
+        try:
+
+            size = os.path.getsize(os.path.join(output_dir, filename))
+
+        except OSError:
+
+            return False
+
+        if size != record["size"]:
+
+            return False
+
+    return True
+
+
+def changed_specs(specs, options, manifest, seen, counts):
+
+    # Generate the specs that need making, skipping (and counting) those
+    # with an entry in the manifest whose files are intact. The key of every
+    # spec is added to seen for prune_manifest().
+
+    output_dir = options["output_dir"]
+
+    for spec in specs:
+
+        key = spec_key(spec, options)
+
+        seen.add(key)
+
+        entry = manifest["parts"].get(key)
+
+        if entry is not None and outputs_intact(entry, output_dir):
+
+            counts["skipped"] += 1
+
+            continue
+
+        yield spec
+
+
+def update_manifest(manifest, options, spec, part):
+
+    # Record a part make_part() has made in the manifest, removing any files
+    # an earlier version of it left behind. A part that failed keeps what it
+    # had.
+
+    if part is None:
+
+        return
+
+    moduleid, records = part
+
+    key = spec_key(spec, options)
+
+    files = {filename: {"sha256": sha256, "size": size}
+             for filename, sha256, size in records}
+
+    old = manifest["parts"].get(key)
+
+    if old is not None:
+
+        remove_outputs(options["output_dir"],
+                       [filename for filename in old["files"]
+                        if filename not in files])
+
+    manifest["parts"][key] = {"spec": list(spec), "moduleid": moduleid,
+                              "files": files}
+
+
+def prune_manifest(manifest, output_dir, seen):
+
+    # Remove the files (and entries) of the parts in the manifest whose
+    # spec isn't in seen (the current catalog) and return how many there
+    # were. A file a part that is kept also has isn't removed, as with a
+    # deterministic moduleid a spec remade with other options (so with
+    # another key) has the same file names.
+
+    dropped = [key for key in manifest["parts"] if key not in seen]
+
+    dropped_files = [manifest["parts"].pop(key)["files"] for key in dropped]
+
+    kept = {filename for entry in manifest["parts"].values()
+            for filename in entry["files"]}
+
+    for files in dropped_files:
+
+        remove_outputs(output_dir, [filename for filename in files
+                                    if filename not in kept])
+
+    return len(dropped)
+
+
+def remove_outputs(output_dir, filenames):
+
+    # Remove filenames from output_dir, ignoring any already gone.
+
+    for filename in filenames:
+
+        try:
+
+            os.remove(os.path.join(output_dir, filename))
+
+        except FileNotFoundError:
+
+            pass
+
+
+def read_index(output_dir):
+
+    # Read the index of the sharded layout in output_dir, which maps each
+    # moduleid to the path of its fzp (or .fzpz) relative to output_dir. No
+    # index (or one in an older layout) is an empty one.
+
+    empty = {"format": constants.INDEX_FORMAT, "parts": {}}
+
+    try:
+
+        with open(os.path.join(output_dir, constants.INDEX_FILE),
+                  encoding="utf-8") as file:
+
+            index = json.load(file)
+
+    except FileNotFoundError:
+
+        return empty
+
+    except (OSError, ValueError) as e:
+
+        print("Error: Can not read the index in {0:s} ({1})".format(
+              output_dir, e), file=sys.stderr)
+
+        exit(1)
+
+    if index.get("format") != constants.INDEX_FORMAT:
+
+        return empty
+
+    return index
+
+
+def write_index(output_dir, index, fsync=False):
+
+    # Write the index to output_dir (atomically like the parts.)
+
+    write_bytes(constants.INDEX_FILE,
+                json.dumps(index, indent=1, sort_keys=True).encode("utf-8"),
+                output_dir, fsync)
+
+
+def update_index(index, part):
+
+    # Record where a part make_part() has made went in the index (the first
+    # of its files is the fzp, or the .fzpz for a bundle.)
+
+    if part is None:
+
+        return
+
+    moduleid, records = part
+
+    index["parts"][moduleid] = records[0][0]
+
+
+def manifest_index(manifest):
+
+    # Return the index of the parts in the manifest, which with --incremental
+    # is everything in the output directory.
+
+    index = {"format": constants.INDEX_FORMAT, "parts": {}}
+
+    for entry in manifest["parts"].values():
+
+        # The fzp's name ("part.") sorts before the svgs' ("svg.")
+
+        index["parts"][entry["moduleid"]] = min(entry["files"])
+
+    return index
+
+
+def parse_numbers(option, text):
+
+    # Convert a list of numbers and ranges such as "1,2,5-8" to a list of
+    # ints (1, 2, 5, 6, 7, 8).
+
+    numbers = []
+
+    try:
+
+        for item in text.split(","):
+
+            first, separator, last = item.partition("-")
+
+            if separator:
+
+                numbers.extend(range(int(first), int(last) + 1))
+
+            else:
+
+                numbers.append(int(first))
+
+    except ValueError:
+
+        print("Error: {0:s} needs numbers or ranges such as 1,2,5-8 not "
+              "{1:s}".format(option, text), file=sys.stderr)
+
+        exit(1)
+
+    if not numbers or min(numbers) < 1:
+
+        print("Error: {0:s} values must be > 0".format(option),
+              file=sys.stderr)
+
+        exit(1)
+
+    return numbers
+
+
+def parse_names(option, text, choices, prefix=""):
+
+    # Convert a list of constant names such as "THT,SMD" (or "all") to a list
+    # of their values from choices. The names are not case sensitive and
+    # prefix (such as the PITCH_ of the pitch names) is optional.
+
+    if text.lower() == "all":
+
+        return list(choices.values())
+
+    values = []
+
+    for name in text.split(","):
+
+        key = name.upper()
+
+        if prefix and key.startswith(prefix):
+
+            key = key[len(prefix):]
+
+        if key not in choices:
+
+            print("Error: unknown {0:s} value {1:s}, expected one of "
+                  "{2:s} or all".format(option, name, ",".join(choices)),
+                  file=sys.stderr)
+
+            exit(1)
+
+        values.append(choices[key])
+
+    return values
+
+
+# The fields of a part spec the server takes (in the query or a JSON object)
+# and their defaults, the same as the command line's.
+
+SPEC_FIELDS = {"part": "MALE_HEADER", "rows": 4, "columns": 4,
+               "pitch": "0_5MM", "pcb": "THT", "pad": "CIRCLE",
+               "order": "COLUMN", "color": "BRN", "compact": False,
+               "precision": fixed.DIGITS, "instance": False, "merge": False,
+               "view": "fzpz"}
+
+# What the server returns for each view.
+
+VIEW_TYPES = {"fzpz": "application/zip", "fzp": "application/xml",
+              constants.BREADBOARD: "image/svg+xml",
+              constants.SCHEMATIC: "image/svg+xml",
+              constants.PCB: "image/svg+xml"}
+
+
+def request_spec(fields):
+
+    # Convert the fields of a request (a dict of the SPEC_FIELDS given) to
+    # the canonical (spec, options) of the part and the view wanted. Raise
+    # ValueError (with a message for the client) for anything wrong.
+
+    unknown = set(fields) - set(SPEC_FIELDS)
+
+    if unknown:
+
+        raise ValueError("unknown field(s) {0:s}".format(
+                         ", ".join(sorted(unknown))))
+
+    values = dict(SPEC_FIELDS, **fields)
+
+    def choice(field, choices, prefix=""):
+
+        key = str(values[field]).upper()
+
+        if prefix and key.startswith(prefix):
+
+            key = key[len(prefix):]
+
+        if key not in choices:
+
+            raise ValueError("{0:s} must be one of {1:s}".format(
+                             field, ",".join(choices)))
+
+        return choices[key]
+
+    def number(field, low, high):
+
+        # A whole number, from the query string or JSON, but not a bool or a
+        # float (which int() would quietly truncate.)
+
+        value = values[field]
+
+        if isinstance(value, str) and value.strip().lstrip("+-").isdecimal():
+
+            value = int(value)
+
+        if isinstance(value, bool) or not isinstance(value, int):
+
+            raise ValueError("{0:s} must be a whole number".format(field))
+
+        if not low <= value <= high:
+
+            raise ValueError("{0:s} must be {1:d} to {2:d}".format(
+                             field, low, high))
+
+        return value
+
+    def flag(field):
+
+        value = values[field]
+
+        if isinstance(value, str):
+
+            return value.lower() in ("1", "true", "yes", "on")
+
+        return bool(value)
+
+    spec = (choice("part", constants.PART_TYPES),
+            number("rows", 1, 1000),
+            number("columns", 1, 1000),
+            choice("pitch", constants.PITCHES, "PITCH_"),
+            choice("pcb", constants.PCB_TYPES),
+            choice("order", constants.PIN_ORDERS),
+            choice("pad", constants.PAD_TYPES),
+            choice("color", constants.COLORS))
+
+    options = {"bundle": False, "compresslevel": None,
+               "compact": flag("compact"),
+               "precision": number("precision", 0, fixed.DIGITS),
+               "vectorize": False, "instance": flag("instance"),
+               "merge": flag("merge"), "parallel_views": False}
+
+    view = str(values["view"]).lower()
+
+    if view not in VIEW_TYPES:
+
+        raise ValueError("view must be one of {0:s}".format(
+                         ",".join(VIEW_TYPES)))
+
+    # The same checks as the library API, such as SMD parts only having
+    # RECTANGLE pads, so nothing gets as far as exiting part way through.
+
+    try:
+
+        check_spec(PartSpec(*spec), precision=options["precision"])
+
+    except NotImplementedError as e:
+
+        raise ValueError(str(e))
+
+    return spec, options, view
+
+
+def render_views(spec, options):
+
+    # Render a part for the server and return its moduleid and a dict of
+    # view (fzp, the svg views and fzpz) to contents, or None if the part
+    # can't be made.
+
+    part = render_part(spec, options)
+
+    if part is None:
+
+        return None
+
+    moduleid, files = part
+
+    views = {"fzp": files[0][1]}
+
+    for svg_type, (filename, data) in zip(constants.VIEWS, files[1:]):
+
+        views[svg_type] = data
+
+    views["fzpz"] = package_files(moduleid, files,
+                                  dict(options, bundle=True))[0][1]
+
+    return moduleid, views
+
+
+class PartCache:
+
+    # A least recently used cache of rendered parts (as render_views()
+    # returns them) that holds at most max_bytes of them, keyed by the
+    # canonical (spec, options) of the part.
+
+    def __init__(self, max_bytes):
+
+        self.max_bytes = max_bytes
+
+        self.size = 0
+
+        self.parts = collections.OrderedDict()
+
+        self.lock = threading.Lock()
+
+    def get(self, key):
+
+        # Return the part for key (and make it the most recently used) or
+        # None.
+
+        with self.lock:
+
+            part = self.parts.get(key)
+
+            if part is not None:
+
+                self.parts.move_to_end(key)
+
+            return part
+
+    def put(self, key, part):
+
+        # Add part, dropping the least recently used parts to make room. A
+        # part bigger than the whole cache isn't kept.
+
+        size = sum(len(data) for data in part[1].values())
+
+        with self.lock:
+
+            if key in self.parts or size > self.max_bytes:
+
+                return
+
+            self.parts[key] = part
+
+            self.size += size
+
+            while self.size > self.max_bytes:
+
+                old_key, old_part = self.parts.popitem(last=False)
+
+                self.size -= sum(len(data) for data in old_part[1].values())
+
+
+class PartRequestHandler:
+
+    # Serve GET /part?rows=2&pitch=0_1IN&view=breadboard... and POST /part
+    # with the same fields as a JSON object (see SPEC_FIELDS.) serve() mixes
+    # it in to an http.server.BaseHTTPRequestHandler, so http.server is
+    # only imported when serving.
+
+    # Set by serve().
+
+    cache = None
+
+    parallel_views = False
+
+    # Rendering uses module globals (the precision and the numpy grid) so
+    # only one request renders at a time, cached parts don't wait.
+
+    render_lock = threading.Lock()
+
+    def do_GET(self):
+
+        url = urllib.parse.urlsplit(self.path)
+
+        if url.path != "/part":
+
+            self.send_error(404, "Only /part is served")
+
+            return
+
+        fields = {}
+
+        for field, value in urllib.parse.parse_qsl(url.query,
+                                                   keep_blank_values=True):
+
+            fields[field] = value
+
+        self.send_part(fields)
+
+    def do_POST(self):
+
+        if urllib.parse.urlsplit(self.path).path != "/part":
+
+            self.send_error(404, "Only /part is served")
+
+            return
+
+        try:
+
+            length = int(self.headers.get("Content-Length", 0))
+
+            if length < 0:
+
+                # rfile.read() would read until the client hangs up.
+
+                self.send_error(400, "Bad Content-Length")
+
+                return
+
+            fields = json.loads(self.rfile.read(length) or b"{}")
+
+        except ValueError:
+
+            self.send_error(400, "The body must be a JSON object")
+
+            return
+
+        if not isinstance(fields, dict):
+
+            self.send_error(400, "The body must be a JSON object")
+
+            return
+
+        self.send_part(fields)
+
+    def send_part(self, fields):
+
+        # Send the view of the part fields asks for, from the cache if it is
+        # there.
+
+        try:
+
+            spec, options, view = request_spec(fields)
+
+        except ValueError as e:
+
+            self.send_error(400, str(e))
+
+            return
+
+        key = (spec, tuple(sorted(options.items())))
+
+        part = self.cache.get(key)
+
+        if part is None:
+
+            with self.render_lock:
+
+                part = self.cache.get(key)
+
+                if part is None:
+
+                    try:
+
+                        part = render_views(spec, dict(
+                            options, parallel_views=self.parallel_views))
+
+                    except Exception:
+
+                        # A bug rather than a bad request, say so rather
+                        # than dropping the connection.
+
+                        logging.getLogger(__name__).exception(
+                            "Rendering %r failed", (spec, options))
+
+                        self.send_error(500, "The part couldn't be made")
+
+                        return
+
+                    if part is None:
+
+                        self.send_error(501, "That part can't be made yet")
+
+                        return
+
+                    self.cache.put(key, part)
+
+        moduleid, views = part
+
+        data = views[view]
+
+        etag = "\"{0:s}\"".format(hashlib.sha256(data).hexdigest()[:32])
+
+        if etag in [tag.strip() for tag in
+                    self.headers.get("If-None-Match", "").split(",")]:
+
+            self.send_response(304)
+
+            self.send_header("ETag", etag)
+
+            self.end_headers()
+
+            return
+
+        if view == "fzpz":
+
+            filename = fzpz_filename(moduleid)
+
+        elif view == "fzp":
+
+            filename = fzp_filename(moduleid)
+
+        else:
+
+            filename = svg_filename(view, moduleid)
+
+        self.send_response(200)
+
+        self.send_header("Content-Type", VIEW_TYPES[view])
+
+        self.send_header("Content-Length", str(len(data)))
+
+        self.send_header("ETag", etag)
+
+        self.send_header("Content-Disposition",
+                         "attachment; filename=\"{0:s}\"".format(
+                             filename.replace("\"", "")))
+
+        self.end_headers()
+
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+
+        # Log the requests rather than printing them.
+
+        logging.getLogger(__name__).info(format % args)
+
+
+def serve(port=8080, cache_bytes=64 * 1024 * 1024, parallel_views=False):
+
+    # Serve parts over HTTP on localhost (only) port until interrupted,
+    # caching up to cache_bytes of rendered parts (making the views of each
+    # at the same time if parallel_views is True.)
+
+    import http.server
+
+    class Handler(PartRequestHandler, http.server.BaseHTTPRequestHandler):
+
+        pass
+
+    Handler.cache = PartCache(cache_bytes)
+
+    Handler.parallel_views = parallel_views
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+
+    print("Serving parts on http://127.0.0.1:{0:d}/part".format(
+          server.server_address[1]), file=sys.stderr)
+
+    try:
+
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+
+        pass
+
+    finally:
+
+        server.server_close()
+
+
+def serve_main(argv):
+
+    # The command line of the serve command.
+
+    port = 8080
+
+    cache_size = 64
+
+    parallel_views = False
+
+    try:
+
+        opts, args = getopt.getopt(argv, "p:h", ["port=", "cache-size=",
+                                                 "parallel-views", "help"])
+
+    except getopt.GetoptError as e:
+
+        print("Error: {0}\n".format(e), file=sys.stderr)
+
+        usage()
+
+        exit(1)
+
+    for opt, arg in opts:
+
+        if opt in ("-h", "--help"):
+
+            usage()
+
+            exit(0)
+
+        if opt == "--parallel-views":
+
+            parallel_views = True
+
+            continue
+
+        if not arg.isdigit():
+
+            print("Error: {0:s} must be a number".format(opt),
+                  file=sys.stderr)
+
+            exit(1)
+
+        if opt in ("-p", "--port"):
+
+            port = int(arg)
+
+        else:
+
+            cache_size = int(arg)
+
+    serve(port, cache_size * 1024 * 1024, parallel_views)
+
+
+# Tracing. Rather than checking whether tracing is on in the functions that
+# are called for every coordinate (which would cost even when it is off),
+# enable_tracing() replaces them (as module globals, which is how everything
+# calls them) with wrappers that count the calls, and the stages of making
+# a part with wrappers that time them. Off, nothing is wrapped so it costs
+# nothing at all.
+
+# The functions called per pin or per coordinate to count.
+
+TRACED_CALLS = ("s_x", "s_y", "s_r_y", "pin_template", "create_pin",
+                "create_male_breadboard_pin", "create_female_breadboard_pin",
+                "create_breadboard_pin_body", "create_breadboard_pin_use",
+                "create_male_schematic_pin", "create_pcb_pin", "male_outline",
+                "male_pinleft", "male_pintop", "male_pinright",
+                "male_pinbottom", "male_pinconnector", "male_pin_no",
+                "male_line1", "male_line2", "male_line3", "male_pin",
+                "male_terminal", "female_outline", "female_pinleft",
+                "female_pintop", "female_pinright", "female_pinbottom",
+                "female_pinconnector")
+
+# The stages of making a part to time, those taking a view are timed per
+# view. Each stage's time is its own, without the stages it calls (or the
+# generators it consumes), so the times add up to the time spent making the
+# parts, and a stage calling itself (such as create_svg() at another
+# precision) is one call of it.
+
+TRACED_STAGES = ("make_part", "render_part", "write_part", "part_names",
+                 "generate_fzp", "create_svg", "generate_svg", "svg_header",
+                 "pin_positions", "svg_footer", "coalesce_paths",
+                 "encode_lines", "stream_file", "package_files",
+                 "write_bytes")
+
+# The counts and timers (stage: [calls, seconds]) while tracing is on, and
+# (per thread) the stack of [function name, seconds spent in stages it
+# called, start] of the stages running.
+
+trace_counts = collections.Counter()
+
+trace_timers = {}
+
+trace_lock = threading.Lock()
+
+trace_stack = threading.local()
+
+
+def counted(function):
+
+    # Return function wrapped to count its calls in trace_counts.
+
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+
+        trace_counts[name] += 1
+
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+def add_time(stage, seconds):
+
+    # Add a call taking seconds to the timer of stage.
+
+    with trace_lock:
+
+        timer = trace_timers.setdefault(stage, [0, 0.0])
+
+        timer[0] += 1
+
+        timer[1] += seconds
+
+
+def enter_stage(name):
+
+    # Start timing a stage of the function name, unless it is already
+    # running (in this thread) in which case return None as the outer call
+    # is timing it.
+
+    stack = getattr(trace_stack, "stages", None)
+
+    if stack is None:
+
+        stack = trace_stack.stages = []
+
+    for frame in stack:
+
+        if frame[0] == name:
+
+            return None
+
+    frame = [name, 0.0, time.perf_counter()]
+
+    stack.append(frame)
+
+    return frame
+
+
+def leave_stage(frame):
+
+    # Stop timing the stage enter_stage() started and return the time spent
+    # in it less that spent in the stages it called, adding all of it to
+    # the time of the stage that called it.
+
+    elapsed = time.perf_counter() - frame[2]
+
+    stack = trace_stack.stages
+
+    stack.pop()
+
+    if stack:
+
+        stack[-1][1] += elapsed
+
+    return elapsed - frame[1]
+
+
+def timed(function):
+
+    # Return function wrapped to time its calls in trace_timers. The work of
+    # a function returning a generator is done as the generator is run, so
+    # that is timed instead.
+
+    import inspect
+
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+
+        frame = enter_stage(name)
+
+        if frame is None:
+
+            return function(*args, **kwargs)
+
+        try:
+
+            result = function(*args, **kwargs)
+
+        finally:
+
+            elapsed = leave_stage(frame)
+
+        stage = stage_name(name, args)
+
+        if inspect.isgenerator(result):
+
+            return timed_generator(name, stage, result, elapsed)
+
+        add_time(stage, elapsed)
+
+        return result
+
+    return wrapper
+
+
+def timed_generator(name, stage, generator, elapsed):
+
+    # Run generator (of the function name) adding the time spent in it (but
+    # not in whatever is consuming it, or the stages it runs) to elapsed,
+    # and that to the timer of stage once done.
+
+    try:
+
+        while True:
+
+            frame = enter_stage(name)
+
+            try:
+
+                item = next(generator)
+
+            except StopIteration:
+
+                return
+
+            finally:
+
+                if frame is not None:
+
+                    elapsed += leave_stage(frame)
+
+            yield item
+
+    finally:
+
+        add_time(stage, elapsed)
+
+
+def enable_tracing(output=None):
+
+    # Turn tracing on (for this process) and dump the results as JSON at
+    # exit, to the file output or if that is None to trace_logger.
+
+    module = sys.modules[__name__]
+
+    for name in TRACED_CALLS:
+
+        setattr(module, name, counted(getattr(module, name)))
+
+    for name in TRACED_STAGES:
+
+        setattr(module, name, timed(getattr(module, name)))
+
+    atexit.register(dump_trace, output)
+
+
+def trace_results():
+
+    # Return the counts and timers as a dict.
+
+    with trace_lock:
+
+        stages = {stage: {"calls": calls, "seconds": round(seconds, 6)}
+                  for stage, (calls, seconds) in trace_timers.items()}
+
+    return {"stages": stages, "calls": dict(trace_counts)}
+
+
+def dump_trace(output):
+
+    # Write the trace_results() as JSON to the file output, or if output is
+    # None log it.
+
+    text = json.dumps(trace_results(), indent=1, sort_keys=True)
+
+    if output is None:
+
+        trace_logger.debug("Trace:\n%s", text)
+
+        return
+
+    try:
+
+        with open(output, "w", encoding="utf-8") as file:
+
+            file.write(text + "\n")
+
+    except OSError as e:
+
+        write_error(e)
+
+
+# Memory profiling. Like the tracing, enable_memory_profile() wraps the
+# stages of making a part (module globals again) so it costs nothing when
+# it is off. Each stage gets the peak memory (above what was in use when it
+# started) while it ran and how much of that it left allocated (such as the
+# files it returns), per view for those that make a view. tracemalloc only
+# has one peak, so each stage resets it and folds the peak so far in to the
+# stage it was called from. The svg and fzp generators are also watched for
+# what is taking up the memory: each time the memory they have allocated
+# doubles a snapshot is taken, and the largest is broken down by the line
+# that allocated it. tracemalloc's peak is for the whole process, so only
+# one thread may be making parts (no --async.)
+
+# The stages to profile, make_part() and stream_file() write the parts on
+# their own (render_part() and render_file() for a bundle), render_variants()
+# and variant_file() make them in color groups.
+
+MEMORY_STAGES = ("make_part", "render_part", "render_variants", "write_part",
+                 "part_names", "stream_file", "render_file", "variant_file",
+                 "part_bundle", "package_files", "create_svg")
+
+# The generators (and create_svg()) to find the allocation sites of, and
+# the functions doing the profiling, which allocate the snapshots and so
+# aren't allocation sites worth reporting.
+
+MEMORY_SITES = ("generate_fzp", "generate_svg", "create_svg")
+
+MEMORY_PROFILER = ("profiled", "module_snapshot", "sampled",
+                   "sampled_generator", "record_sites")
+
+# How much a generator must have allocated before it is snapshot, and how
+# many of the largest allocation sites of each view to report.
+
+MEMORY_SNAPSHOT_BYTES = 64 * 1024
+
+MEMORY_TOP_SITES = 10
+
+# The results while profiling is on, stage: [calls, peak, retained] (the
+# largest of each), view: {line: (size, count)}, the peak memory of the
+# whole run and the stack of [memory in use at the start, peak so far] of
+# the stages running.
+
+memory_stages = {}
+
+memory_sites = {}
+
+memory_peak = 0
+
+memory_stack = []
+
+
+def stage_name(name, args):
+
+    # The name of the stage for a call of the function name with args, the
+    # name and the view if one of the arguments is a view.
+
+    for arg in args:
+
+        if isinstance(arg, str) and arg in PART_VIEWS:
+
+            return "{0:s}.{1:s}".format(name, arg)
+
+    return name
+
+
+def profiled(function):
+
+    # Return function wrapped to record its peak and retained memory in
+    # memory_stages.
+
+    import tracemalloc
+
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+
+        global memory_peak
+
+        start, peak = tracemalloc.get_traced_memory()
+
+        memory_peak = max(memory_peak, peak)
+
+        if memory_stack:
+
+            memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+
+        tracemalloc.reset_peak()
+
+        memory_stack.append([start, 0])
+
+        try:
+
+            return function(*args, **kwargs)
+
+        finally:
+
+            current, peak = tracemalloc.get_traced_memory()
+
+            start, inner_peak = memory_stack.pop()
+
+            peak = max(peak, inner_peak)
+
+            memory_peak = max(memory_peak, peak)
+
+            if memory_stack:
+
+                memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+
+            stage = memory_stages.setdefault(stage_name(name, args),
+                                             [0, 0, 0])
+
+            stage[0] += 1
+
+            stage[1] = max(stage[1], peak - start)
+
+            stage[2] = max(stage[2], current - start)
+
+    return wrapper
+
+
+def module_snapshot():
+
+    # Take a tracemalloc snapshot of what was allocated in the factory's
+    # own files.
+
+    import tracemalloc
+
+    return tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(True, "*partsfactory*"),))
+
+
+def sampled(function):
+
+    # Return function wrapped to record what its svg (or fzp) lines take up
+    # in memory_sites. A list (from create_svg()) is all there at the end,
+    # a generator is snapshot as it runs.
+
+    import inspect
+
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+
+        view = stage_name(name, args)
+
+        before = module_snapshot()
+
+        result = function(*args, **kwargs)
+
+        if inspect.isgenerator(result):
+
+            return sampled_generator(view, result, before)
+
+        record_sites(view, module_snapshot(), before)
+
+        return result
+
+    return wrapper
+
+
+def sampled_generator(view, generator, before):
+
+    # Run generator, snapshotting it each time the memory allocated since it
+    # started doubles, and record the last (largest) snapshot, or one taken
+    # at the end if it never allocated enough for one.
+
+    import tracemalloc
+
+    start = tracemalloc.get_traced_memory()[0]
+
+    threshold = MEMORY_SNAPSHOT_BYTES
+
+    snapshot = None
+
+    try:
+
+        for item in generator:
+
+            if tracemalloc.get_traced_memory()[0] - start >= threshold:
+
+                snapshot = module_snapshot()
+
+                threshold *= 2
+
+            yield item
+
+    finally:
+
+        if snapshot is None:
+
+            snapshot = module_snapshot()
+
+        record_sites(view, snapshot, before)
+
+
+def record_sites(view, snapshot, before):
+
+    # Record the lines that allocated the memory in snapshot (that wasn't
+    # already allocated in before) for view, keeping the largest of each.
+
+    sites = memory_sites.setdefault(view, {})
+
+    for stat in snapshot.compare_to(before, "lineno"):
+
+        if stat.size_diff <= 0:
+
+            continue
+
+        frame = stat.traceback[0]
+
+        site = "{0:s}:{1:d}".format(os.path.basename(frame.filename),
+                                    frame.lineno)
+
+        if stat.size_diff > sites.get(site, (0, 0))[0]:
+
+            sites[site] = (stat.size_diff, stat.count_diff)
+
+
+def site_functions():
+
+    # Return a sorted list of (first line, name) of the functions in this
+    # file, to find which function a line is in.
+
+    import inspect
+
+    functions = []
+
+    for name, value in vars(sys.modules[__name__]).items():
+
+        code = getattr(inspect.unwrap(value), "__code__", None)
+
+        if code is not None and code.co_filename == __file__:
+
+            functions.append((code.co_firstlineno, name))
+
+    return sorted(functions)
+
+
+def memory_results():
+
+    # Return the stages and the largest allocation sites of each view (other
+    # than the profiler's own) as a dict.
+
+    import tracemalloc
+
+    functions = site_functions()
+
+    sites = {}
+
+    for view, lines in memory_sites.items():
+
+        found = []
+
+        for site, (size, count) in lines.items():
+
+            filename, line = site.rsplit(":", 1)
+
+            function = None
+
+            if filename == os.path.basename(__file__):
+
+                before = [name for first, name in functions
+                          if first <= int(line)]
+
+                function = before[-1] if before else None
+
+            if function not in MEMORY_PROFILER:
+
+                found.append({"site": site, "function": function,
+                              "bytes": size, "blocks": count})
+
+        found.sort(key=lambda site: site["bytes"], reverse=True)
+
+        sites[view] = found[:MEMORY_TOP_SITES]
+
+    return {"stages": {stage: {"calls": calls, "peak_bytes": peak,
+                               "retained_bytes": retained}
+                       for stage, (calls, peak, retained)
+                       in memory_stages.items()},
+            "peak_bytes": max(memory_peak,
+                              tracemalloc.get_traced_memory()[1]),
+            "sites": sites}
+
+
+def enable_memory_profile(output=None):
+
+    # Start tracemalloc, turn memory profiling on (for this process) and
+    # dump the results as JSON at exit, to the file output or if that is
+    # None to trace_logger. tracemalloc (and inspect, for the wrappers) are
+    # only imported here, like the other modules only the optional modes
+    # use, so they don't add to the startup time.
+
+    import tracemalloc
+
+    module = sys.modules[__name__]
+
+    for name in MEMORY_SITES:
+
+        setattr(module, name, sampled(getattr(module, name)))
+
+    for name in MEMORY_STAGES:
+
+        setattr(module, name, profiled(getattr(module, name)))
+
+    tracemalloc.start()
+
+    atexit.register(dump_memory_profile, output)
+
+
+def dump_memory_profile(output):
+
+    # Write the memory_results() as JSON to the file output, or if output
+    # is None log it.
+
+    text = json.dumps(memory_results(), indent=1, sort_keys=True)
+
+    if output is None:
+
+        trace_logger.debug("Memory profile:\n%s", text)
+
+        return
+
+    try:
+
+        with open(output, "w", encoding="utf-8") as file:
+
+            file.write(text + "\n")
+
+    except OSError as e:
+
+        write_error(e)
+
+
+def bench_main(argv):
+
+    # The command line of the bench command.
+
+    commands = {"startup": bench_startup, "suite": bench_suite,
+                "compare": bench_compare}
+
+    if argv[:1] == [] or argv[0] not in commands:
+
+        print("Error: bench needs one of startup, suite or compare\n",
+              file=sys.stderr)
+
+        usage()
+
+        exit(1)
+
+    commands[argv[0]](argv[1:])
+
+
+def bench_startup(argv):
+
+    # The command line of bench startup.
+
+    # Only imported here (as in the other bench commands), so the benchmarks
+    # don't add to the startup time they measure.
+
+    import partsfactory_bench
+
+    runs = 5
+
+    import_budget = constants.IMPORT_BUDGET
+
+    first_byte_budget = constants.FIRST_BYTE_BUDGET
+
+    forbidden = list(constants.STARTUP_FORBIDDEN)
+
+    output = None
+
+    try:
+
+        opts, args = getopt.getopt(argv, "o:h",
+                                   ["runs=", "import-budget=",
+                                    "first-byte-budget=", "forbid=",
+                                    "output=", "help"])
+
+    except getopt.GetoptError as e:
+
+        print("Error: {0}\n".format(e), file=sys.stderr)
+
+        usage()
+
+        exit(1)
+
+    for opt, arg in opts:
+
+        if opt in ("-h", "--help"):
+
+            usage()
+
+            exit(0)
+
+        elif opt in ("-o", "--output"):
+
+            output = arg
+
+        elif opt == "--forbid":
+
+            forbidden = [module for module in arg.split(",") if module]
+
+        elif opt == "--runs":
+
+            if not arg.isdigit() or int(arg) < 1:
+
+                print("Error: --runs must be a number > 0", file=sys.stderr)
+
+                exit(1)
+
+            runs = int(arg)
+
+        else:
+
+            try:
+
+                budget = float(arg)
+
+            except ValueError:
+
+                budget = 0
+
+            if not budget > 0:
+
+                print("Error: {0:s} must be a number > 0".format(opt),
+                      file=sys.stderr)
+
+                exit(1)
+
+            if opt == "--import-budget":
+
+                import_budget = budget
+
+            else:
+
+                first_byte_budget = budget
+
+    try:
+
+        results = partsfactory_bench.startup_benchmark(runs)
+
+    except RuntimeError as e:
+
+        print("Error: {0}".format(e), file=sys.stderr)
+
+        exit(1)
+
+    failures = partsfactory_bench.check_startup(
+        results, import_budget, first_byte_budget, forbidden)
+
+    results["budget"] = {"import": import_budget,
+                         "first_byte": first_byte_budget,
+                         "forbidden": forbidden}
+
+    results["failures"] = failures
+
+    partsfactory_bench.write_results(results, output)
+
+    for failure in failures:
+
+        print("Over budget: {0:s}".format(failure), file=sys.stderr)
+
+    exit(1 if failures else 0)
+
+
+def bench_suite(argv):
+
+    # The command line of bench suite.
+
+    import partsfactory_bench
+
+    sizes = list(constants.BENCH_SIZES)
+
+    pitches = list(constants.PITCHES.values())
+
+    pad_types = [constants.CIRCLE, constants.OBLONG]
+
+    pin_orders = [constants.ROW, constants.COLUMN]
+
+    repeat = 3
+
+    output = None
+
+    options = {"compresslevel": None, "compact": False,
+               "precision": fixed.DIGITS, "vectorize": False,
+               "instance": False, "merge": False}
+
+    try:
+
+        opts, args = getopt.getopt(argv, "p:o:h",
+                                   ["sizes=", "pitch=", "pad=", "order=",
+                                    "repeat=", "output=", "compact",
+                                    "vectorize", "instance", "merge", "help"])
+
+    except getopt.GetoptError as e:
+
+        print("Error: {0}\n".format(e), file=sys.stderr)
+
+        usage()
+
+        exit(1)
+
+    for opt, arg in opts:
+
+        if opt in ("-h", "--help"):
+
+            usage()
+
+            exit(0)
+
+        elif opt == "--sizes":
+
+            sizes = parse_numbers(opt, arg)
+
+        elif opt in ("-p", "--pitch"):
+
+            pitches = parse_names(opt, arg, constants.PITCHES, "PITCH_")
+
+        elif opt == "--pad":
+
+            pad_types = parse_names(opt, arg, constants.PAD_TYPES)
+
+        elif opt == "--order":
+
+            pin_orders = parse_names(opt, arg, constants.PIN_ORDERS)
+
+        elif opt == "--repeat":
+
+            repeat = parse_numbers(opt, arg)[-1]
+
+        elif opt in ("-o", "--output"):
+
+            output = arg
+
+        else:
+
+            options[opt[2:]] = True
+
+    unmade = [pad_type for pad_type in pad_types
+              if pad_type not in (constants.CIRCLE, constants.OBLONG)]
+
+    if unmade:
+
+        print("Error: only CIRCLE and OBLONG pads can be made not {0:s}"
+              .format(",".join(unmade)), file=sys.stderr)
+
+        exit(1)
+
+    if options["vectorize"]:
+
+        import partsfactory_numpy
+
+        if partsfactory_numpy.numpy is None:
+
+            print("Error: vectorize needs numpy to be installed",
+                  file=sys.stderr)
+
+            exit(1)
+
+    def progress(name):
+
+        print(name, file=sys.stderr)
+
+    results = partsfactory_bench.suite_benchmark(
+        sys.modules[__name__], sizes, pitches, pad_types, pin_orders,
+        options, repeat, progress)
+
+    partsfactory_bench.write_results(results, output)
+
+
+def bench_compare(argv):
+
+    # The command line of bench compare, exits 1 if there are regressions.
+
+    import partsfactory_bench
+
+    threshold = constants.REGRESSION_THRESHOLD
+
+    floor = constants.REGRESSION_FLOOR
+
+    try:
+
+        opts, args = getopt.getopt(argv, "h", ["threshold=", "floor=",
+                                               "help"])
+
+    except getopt.GetoptError as e:
+
+        print("Error: {0}\n".format(e), file=sys.stderr)
+
+        usage()
+
+        exit(1)
+
+    for opt, arg in opts:
+
+        if opt in ("-h", "--help"):
+
+            usage()
+
+            exit(0)
+
+        elif opt == "--floor":
+
+            try:
+
+                floor = float(arg) / 1000
+
+            except ValueError:
+
+                floor = -1
+
+            if floor < 0:
+
+                print("Error: --floor must be a number of ms", file=sys.stderr)
+
+                exit(1)
+
+        elif not arg.isdigit():
+
+            print("Error: --threshold must be a percentage", file=sys.stderr)
+
+            exit(1)
+
+        else:
+
+            threshold = int(arg) / 100
+
+    if len(args) != 2:
+
+        print("Error: bench compare needs a baseline and results file\n",
+              file=sys.stderr)
+
+        usage()
+
+        exit(1)
+
+    try:
+
+        baseline, results = [partsfactory_bench.read_results(filename)
+                             for filename in args]
+
+    except (OSError, ValueError) as e:
+
+        print("Error: Can not read the results ({0})".format(e),
+              file=sys.stderr)
+
+        exit(1)
+
+    if baseline.get("options") != results.get("options"):
+
+        print("Warning: the results were made with different options",
+              file=sys.stderr)
+
+    if baseline.get("case_seconds") != results.get("case_seconds"):
+
+        # Such as a baseline from before the cases were timed by their
+        # median.
+
+        print("Warning: the results were timed differently", file=sys.stderr)
+
+    regressions, missing = partsfactory_bench.compare_results(
+        baseline, results, threshold, floor)
+
+    for name, before, after, change in regressions:
+
+        print("Regression: {0:s} {1:.3f} ms -> {2:.3f} ms (+{3:.0f}%)".format(
+              name, before * 1000, after * 1000, change * 100))
+
+    for name in missing:
+
+        print("Missing: {0:s}".format(name))
+
+    print("{0:d} of {1:d} cases more than {2:.0f}% and {3:.3f} ms slower"
+          .format(len(regressions), len(baseline["cases"]), threshold * 100,
+                  floor * 1000))
+
+    exit(1 if regressions else 0)
+
+
+def usage():
+
+    # Print the command line help.
+
+    print("""Usage: partsfactory.py [options]
+       partsfactory.py serve [--port N] [--cache-size MB] [--parallel-views]
+       partsfactory.py bench startup [--runs N] [--import-budget X]
+                       [--first-byte-budget X] [--forbid LIST] [-o FILE]
+       partsfactory.py bench suite [--sizes LIST] [-p LIST] [--pad LIST]
+                       [--order LIST] [--repeat N] [--compact] [--vectorize]
+                       [--instance] [--merge] [-o FILE]
+       partsfactory.py bench compare [--threshold PERCENT] [--floor MS]
+                       BASELINE RESULTS
+
+Make the fzp and svgs for every combination of the values given. Lists are
+comma separated, numbers also take ranges (1-40) and names also take all.
+
+  -r, --rows LIST       rows (pins per column) (default 4)
+  -c, --columns LIST    columns (default 4)
+  -p, --pitch LIST      PITCH_* names e.g. 0_1IN,2MM (default 0_5MM)
+  -t, --part LIST       MALE_HEADER,FEMALE_HEADER (default MALE_HEADER)
+      --pcb LIST        THT,SMD (default THT)
+      --pad LIST        pad types e.g. CIRCLE,OBLONG (default CIRCLE)
+      --order LIST      ROW,COLUMN (default COLUMN)
+      --color LIST      BRN,RED,YEL,GRN,BLU (default BRN)
+  -o, --output DIR      directory to write the parts to (default .)
+  -j, --jobs N          parts to make at once, 0 for one per cpu (default 1)
+      --bundle          write a .fzpz per part rather than loose files
+      --compress LEVEL  write gzipped .svgz and .fzp.gz at LEVEL (0 to 9)
+      --compact         one element per line without indentation
+      --precision N     digits after the decimal point (0 to 4, default 4)
+      --vectorize       calculate the coordinates with numpy
+      --instance        <use> one breadboard pin body for every pin
+      --merge           merge the paths with the same fill
+      --fsync           flush the files (and directories) to disk as each
+                        part is written
+      --async           overlap the writing with the generating (asyncio)
+      --incremental     only make the parts that are new or changed since
+                        the last run and remove those no longer wanted
+      --writers N       files to write at once with --async (default 4)
+      --shard           spread the parts over ab/cd/ directories by a hash
+                        of the moduleid and write an index of where each is
+      --parallel-views  make the fzp and svgs of each part at the same time
+                        on a pool of processes (for a single large part)
+      --qt-uuid         make the moduleid uuids with PySide6 (Qt) rather
+                        than the standard library
+      --deterministic   make the moduleid uuids from a hash of the spec (and
+                        date the parts SOURCE_DATE_EPOCH or 1980-01-01) so
+                        the same parts are always the same bytes
+      --namespace NAME  hash NAME with the specs for --deterministic
+                        (default python-fz-parts-factory)
+      --trace FILE      log the details of each svg and write the time
+                        spent in each stage and the number of calls to each
+                        emitter as JSON to FILE (- to log it) at exit
+      --memprofile FILE write the peak and retained memory of each stage
+                        and view and the lines allocating the most of it as
+                        JSON to FILE (- to log it) at exit
+  -h, --help            print this help
+
+serve answers GET /part?rows=2&pitch=0_1IN&view=breadboard (or a POST of the
+same fields as JSON) on 127.0.0.1 port N (default 8080) with the .fzpz (the
+default view), the fzp or one svg. Fields are part, rows, columns, pitch,
+pcb, pad, order, color, compact, precision, instance, merge and view.
+Rendered parts are cached, up to --cache-size MB (default 64), and with
+--parallel-views the views of each are made at the same time.
+
+bench startup times importing partsfactory (cold, without a bytecode cache,
+and warm) and the first byte of a 1x1 part, each in a new interpreter, and
+writes the results with the -X importtime breakdown as JSON to FILE (or
+stdout). The budgets are multiples of the time a bare interpreter takes to
+start. It exits 1 if the import takes longer than --import-budget (default
+4.5) times that, the first byte longer than --first-byte-budget (default
+5.5) times that or a module in --forbid (default PySide6,numpy,asyncio,
+http.server,concurrent.futures,inspect,zipfile,tracemalloc) is imported.
+
+bench suite times making the fzp and each svg of square parts of each of
+--sizes (default 1,2,5,10,25,50,100) at each pitch (default all), pad type
+(default CIRCLE,OBLONG) and pin order (default ROW,COLUMN) and writes the
+median time and the pins and bytes per second of each as JSON to FILE (or
+stdout). bench compare compares two of those and exits 1 if any case is
+more than --threshold percent (default 10) and more than --floor ms
+(default 0.1) slower in RESULTS than in BASELINE.""",
+          file=sys.stderr)
+
+
+def main():
+
+    # Configure the root logging instance, even though we won't be using it
     # (we will create loggers for each module) as this is said to be best
     # practice.
 
@@ -2116,123 +6135,404 @@ def main():
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.WARNING)
 
-    # set test parameters
+    # asyncio (used by --async) logs at DEBUG which we don't want to see.
 
-    rows = 4
+    logging.getLogger("asyncio").setLevel(logging.WARNING)
 
-    columns = 4
+    # Nor the tracing unless it is asked for (with --trace.)
 
-    part_type = constants.MALE_HEADER
+    trace_logger.setLevel(logging.WARNING)
 
-    pitch = constants.PITCH_0_5MM
+    if sys.argv[1:2] == ["serve"]:
 
-#    pitch = constants.PITCH_1MM
+        serve_main(sys.argv[2:])
 
-#    pitch = constants.PITCH_1_27MM
+        exit(0)
 
-#    pitch = constants.PITCH_2MM
+    if sys.argv[1:2] == ["bench"]:
 
-#
-#    pitch = constants.PITCH_0_1IN
-#    pitch = constants.PITCH_0_11IN
-#    pitch = constants.PITCH_0_12IN
-#    pitch = constants.PITCH_0_13IN
-#    pitch = constants.PITCH_0_14IN
-#    pitch = constants.PITCH_0_15IN
-#    pitch = constants.PITCH_0_16IN
-#    pitch = constants.PITCH_0_17IN
-#    pitch = constants.PITCH_0_18IN
-#    pitch = constants.PITCH_0_19IN
+        bench_main(sys.argv[2:])
 
-#
-#    pitch = constants.PITCH_0_156IN
+        exit(0)
 
-#    pitch = constants.PITCH_0_2IN
+    # The defaults for the command line, a single 4 x 4 male header.
 
-#    pitch = constants.PITCH_1IN
+    part_types = [constants.MALE_HEADER]
 
-    pcb_type = constants.THT
+    rows = [4]
 
-    pad_type = constants.CIRCLE
+    columns = [4]
 
-    pin_order = constants.COLUMN
+    pitches = [constants.PITCH_0_5MM]
 
-#    pin_order = constants.ROW
+    pcb_types = [constants.THT]
 
-    color = constants.BRN
+    pad_types = [constants.CIRCLE]
 
-    ref_file = constants.MALE_HEADER_BREADBOARD_REFERENCE_FILE
+    pin_orders = [constants.COLUMN]
 
-    moduleid = create_fzp(part_type, rows, columns, pitch, pcb_type,
-                          pin_order, pad_type, color, 1)
+    colors = [constants.BRN]
 
-    # Create the breadboard svg.
+    jobs = 1
 
-    svg_type = constants.BREADBOARD
+    # Whether to use the asyncio pipeline and how many writers it has.
 
-    ref_file = constants.MALE_HEADER_BREADBOARD_REFERENCE_FILE
+    pipeline = False
 
-    layerid = constants.BREADBOARD
+    writers = 4
 
-    svg = []
+    # Whether to use (and update) the manifest in the output directory.
 
-    svg = create_svg(svg_type, moduleid, part_type, rows, columns, pitch,
-                     pcb_type, pin_order, pad_type, color, ref_file, layerid)
+    incremental = False
 
-    breadboard_filename = 'svg.breadboard.test_breadboard.svg'
+    # Whether to make the moduleids from the specs (and in what namespace.)
 
-    # breakpoint()
+    deterministic = False
 
-    write_file(breadboard_filename, svg)
+    namespace = constants.DETERMINISTIC_NAMESPACE
 
-    svg_type = constants.SCHEMATIC
+    # Where to write the trace (see enable_tracing()), None for no tracing,
+    # and the same for the memory profile (see enable_memory_profile().)
 
-    ref_file = constants.MALE_HEADER_SCHEMATIC_REFERENCE_FILE
+    trace = None
 
-    layerid = constants.SCHEMATIC
+    memory_profile = None
 
-    # Schematic is always pitch 0.1IN so set it expicitly.
+    # The output settings for make_part(), see create_svg(), render_part()
+    # and write_part() for what they do.
 
-    svg = []
+    options = {"output_dir": ".", "fsync": False, "bundle": False,
+               "compresslevel": None, "compact": False,
+               "precision": fixed.DIGITS, "vectorize": False,
+               "instance": False, "merge": False, "shard": False,
+               "parallel_views": False}
 
-    svg = create_svg(svg_type, moduleid, part_type, rows, columns,
-                     constants.PITCH_0_1IN, pcb_type, pin_order, pad_type,
-                     color, ref_file, layerid)
+    try:
 
-    schematic_filename = 'svg.schematic.test_schematic.svg'
+        opts, args = getopt.getopt(sys.argv[1:], "r:c:p:t:o:j:h",
+                                   ["rows=", "columns=", "pitch=", "part=",
+                                    "pcb=", "pad=", "order=", "color=",
+                                    "output=", "jobs=", "bundle",
+                                    "compress=", "compact", "precision=",
+                                    "vectorize", "instance", "merge",
+                                    "fsync", "async", "writers=",
+                                    "incremental", "shard", "parallel-views",
+                                    "qt-uuid", "deterministic", "namespace=",
+                                    "trace=", "memprofile=", "help"])
 
-    # breakpoint()
+    except getopt.GetoptError as e:
 
-    write_file(schematic_filename, svg)
+        print("Error: {0}\n".format(e), file=sys.stderr)
 
-    svg_type = constants.PCB
+        usage()
 
-    if pad_type == constants.CIRCLE:
+        exit(1)
 
-        ref_file = constants.CIRCLE_PCB_REFERENCE_FILE
+    if args:
 
-    elif pad_type == constants.OBLONG:
+        print("Error: unexpected argument {0:s}\n".format(args[0]),
+              file=sys.stderr)
 
-        ref_file = constants.OBLONG_PCB_REFERENCE_FILE
+        usage()
 
-    else:
+        exit(1)
+
+    for opt, arg in opts:
+
+        if opt in ("-h", "--help"):
+
+            usage()
+
+            exit(0)
+
+        elif opt in ("-r", "--rows"):
+
+            rows = parse_numbers(opt, arg)
+
+        elif opt in ("-c", "--columns"):
+
+            columns = parse_numbers(opt, arg)
+
+        elif opt in ("-p", "--pitch"):
+
+            pitches = parse_names(opt, arg, constants.PITCHES, "PITCH_")
+
+        elif opt in ("-t", "--part"):
+
+            part_types = parse_names(opt, arg, constants.PART_TYPES)
+
+        elif opt == "--pcb":
+
+            pcb_types = parse_names(opt, arg, constants.PCB_TYPES)
+
+        elif opt == "--pad":
+
+            pad_types = parse_names(opt, arg, constants.PAD_TYPES)
+
+        elif opt == "--order":
+
+            pin_orders = parse_names(opt, arg, constants.PIN_ORDERS)
+
+        elif opt == "--color":
 
-        print("Unknown pcb pad type\n", file=sys.stderr)
+            colors = parse_names(opt, arg, constants.COLORS)
+
+        elif opt in ("-o", "--output"):
+
+            options["output_dir"] = arg
+
+        elif opt in ("-j", "--jobs"):
+
+            if not arg.isdigit():
+
+                print("Error: --jobs must be a number", file=sys.stderr)
+
+                exit(1)
+
+            # 0 means one job per cpu.
+
+            jobs = int(arg) or os.cpu_count() or 1
+
+        elif opt == "--async":
+
+            pipeline = True
+
+        elif opt == "--incremental":
+
+            incremental = True
+
+        elif opt == "--writers":
+
+            if not arg.isdigit() or int(arg) < 1:
+
+                print("Error: --writers must be a number > 0",
+                      file=sys.stderr)
+
+                exit(1)
+
+            writers = int(arg)
+
+        elif opt == "--compress":
+
+            if arg not in [str(level) for level in range(10)]:
+
+                print("Error: --compress level must be 0 to 9",
+                      file=sys.stderr)
+
+                exit(1)
+
+            options["compresslevel"] = int(arg)
+
+        elif opt == "--precision":
+
+            if not arg.isdigit():
+
+                print("Error: --precision must be a number", file=sys.stderr)
+
+                exit(1)
+
+            options["precision"] = int(arg)
+
+            try:
+
+                check_precision(options["precision"])
+
+            except ValueError as e:
+
+                print("Error: {0}".format(e), file=sys.stderr)
+
+                exit(1)
+
+        elif opt == "--parallel-views":
+
+            options["parallel_views"] = True
+
+        elif opt == "--qt-uuid":
+
+            try:
+
+                import PySide6.QtCore
+
+            except ImportError:
+
+                print("Error: --qt-uuid needs PySide6 to be installed",
+                      file=sys.stderr)
+
+                exit(1)
+
+            set_uuid_source("qt")
+
+        elif opt == "--deterministic":
+
+            deterministic = True
+
+        elif opt == "--namespace":
+
+            namespace = arg
+
+        elif opt == "--trace":
+
+            trace = arg
+
+        elif opt == "--memprofile":
+
+            memory_profile = arg
+
+        else:
+
+            # The rest are the on/off settings.
+
+            options[opt[2:]] = True
+
+    if options["vectorize"]:
+
+        import partsfactory_numpy
+
+        if partsfactory_numpy.numpy is None:
+
+            print("Error: vectorize needs numpy to be installed",
+                  file=sys.stderr)
+
+            exit(1)
+
+    if trace is not None:
+
+        # The counts are kept per process so only this one's are seen.
+
+        if jobs > 1 or options["parallel_views"]:
+
+            print("Error: --trace can't be used with --jobs or"
+                  " --parallel-views", file=sys.stderr)
+
+            exit(1)
+
+        trace_logger.setLevel(logging.DEBUG)
+
+        enable_tracing(None if trace == "-" else trace)
+
+    if memory_profile is not None:
+
+        # Like the tracing only this process is profiled, and as tracemalloc
+        # has one peak for the whole process only one thread can be making
+        # parts.
+
+        if jobs > 1 or options["parallel_views"] or pipeline:
+
+            print("Error: --memprofile can't be used with --jobs,"
+                  " --parallel-views or --async", file=sys.stderr)
+
+            exit(1)
+
+        if memory_profile == "-":
+
+            trace_logger.setLevel(logging.DEBUG)
+
+        enable_memory_profile(None if memory_profile == "-"
+                              else memory_profile)
+
+    if deterministic:
+
+        epoch = os.environ.get("SOURCE_DATE_EPOCH")
+
+        if epoch is not None and not epoch.isdigit():
+
+            print("Error: SOURCE_DATE_EPOCH must be a number of seconds",
+                  file=sys.stderr)
+
+            exit(1)
+
+        set_uuid_source("deterministic", namespace)
+
+    if options["parallel_views"] and jobs > 1:
+
+        # The jobs already keep the cpus busy, a pool in each would only
+        # have them fighting over them.
+
+        print("Error: --parallel-views is for one part at a time, not with"
+              " --jobs", file=sys.stderr)
 
         exit(1)
 
-    layerid = ""    # pcb has 3 layerIds not only 1!
+    specs = catalog_specs(part_types, rows, columns, pitches, pcb_types,
+                          pin_orders, pad_types, colors)
 
-    svg = []
+    done = None
+
+    if incremental:
+
+        manifest = read_manifest(options["output_dir"])
+
+        seen = set()
+
+        counts = {"skipped": 0}
+
+        specs = changed_specs(specs, options, manifest, seen, counts)
+
+        def done(spec, part):
+
+            update_manifest(manifest, options, spec, part)
 
-    svg = create_svg(svg_type, moduleid, part_type, rows, columns, pitch,
-                     pcb_type, pin_order, pad_type, color, ref_file, layerid)
+    elif options["shard"]:
 
-    pcb_filename = 'svg.pcb.test_pcb.svg'
+        # Without a manifest add this run's parts to the index.
 
-    # breakpoint()
+        index = read_index(options["output_dir"])
 
-    write_file(pcb_filename, svg)
+        def done(spec, part):
+
+            update_index(index, part)
+
+    if pipeline:
+
+        import asyncio
+
+        made, failed = asyncio.run(generate_catalog(specs, options, jobs,
+                                                    writers, done))
+
+    else:
+
+        made, failed = run_catalog(specs, options, jobs, done)
+
+    logger.info("Made {0:d} parts, {1:d} failed".format(made, failed))
+
+    if incremental:
+
+        removed = prune_manifest(manifest, options["output_dir"], seen)
+
+        try:
+
+            write_manifest(options["output_dir"], manifest, options["fsync"])
+
+        except OSError as e:
+
+            write_error(e)
+
+            exit(1)
+
+        logger.info("Skipped {0:d} unchanged parts, removed {1:d}".format(
+                    counts["skipped"], removed))
+
+        index = manifest_index(manifest)
+
+    if options["shard"]:
+
+        try:
+
+            write_index(options["output_dir"], index, options["fsync"])
+
+        except OSError as e:
+
+            write_error(e)
+
+            exit(1)
+
+    # Report how well the template cache did over the 3 views.
+
+    logger.info("Template cache: {0}".format(template_cache_stats()))
+
+    if failed:
+
+        exit(1)
 
     exit(0)
 
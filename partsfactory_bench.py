@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+
+## Benchmarks for the parts factory.
+
+# partsfactory.py is run thousands of times from scripts, so how long it
+# takes to start matters as much as how fast it makes parts. The startup
+# benchmark runs each measurement in a new interpreter (the only way to see
+# the real cost of the imports) and records:
+#
+#     cold_import_ms   import partsfactory with no bytecode cache, as on a
+#                      fresh checkout or container (so everything is
+#                      compiled from source)
+#     warm_import_ms   import partsfactory with the bytecode cache in place
+#     first_byte_ms    from starting the interpreter to the first byte of a
+#                      1x1 part
+#     interpreter_ms   starting an interpreter that does nothing, the
+#                      baseline the budgets are multiples of
+#     import_time      the -X importtime breakdown of a warm import, the
+#                      modules with the most cumulative time first
+#
+# each time the median of runs. It fails (exits 1) if the warm import or the
+# first byte take longer than their budget (a multiple of interpreter_ms, so
+# the same budget holds on any machine) or a forbidden module (such as
+# PySide6, which should only be imported when asked for) is imported at all.
+#
+# The suite times making the fzp and each svg view (as bytes, the way the
+# factory makes them) of square parts over a range of sizes, pitches, pad
+# types and pin orders, and reports the median time and the pins and bytes
+# made per second of each. Only what changes a view is varied for it: the schematic is always
+# at 0.1in and only the pcb depends on the pad type. compare_results()
+# compares two sets of results and finds the cases that got slower.
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import partsfactory_constants as constants
+
+# The directory partsfactory.py is in, the new interpreters are started
+# there so "import partsfactory" finds it.
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Import partsfactory and make a 1x1 part, writing the first byte of its fzp
+# to stdout. (Anything it prints on the way goes nowhere so that isn't the
+# first byte.)
+
+FIRST_BYTE_CODE = """
+import contextlib, io, sys
+import partsfactory
+with contextlib.redirect_stdout(io.StringIO()):
+    part = partsfactory.generate(partsfactory.PartSpec(rows=1, columns=1))
+sys.stdout.buffer.write(part.views["fzp"])
+sys.stdout.flush()
+"""
+
+# How many of the slowest imports to keep in the breakdown.
+
+IMPORT_TIME_ENTRIES = 25
+
+
+def python(code, env=None, stdout=subprocess.DEVNULL, import_time=True):
+
+    # Start a new interpreter running code in PACKAGE_DIR, with the
+    # environment env (on top of this one) and -X importtime (unless
+    # import_time is False) and return the Popen.
+
+    options = ["-X", "importtime"] if import_time else []
+
+    return subprocess.Popen([sys.executable] + options + ["-c", code],
+                            cwd=PACKAGE_DIR,
+                            env=dict(os.environ, **(env or {})),
+                            stdout=stdout, stderr=subprocess.PIPE)
+
+
+def parse_import_time(text):
+
+    # Convert the -X importtime report (on stderr) to a list of dicts of
+    # module, self_us and cumulative_us, the depth being how many imports
+    # deep it was.
+
+    imports = []
+
+    for line in text.splitlines():
+
+        if not line.startswith("import time:") or "[us]" in line:
+
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+
+        imports.append({"module": name.strip(),
+                        "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                        "self_us": int(self_us),
+                        "cumulative_us": int(cumulative_us)})
+
+    return imports
+
+
+def measure_import(prefix):
+
+    # Import partsfactory in a new interpreter and return the time it took
+    # in ms (from -X importtime, so without the interpreter's own startup)
+    # and the breakdown. The bytecode cache is in the directory prefix, so
+    # an empty one is a cold import and one an import has already written
+    # to (whatever PYTHONDONTWRITEBYTECODE and the checkout's __pycache__
+    # are) a warm one.
+
+    process = python("import partsfactory",
+                     {"PYTHONPYCACHEPREFIX": prefix,
+                      "PYTHONDONTWRITEBYTECODE": ""})
+
+    errors = process.communicate()[1].decode("utf-8", "replace")
+
+    if process.returncode:
+
+        raise RuntimeError("import partsfactory failed:\n" + errors)
+
+    imports = parse_import_time(errors)
+
+    total = [entry for entry in imports if entry["module"] == "partsfactory"]
+
+    return total[-1]["cumulative_us"] / 1000, imports
+
+
+def measure_first_byte(prefix):
+
+    # Return the time in ms from starting a new interpreter to reading the
+    # first byte of a 1x1 part from it, with the (warm) bytecode cache in
+    # prefix as for measure_import().
+
+    start = time.perf_counter()
+
+    process = python(FIRST_BYTE_CODE, {"PYTHONPYCACHEPREFIX": prefix,
+                                       "PYTHONDONTWRITEBYTECODE": ""},
+                     stdout=subprocess.PIPE, import_time=False)
+
+    first = process.stdout.read(1)
+
+    elapsed = time.perf_counter() - start
+
+    process.stdout.read()
+
+    errors = process.communicate()[1].decode("utf-8", "replace")
+
+    if process.returncode or not first:
+
+        raise RuntimeError("making a 1x1 part failed:\n" + errors)
+
+    return elapsed * 1000
+
+
+def measure_interpreter(prefix):
+
+    # Return the time in ms from starting a new interpreter that does
+    # nothing to it exiting, with the bytecode cache in prefix as for
+    # measure_import().
+
+    start = time.perf_counter()
+
+    process = python("pass", {"PYTHONPYCACHEPREFIX": prefix,
+                              "PYTHONDONTWRITEBYTECODE": ""},
+                     import_time=False)
+
+    errors = process.communicate()[1].decode("utf-8", "replace")
+
+    elapsed = time.perf_counter() - start
+
+    if process.returncode:
+
+        raise RuntimeError("starting python failed:\n" + errors)
+
+    return elapsed * 1000
+
+
+def startup_benchmark(runs=5):
+
+    # Run the startup measurements runs times each and return the results
+    # as a dict (see the top of this file.)
+
+    cold = []
+
+    for run in range(runs):
+
+        with tempfile.TemporaryDirectory() as prefix:
+
+            cold.append(measure_import(prefix)[0])
+
+    warm = []
+
+    imports = []
+
+    with tempfile.TemporaryDirectory() as prefix:
+
+        # One import first to write the bytecode cache.
+
+        measure_import(prefix)
+
+        for run in range(runs):
+
+            milliseconds, imports = measure_import(prefix)
+
+            warm.append(milliseconds)
+
+        # And one to cache what making a part imports as well.
+
+        measure_first_byte(prefix)
+
+        first_byte = [measure_first_byte(prefix) for run in range(runs)]
+
+        measure_interpreter(prefix)
+
+        interpreter = [measure_interpreter(prefix) for run in range(runs)]
+
+    imports.sort(key=lambda entry: entry["cumulative_us"], reverse=True)
+
+    return {"benchmark": "startup",
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "runs": runs,
+            "cold_import_ms": round(statistics.median(cold), 3),
+            "warm_import_ms": round(statistics.median(warm), 3),
+            "first_byte_ms": round(statistics.median(first_byte), 3),
+            "interpreter_ms": round(statistics.median(interpreter), 3),
+            "modules": [entry["module"] for entry in imports],
+            "import_time": imports[:IMPORT_TIME_ENTRIES]}
+
+
+def check_startup(results, import_budget, first_byte_budget, forbidden):
+
+    # Return a list of the ways results are over budget (empty if none.) The
+    # budgets are multiples of the results' interpreter_ms.
+
+    failures = []
+
+    interpreter = results["interpreter_ms"]
+
+    for name, key, budget in (("import", "warm_import_ms", import_budget),
+                              ("the first byte", "first_byte_ms",
+                               first_byte_budget)):
+
+        if results[key] > budget * interpreter:
+
+            failures.append("{0:s} took {1:.1f} ms ({2:.1f} times starting "
+                            "python), the budget is {3:.1f} times ({4:.1f} "
+                            "ms)".format(name, results[key],
+                                         results[key] / interpreter, budget,
+                                         budget * interpreter))
+
+    for module in forbidden:
+
+        if any(name == module or name.startswith(module + ".")
+               for name in results["modules"]):
+
+            failures.append("{0:s} is imported at startup".format(module))
+
+    return failures
+
+
+# Each case is timed for at least this many seconds in all (and at least
+# repeat times), spread over as many rounds of the whole suite, and the
+# median run kept. The small parts are timed as accurately as the large
+# ones, and something else slowing the machine down for a while slows a
+# little of every case rather than all of a few of them.
+
+CASE_SECONDS = 0.5
+
+CASE_ROUNDS = 5
+
+
+def suite_cases(sizes, pitches, pad_types, pin_orders):
+
+    # Generate the (name, view, rows, columns, pitch, pin order, pad type)
+    # of each case of the suite.
+
+    pitch_names = {pitch: name for name, pitch in constants.PITCHES.items()}
+
+    for size in sizes:
+
+        dimensions = "{0:d}x{0:d}".format(size)
+
+        for pin_order in pin_orders:
+
+            yield ("/".join((constants.SCHEMATIC, dimensions, pin_order)),
+                   constants.SCHEMATIC, size, size, constants.PITCH_0_1IN,
+                   pin_order, pad_types[0])
+
+        for pitch in pitches:
+
+            name = "/".join((dimensions, pitch_names[pitch]))
+
+            yield ("fzp/" + name, "fzp", size, size, pitch, pin_orders[0],
+                   pad_types[0])
+
+            for pin_order in pin_orders:
+
+                yield ("/".join((constants.BREADBOARD, name, pin_order)),
+                       constants.BREADBOARD, size, size, pitch, pin_order,
+                       pad_types[0])
+
+                for pad_type in pad_types:
+
+                    yield ("/".join((constants.PCB, name, pin_order,
+                                     pad_type)),
+                           constants.PCB, size, size, pitch, pin_order,
+                           pad_type)
+
+
+def time_case(factory, view, rows, columns, pitch, pin_order, pad_type,
+              options, repeat, seconds):
+
+    # Return the times (in seconds) of making view of the part, at least
+    # repeat of them and at least seconds in all, and its size in bytes.
+    # factory is the partsfactory module (passed in rather than imported as
+    # run as a script it is __main__.)
+
+    spec = (constants.MALE_HEADER, rows, columns, pitch, constants.THT,
+            pin_order, pad_type, constants.BRN)
+
+    names = factory.part_names(*spec, 1, "0" * 32)
+
+    times = []
+
+    while len(times) < repeat or sum(times) < seconds:
+
+        start = time.perf_counter()
+
+        filename, data = factory.render_file(names, spec, options, view)
+
+        times.append(time.perf_counter() - start)
+
+    return times, len(data)
+
+
+def suite_benchmark(factory, sizes, pitches, pad_types, pin_orders, options,
+                    repeat=3, progress=None):
+
+    # Time every case and return the results as a dict. options are the
+    # output settings as for render_file(), and progress (if it isn't None)
+    # is called with the name of each case as it is done.
+
+    cases = list(suite_cases(sizes, pitches, pad_types, pin_orders))
+
+    times = {case[0]: [] for case in cases}
+
+    file_sizes = {}
+
+    for run in range(CASE_ROUNDS):
+
+        for name, view, rows, columns, pitch, pin_order, pad_type in cases:
+
+            case_times, file_sizes[name] = time_case(
+                factory, view, rows, columns, pitch, pin_order, pad_type,
+                options, -(-repeat // CASE_ROUNDS), CASE_SECONDS / CASE_ROUNDS)
+
+            times[name].extend(case_times)
+
+            if progress is not None and run == CASE_ROUNDS - 1:
+
+                progress(name)
+
+    results = {}
+
+    for name, view, rows, columns, pitch, pin_order, pad_type in cases:
+
+        seconds = statistics.median(times[name])
+
+        pins = rows * columns
+
+        results[name] = {"seconds": round(seconds, 9), "pins": pins,
+                         "bytes": file_sizes[name], "runs": len(times[name]),
+                         "pins_per_s": round(pins / seconds, 1),
+                         "bytes_per_s": round(file_sizes[name] / seconds, 1)}
+
+    return {"benchmark": "suite",
+            "version": factory.version,
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "repeat": repeat,
+            "case_seconds": CASE_SECONDS,
+            "case_rounds": CASE_ROUNDS,
+            "options": options,
+            "cases": results}
+
+
+def compare_results(baseline, results, threshold, floor=0):
+
+    # Compare the suite results with the baseline and return a list of
+    # (name, baseline seconds, seconds, change) for the cases more than
+    # threshold (a fraction) and more than floor seconds slower, the worst
+    # first, and the names of the baseline's cases that are missing from
+    # results. The floor keeps the timer's noise on the smallest parts (a
+    # few microseconds, but a large fraction of them) from being reported.
+
+    regressions = []
+
+    missing = []
+
+    for name, case in baseline["cases"].items():
+
+        if name not in results["cases"]:
+
+            missing.append(name)
+
+            continue
+
+        seconds = results["cases"][name]["seconds"]
+
+        change = seconds / case["seconds"] - 1
+
+        if change > threshold and seconds - case["seconds"] > floor:
+
+            regressions.append((name, case["seconds"], seconds, change))
+
+    regressions.sort(key=lambda regression: regression[3], reverse=True)
+
+    return regressions, missing
+
+
+def read_results(filename):
+
+    # Read benchmark results written by write_results().
+
+    with open(filename, encoding="utf-8") as file:
+
+        return json.load(file)
+
+
+def write_results(results, output):
+
+    # Write results as JSON to the file output, or stdout if it is None.
+
+    text = json.dumps(results, indent=1, sort_keys=True) + "\n"
+
+    if output is None:
+
+        sys.stdout.write(text)
+
+    else:
+
+        with open(output, "w", encoding="utf-8") as file:
+
+            file.write(text)
+
+
+# Warning message
+
+if __name__ == "__main__":
+    print("This file only has the benchmarks.")
+    print("Please run 'partsfactory.py bench' instead")
+    sys.exit()
@@ -87,6 +87,105 @@ BREADBOARD = "breadboard"
 SCHEMATIC = "schematic"
 PCB = "pcb"
 
+# The views in the order they are created.
+
+VIEWS = (BREADBOARD, SCHEMATIC, PCB)
+
+# The names the command line accepts for the values above (without the
+# PITCH_ for the pitches.)
+
+PITCHES = {
+    "0_5MM": PITCH_0_5MM,
+    "1MM": PITCH_1MM,
+    "1_27MM": PITCH_1_27MM,
+    "2MM": PITCH_2MM,
+    "0_1IN": PITCH_0_1IN,
+    "0_11IN": PITCH_0_11IN,
+    "0_12IN": PITCH_0_12IN,
+    "0_13IN": PITCH_0_13IN,
+    "0_14IN": PITCH_0_14IN,
+    "0_15IN": PITCH_0_15IN,
+    "0_156IN": PITCH_0_156IN,
+    "0_16IN": PITCH_0_16IN,
+    "0_17IN": PITCH_0_17IN,
+    "0_18IN": PITCH_0_18IN,
+    "0_19IN": PITCH_0_19IN,
+    "0_2IN": PITCH_0_2IN,
+    "1IN": PITCH_1IN,
+}
+
+PART_TYPES = {"MALE_HEADER": MALE_HEADER, "FEMALE_HEADER": FEMALE_HEADER}
+
+PCB_TYPES = {"THT": THT, "SMD": SMD}
+
+PAD_TYPES = {
+    "RECTANGLE": RECTANGLE,
+    "CIRCLE": CIRCLE,
+    "OBLONG": OBLONG,
+    "OBLONG_SINGLE_ROW": OBLONG_SINGLE_ROW,
+    "OBLONG_BOT": OBLONG_BOT,
+    "OBLONG_MIDDLE": OBLONG_MIDDLE,
+    "OBLONG_TOP": OBLONG_TOP,
+}
+
+PIN_ORDERS = {"ROW": ROW, "COLUMN": COLUMN}
+
+COLORS = {"BRN": BRN, "RED": RED, "YEL": YEL, "GRN": GRN, "BLU": BLU}
+
+# The incremental rebuild manifest in the output directory and the version
+# of its layout.
+
+MANIFEST_FILE = "partsfactory.manifest.json"
+
+MANIFEST_FORMAT = 1
+
+# The sharded output layout (--shard): how many levels of two hex digit
+# directories the parts are spread over (256 ** SHARD_LEVELS directories),
+# and the index in the output directory of where each moduleid went.
+
+SHARD_LEVELS = 2
+
+INDEX_FILE = "partsfactory.index.json"
+
+INDEX_FORMAT = 1
+
+# The deterministic moduleid mode (--deterministic): the namespace hashed
+# with each spec unless another is given, and the time (in seconds since
+# 1970, as SOURCE_DATE_EPOCH is) the parts are dated if SOURCE_DATE_EPOCH
+# isn't set. 1980-01-01 as that is the earliest time a zip can hold.
+
+DETERMINISTIC_NAMESPACE = "python-fz-parts-factory"
+
+DETERMINISTIC_EPOCH = 315532800
+
+# The startup benchmark's (partsfactory.py bench startup) budgets for
+# importing partsfactory and for the first byte of a 1x1 part, as multiples
+# of how long a bare interpreter takes to start and exit on the same machine
+# (so they hold on a slower or faster one), and the modules that mustn't be
+# imported at startup at all. The budgets are a little over what they
+# measure (about 3.5 and 4.2 times) so a new heavy import fails them. The
+# modules are those only the optional modes use (--qt-uuid, --vectorize,
+# --async, serve, -j and --parallel-views, --bundle, --trace and
+# --memprofile) which are imported when they are asked for.
+
+IMPORT_BUDGET = 4.5
+
+FIRST_BYTE_BUDGET = 5.5
+
+STARTUP_FORBIDDEN = ("PySide6", "numpy", "asyncio", "http.server",
+                     "concurrent.futures", "inspect", "zipfile", "tracemalloc")
+
+# The benchmark suite's (partsfactory.py bench suite) default part sizes
+# (rows and columns, so 1x1 to 100x100) and how much slower a case has to be
+# than the baseline for bench compare to call it a regression, both as a
+# fraction and in seconds.
+
+BENCH_SIZES = (1, 2, 5, 10, 25, 50, 100)
+
+REGRESSION_THRESHOLD = 0.1
+
+REGRESSION_FLOOR = 0.0001
+
 # Warning message
 
 if __name__ == "__main__":
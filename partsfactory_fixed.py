@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+## Integer fixed-point coordinate core for the parts factory.
+
+# Coordinates are calculated with integers rather than floats so the result
+# (and therefore the text in the svg) is the same on every platform, and
+# converted to text with a table of precomputed digits rather than round()
+# and str(float). A coordinate is an integer number of units of 1/10000 of a
+# thou (the 4 digits after the decimal point the old float code rounded to.)
+
+import sys
+import partsfactory_constants as constants
+
+# Coordinate units per thou (and the number of digits after the decimal
+# point that is.)
+
+UNITS = 10000
+
+DIGITS = 4
+
+# The parameters (parm, pitch and stroke_width) are converted to integers in
+# 1/1000000 which is exact for every value we use, so (parm * pitch) is in
+# 1/10^12 and needs dividing by ROUNDING to get to units.
+
+FIXED_SCALE = 1000000
+
+ROUNDING = FIXED_SCALE * FIXED_SCALE // UNITS
+
+# PITCH_IN_THOU (19.6850) in 1/FIXED_SCALE and half a unit in 1/10^12.
+
+THOU_FIXED = round(constants.PITCH_IN_THOU * FIXED_SCALE)
+
+HALF = ROUNDING // 2
+
+# The text for every possible 4 digits after the decimal point, without
+# trailing zeros (but with a single 0 if there is nothing else) so 35.4 is
+# "35.4" and 35 is "35.0" the same as str(float) would make them.
+
+FRACTIONS = tuple(("." + "{0:04d}".format(fraction)).rstrip("0")
+                  if fraction else ".0" for fraction in range(UNITS))
+
+# The same without the ".0" for whole numbers, for the reduced precisions
+# (where saving the bytes is the point.)
+
+TRIMMED = ("",) + FRACTIONS[1:]
+
+# The size of a unit at each precision (digits after the decimal point.)
+
+STEPS = tuple(10 ** (DIGITS - precision) for precision in range(DIGITS + 1))
+
+
+def fixed(value):
+
+    # Convert a parameter to an integer in 1/FIXED_SCALE.
+
+    return round(value * FIXED_SCALE)
+
+
+def round_units(value):
+
+    # Round a value in 1/10^12 to the nearest unit, halves to even (the same
+    # as round() would.) Adding half a unit and rounding down (// and divmod()
+    # round towards minus infinity, even for negative values) rounds halves
+    # up, so if that was a half and the answer is odd take the 1 back off.
+
+    units, remainder = divmod(value + HALF, ROUNDING)
+
+    if remainder == 0 and units & 1:
+
+        units -= 1
+
+    return units
+
+
+def round_step(value, step):
+
+    # Round a value in 1/10^12 to the nearest multiple of step units, halves
+    # to even as round_units() does (which is round_step(value, 1).) Rounding
+    # once here rather than rounding the units again avoids double rounding.
+
+    steps, remainder = divmod(value + HALF * step, ROUNDING * step)
+
+    if remainder == 0 and steps & 1:
+
+        steps -= 1
+
+    return steps * step
+
+
+def coordinate(parm, pitch, k, stroke_width=0, step=1):
+
+    # Return parm scaled by the pitch, moved by k pitches and with
+    # stroke_width added, in units (rounded to a multiple of step units.)
+    # This is the integer equivalent of
+    # (parm * pitch) + (pitch * PITCH_IN_THOU * k) + stroke_width.
+
+    value = (round(pitch * FIXED_SCALE)
+             * (round(parm * FIXED_SCALE) + THOU_FIXED * k))
+
+    if stroke_width:
+
+        value += round(stroke_width * FIXED_SCALE) * FIXED_SCALE
+
+    if step != 1:
+
+        return round_step(value, step)
+
+    return round_units(value)
+
+
+def format_units(units, fractions=FRACTIONS):
+
+    # Convert a coordinate in units to text.
+
+    if units < 0:
+
+        whole, fraction = divmod(-units, UNITS)
+
+        return "-" + str(whole) + fractions[fraction]
+
+    whole, fraction = divmod(units, UNITS)
+
+    return str(whole) + fractions[fraction]
+
+
+def value_text(value, precision=DIGITS, shift=0):
+
+    # Return value (a float in thou, or with shift 3 in inches) as text with
+    # precision digits after the decimal point of a thou (so precision + 3
+    # for inches) and the trailing zeros (and a "." with nothing after it)
+    # dropped, the same as text() makes the reduced precision coordinates.
+    # For the sizes worked out in floats rather than from parameters.
+
+    scale = 10 ** shift
+
+    units = round_step(fixed(value * scale) * FIXED_SCALE, STEPS[precision])
+
+    whole, fraction = divmod(abs(units), UNITS * scale)
+
+    fraction = "{0:0{1:d}d}".format(fraction, DIGITS + shift).rstrip("0")
+
+    return (("-" if units < 0 else "") + str(whole)
+            + ("." + fraction if fraction else ""))
+
+
+def text(parm, pitch, k, stroke_width=0, precision=DIGITS):
+
+    # Return the coordinate() as text with precision (0 to DIGITS) digits
+    # after the decimal point. At full precision the text is exactly what
+    # the float code made, at the reduced precisions trailing zeros (and a
+    # ".0") are dropped.
+
+    if precision == DIGITS:
+
+        return format_units(coordinate(parm, pitch, k, stroke_width))
+
+    return format_units(coordinate(parm, pitch, k, stroke_width,
+                                   STEPS[precision]), TRIMMED)
+
+
+# Warning message
+
+if __name__ == "__main__":
+    print("This file only has the fixed-point coordinate core.")
+    print("Please run 'partsfactory.py' instead")
+    sys.exit()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+## Pure Python MD4 for the parts factory.
+
+# Fritzing makes the uuid in a moduleid (TextUtils::getRandText()) by hashing
+# the text of a new QUuid with MD4. hashlib only has MD4 if the OpenSSL it
+# was built with still does (OpenSSL 3 moved it to the legacy provider) so
+# rather than depend on that (or on Qt's QCryptographicHash) this is MD4 as
+# RFC 1320 describes it. It is only ever used on a few dozen bytes per part
+# so the speed of pure Python doesn't matter.
+
+import struct
+import sys
+
+MASK = 0xffffffff
+
+# The initial state (A, B, C, D).
+
+INITIAL = (0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476)
+
+# The order the words of a block are used in and the shifts for each of the
+# three rounds.
+
+ORDER = (tuple(range(16)),
+         (0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15),
+         (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15))
+
+SHIFTS = ((3, 7, 11, 19), (3, 5, 9, 13), (3, 9, 11, 15))
+
+# The constant added in each round.
+
+ADD = (0, 0x5a827999, 0x6ed9eba1)
+
+
+def rotate(value, shift):
+
+    # Rotate a 32 bit value left by shift bits.
+
+    return ((value << shift) | (value >> (32 - shift))) & MASK
+
+
+def round_function(round, b, c, d):
+
+    # F, G or H of RFC 1320 for round 0, 1 or 2.
+
+    if round == 0:
+
+        return (b & c) | (~b & d)
+
+    if round == 1:
+
+        return (b & c) | (b & d) | (c & d)
+
+    return b ^ c ^ d
+
+
+def md4(data):
+
+    # Return the MD4 digest (16 bytes) of data (bytes).
+
+    # Pad to 56 bytes mod 64 with a 1 bit then 0s, then add the length in
+    # bits as a 64 bit little endian number.
+
+    length = (len(data) * 8) & 0xffffffffffffffff
+
+    data = bytes(data) + b"\x80" + b"\x00" * ((55 - len(data)) % 64)
+
+    data += struct.pack("<Q", length)
+
+    state = list(INITIAL)
+
+    for start in range(0, len(data), 64):
+
+        words = struct.unpack("<16I", data[start:start + 64])
+
+        a, b, c, d = state
+
+        for round in range(3):
+
+            for step, index in enumerate(ORDER[round]):
+
+                a = rotate((a + round_function(round, b, c, d) + words[index]
+                            + ADD[round]) & MASK, SHIFTS[round][step % 4])
+
+                a, b, c, d = d, a, b, c
+
+        state = [(old + new) & MASK
+                 for old, new in zip(state, (a, b, c, d))]
+
+    return struct.pack("<4I", *state)
+
+
+def hexdigest(data):
+
+    # Return the MD4 digest of data as 32 lower case hex digits, as
+    # QCryptographicHash(...).toHex() does.
+
+    return md4(data).hex()
+
+
+# Warning message
+
+if __name__ == "__main__":
+    print("This file only has the MD4 hash for the moduleid uuids.")
+    print("Please run 'partsfactory.py' instead")
+    sys.exit()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+## Vectorized coordinate engine for the parts factory.
+
+# Every coordinate in a part is of the form
+#
+#     (parm * pitch) + (pitch * PITCH_IN_THOU * k) + stroke_width
+#
+# where k is the (zero based) row or column the pin is in. s_x() and s_y()
+# use k = row - 1 (or column - 1) and s_r_y() uses k = columns - column, so
+# one table of values per (parm, pitch, stroke_width) covers all three.
+# Rather than work out each value with a scalar call, work out the whole
+# table at once as a numpy array and format it in one go. The emitters still
+# ask for one coordinate at a time, but after the first request for a
+# parameter the answer is an index into an already formatted table. The
+# arithmetic is the same integer fixed-point arithmetic as partsfactory_fixed
+# so the text is identical to the scalar code.
+
+import sys
+import partsfactory_fixed as fixed
+
+# numpy is optional, only this engine needs it.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The digits after the decimal point as an array to index with the fractions.
+
+if numpy is not None:
+    FRACTIONS = numpy.array(fixed.FRACTIONS)
+    TRIMMED = numpy.array(fixed.TRIMMED)
+
+# Largest value int64 arithmetic can safely hold, beyond it use Python ints.
+
+INT64_LIMIT = 2 ** 62
+
+
+def round_units(values, step=1):
+
+    # The vectorized equivalent of fixed.round_step() (and so with a step of
+    # 1 fixed.round_units()), numpy's // and % also round towards minus
+    # infinity (and unlike divmod() work for the Python int arrays too.)
+
+    steps = (values + fixed.HALF * step) // (fixed.ROUNDING * step)
+
+    remainder = (values + fixed.HALF * step) % (fixed.ROUNDING * step)
+
+    return (steps - ((remainder == 0) & (steps % 2 == 1))) * step
+
+
+def format_coords(units, fractions=None):
+
+    # The vectorized equivalent of fixed.format_units(), looking the digits
+    # after the decimal point up in the same table.
+
+    magnitude = numpy.abs(units)
+
+    whole = magnitude // fixed.UNITS
+
+    fraction = magnitude % fixed.UNITS
+
+    text = numpy.char.add(numpy.where(units < 0, "-", ""),
+                          whole.astype(str))
+
+    if fractions is None:
+
+        fractions = FRACTIONS
+
+    text = numpy.char.add(text, fractions[fraction.astype(int)])
+
+    return text.tolist()
+
+
+class CoordinateGrid:
+
+    # Formatted coordinate tables for one svg, indexed by k as above.
+
+    def __init__(self, extent=1, precision=fixed.DIGITS):
+
+        if numpy is None:
+
+            raise ImportError("The vectorized engine needs numpy")
+
+        # Make the tables at least extent entries long to start with, so
+        # that the usual part doesn't need them to grow.
+
+        self.extent = max(extent, 1)
+
+        # The rounding and digits for precision as in fixed.text().
+
+        self.step = fixed.STEPS[precision]
+
+        self.fractions = FRACTIONS if precision == fixed.DIGITS else TRIMMED
+
+        self.tables = {}
+
+    def values(self, parm, pitch, stroke_width, k):
+
+        # The coordinates (in 1/10^12, before rounding) for the k values
+        # in the array k.
+
+        fixed_pitch = fixed.fixed(pitch)
+
+        start = (fixed.fixed(parm) * fixed_pitch
+                 + fixed.fixed(stroke_width) * fixed.FIXED_SCALE)
+
+        step = fixed_pitch * fixed.THOU_FIXED
+
+        if abs(start) + abs(step) * int(numpy.abs(k).max()) >= INT64_LIMIT:
+
+            # Too big for int64, so use (slower) Python ints.
+
+            k = k.astype(object)
+
+        return start + step * k
+
+    def table(self, parm, pitch, stroke_width, k):
+
+        # Return the formatted table for this parameter, (re)calculating it
+        # if it doesn't exist yet or isn't long enough to reach k.
+
+        key = (parm, pitch, stroke_width)
+
+        table = self.tables.get(key)
+
+        if table is None or k >= len(table):
+
+            self.extent = max(self.extent, k + 1, 2 * len(table or ()))
+
+            table = format_coords(round_units(self.values(
+                        parm, pitch, stroke_width,
+                        numpy.arange(self.extent, dtype=numpy.int64)),
+                        self.step), self.fractions)
+
+            self.tables[key] = table
+
+        return table
+
+    def s_x(self, parm, row, pitch, stroke_width=0):
+
+        # The vectorized equivalent of s_x().
+
+        if row < 1:
+
+            # Can't index the table with a negative k so fall back to a
+            # table of one.
+
+            return format_coords(round_units(self.values(
+                        parm, pitch, stroke_width,
+                        numpy.array([row - 1], dtype=numpy.int64)),
+                        self.step), self.fractions)[0]
+
+        return self.table(parm, pitch, stroke_width, row - 1)[row - 1]
+
+    def s_y(self, parm, column, pitch):
+
+        # The vectorized equivalent of s_y() (which is s_x() without a
+        # stroke_width.)
+
+        return self.s_x(parm, column, pitch)
+
+    def s_r_y(self, parm, columns, column, pitch):
+
+        # The vectorized equivalent of s_r_y().
+
+        return self.s_x(parm, columns - column + 1, pitch)
+
+
+# Warning message
+
+if __name__ == "__main__":
+    print("This file only has the vectorized coordinate engine.")
+    print("Please run 'partsfactory.py' instead")
+    sys.exit()
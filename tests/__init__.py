@@ -0,0 +1,8 @@
+## Tests for the parts factory.
+
+# Run them from the top of the repository with
+#
+#     python -m unittest
+#
+# (or python -m pytest.) They check that the faster ways of making a part
+# make exactly the same bytes as the plain ones they replaced.
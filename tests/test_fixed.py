@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+## The fixed-point coordinate core against the float code it replaced.
+
+import decimal
+import unittest
+from unittest import mock
+
+import partsfactory
+import partsfactory_constants as constants
+import partsfactory_fixed as fixed
+
+# The uuid the parts are named with, so two renders can be compared.
+
+UUID = "0" * 32
+
+# The output settings for render_file().
+
+OPTIONS = {"compresslevel": None, "compact": False,
+           "precision": fixed.DIGITS, "vectorize": False, "instance": False,
+           "merge": False}
+
+
+def float_text(parm, pitch, k, stroke_width=0, precision=fixed.DIGITS):
+
+    # The text s_x(), s_y() and s_r_y() made for a coordinate before the
+    # fixed-point core, which was only ever at full precision.
+
+    offset = pitch * constants.PITCH_IN_THOU * k
+
+    return str(round((parm * pitch) + offset + stroke_width, 4))
+
+
+def render(spec, **settings):
+
+    # Return the [(file name, bytes)] of the fzp and svgs of spec.
+
+    options = dict(OPTIONS, **settings)
+
+    names = partsfactory.prepare_part(spec, UUID)
+
+    return [partsfactory.render_file(names, spec, options, view)
+            for view in partsfactory.PART_VIEWS]
+
+
+def part_specs():
+
+    # A spread of parts over every pitch, the pad types that can be made
+    # and both pin orders.
+
+    for pitch in constants.PITCHES.values():
+
+        for rows, columns in ((1, 1), (3, 2), (2, 5)):
+
+            for pad_type in (constants.CIRCLE, constants.OBLONG):
+
+                for pin_order in (constants.ROW, constants.COLUMN):
+
+                    yield (constants.MALE_HEADER, rows, columns, pitch,
+                           constants.THT, pin_order, pad_type,
+                           constants.COLORS["BRN"])
+
+
+class FixedTextTest(unittest.TestCase):
+
+    def setUp(self):
+
+        # The templates cache the coordinates' text, so start (and finish)
+        # without any made by the other implementation.
+
+        partsfactory.clear_template_cache()
+
+        self.addCleanup(partsfactory.clear_template_cache)
+
+    def test_coordinates_match_float(self):
+
+        parms = [value / 8 for value in range(-80, 400)]
+
+        for pitch in constants.PITCHES.values():
+
+            for parm in parms:
+
+                for k in range(0, 41, 4):
+
+                    self.assertEqual(fixed.text(parm, pitch, k),
+                                     float_text(parm, pitch, k),
+                                     (parm, pitch, k))
+
+    def test_parts_match_float(self):
+
+        for spec in part_specs():
+
+            made = render(spec)
+
+            with mock.patch.object(fixed, "text", float_text):
+
+                partsfactory.clear_template_cache()
+
+                expected = render(spec)
+
+            partsfactory.clear_template_cache()
+
+            self.assertEqual(made, expected, spec)
+
+    def test_reduced_precision_rounds_the_exact_value(self):
+
+        # Each coordinate at a lower precision is its exact value (from
+        # the parameters in 1/FIXED_SCALE) rounded once, halves to even,
+        # with the trailing zeros dropped.
+
+        for pitch in constants.PITCHES.values():
+
+            for parm in (0.5, 3.25, 14.0, 17.625, 43.1):
+
+                for k in range(0, 9, 2):
+
+                    exact = (decimal.Decimal(fixed.fixed(pitch))
+                             * (fixed.fixed(parm) + fixed.THOU_FIXED * k)
+                             / decimal.Decimal(fixed.FIXED_SCALE) ** 2)
+
+                    for precision in range(fixed.DIGITS):
+
+                        text = str(exact.quantize(
+                                   decimal.Decimal(1).scaleb(-precision),
+                                   decimal.ROUND_HALF_EVEN))
+
+                        if "." in text:
+
+                            text = text.rstrip("0").rstrip(".")
+
+                        self.assertEqual(
+                            fixed.text(parm, pitch, k, 0, precision), text,
+                            (parm, pitch, k, precision))
+
+
+class VectorizeTest(unittest.TestCase):
+
+    def setUp(self):
+
+        import partsfactory_numpy
+
+        if partsfactory_numpy.numpy is None:
+
+            self.skipTest("vectorize needs numpy")
+
+        partsfactory.clear_template_cache()
+
+        self.addCleanup(partsfactory.clear_template_cache)
+
+    def test_vectorized_parts_match_scalar(self):
+
+        for spec in part_specs():
+
+            for precision in (fixed.DIGITS, 1):
+
+                self.assertEqual(render(spec, vectorize=True,
+                                        precision=precision),
+                                 render(spec, precision=precision),
+                                 (spec, precision))
+
+
+if __name__ == "__main__":
+
+    unittest.main()
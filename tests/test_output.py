@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+
+## Writing parts: streamed files, deterministic rebuilds and the
+## incremental manifest.
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import partsfactory
+import partsfactory_constants as constants
+import partsfactory_fixed as fixed
+
+# partsfactory.py, run as the command line would be.
+
+PARTSFACTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "partsfactory.py")
+
+# The output settings main() starts with.
+
+OPTIONS = {"output_dir": ".", "fsync": False, "bundle": False,
+           "compresslevel": None, "compact": False,
+           "precision": fixed.DIGITS, "vectorize": False, "instance": False,
+           "merge": False, "shard": False, "parallel_views": False}
+
+# A small catalog for the command line, two colors so they are spliced.
+
+CATALOG = ["-r", "1,3", "-c", "1,2", "--pad", "CIRCLE,OBLONG",
+           "--color", "BRN,RED"]
+
+MANIFEST = "partsfactory.manifest.json"
+
+
+def spec(rows, columns, color="BRN"):
+
+    return (constants.MALE_HEADER, rows, columns, constants.PITCH_0_1IN,
+            constants.THT, constants.COLUMN, constants.OBLONG,
+            constants.COLORS[color])
+
+
+def run(output_dir, *args):
+
+    # Run partsfactory.py with args writing to output_dir.
+
+    subprocess.run([sys.executable, PARTSFACTORY, "--deterministic",
+                    "-o", output_dir] + list(args), check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def read_tree(directory, skip=()):
+
+    # Return {path relative to directory: contents} of every file in it but
+    # those named in skip.
+
+    files = {}
+
+    for root, dirs, names in os.walk(directory):
+
+        for name in names:
+
+            if name in skip:
+
+                continue
+
+            path = os.path.join(root, name)
+
+            with open(path, "rb") as file:
+
+                files[os.path.relpath(path, directory)] = file.read()
+
+    return files
+
+
+def file_stats(directory):
+
+    # Return {path: (inode, mtime)} of every file in directory (but the
+    # manifest and index), which an atomic_file() rewrite changes even if
+    # the contents are the same.
+
+    stats = {}
+
+    for root, dirs, names in os.walk(directory):
+
+        for name in names:
+
+            if name.endswith(".json"):
+
+                continue
+
+            status = os.stat(os.path.join(root, name))
+
+            stats[os.path.join(root, name)] = (status.st_ino,
+                                               status.st_mtime_ns)
+
+    return stats
+
+
+class OutputTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        partsfactory.set_uuid_source("deterministic")
+
+        self.addCleanup(partsfactory.set_uuid_source, "stdlib")
+
+    def output_dir(self, name):
+
+        return os.path.join(self.directory, name)
+
+
+class StreamTest(OutputTest):
+
+    def test_streamed_files_match_rendered_bytes(self):
+
+        for settings in ({}, {"compresslevel": 6}, {"compresslevel": 0},
+                         {"shard": True}, {"compact": True, "precision": 2}):
+
+            output_dir = self.output_dir(str(len(os.listdir(self.directory))))
+
+            options = dict(OPTIONS, output_dir=output_dir, **settings)
+
+            moduleid, files = partsfactory.render_part(spec(3, 2), options)
+
+            self.assertEqual(partsfactory.make_part(spec(3, 2), options),
+                             (moduleid, partsfactory.file_records(
+                                 files, partsfactory.shard_dir(moduleid)
+                                 if options["shard"] else "")), settings)
+
+            written = read_tree(output_dir)
+
+            self.assertEqual(sorted(written.values()),
+                             sorted(data for filename, data in files),
+                             settings)
+
+    def test_create_fzp_writes_the_rendered_fzp(self):
+
+        for compresslevel in (None, 9):
+
+            options = dict(OPTIONS, compresslevel=compresslevel)
+
+            moduleid, files = partsfactory.render_part(spec(2, 2), options)
+
+            self.assertEqual(partsfactory.create_fzp(
+                *spec(2, 2), 1, self.directory, compresslevel=compresslevel),
+                moduleid)
+
+            with open(os.path.join(self.directory, files[0][0]), "rb") as file:
+
+                self.assertEqual(file.read(), files[0][1])
+
+
+class DeterministicTest(OutputTest):
+
+    def test_generate_is_repeatable(self):
+
+        part = partsfactory.PartSpec(rows=3, columns=2)
+
+        first = partsfactory.generate(part, partsfactory.ALL_VIEWS)
+
+        self.assertEqual(partsfactory.generate(part, partsfactory.ALL_VIEWS),
+                         first)
+
+        partsfactory.set_uuid_source("deterministic", "another namespace")
+
+        self.assertNotEqual(partsfactory.generate(part).moduleid,
+                            first.moduleid)
+
+    def test_source_date_epoch(self):
+
+        part = partsfactory.PartSpec(rows=1, columns=1)
+
+        with mock.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000"}):
+
+            fzp = partsfactory.generate(part, ["fzp"]).views["fzp"]
+
+        self.assertIn(b"<date>Tue Nov 14 2023</date>", fzp)
+
+    def test_rebuilds_are_identical(self):
+
+        for mode in ([], ["--bundle", "-j", "2"], ["--compress", "6",
+                                                   "--async"],
+                     ["--shard", "--parallel-views"]):
+
+            first = self.output_dir("first")
+
+            second = self.output_dir("second")
+
+            run(first, *(CATALOG + mode))
+
+            run(second, *(CATALOG + mode))
+
+            self.assertEqual(read_tree(first), read_tree(second), mode)
+
+            self.assertTrue(read_tree(first), mode)
+
+            shutil.rmtree(first)
+
+            shutil.rmtree(second)
+
+
+class ManifestTest(OutputTest):
+
+    def manifest_files(self, output_dir):
+
+        # Return {path: (sha256, size)} of every file in the manifest.
+
+        path = os.path.join(output_dir, MANIFEST)
+
+        with open(path, encoding="utf-8") as file:
+
+            manifest = json.load(file)
+
+        return {path: (record["sha256"], record["size"])
+                for entry in manifest["parts"].values()
+                for path, record in entry["files"].items()}
+
+    def check_manifest(self, output_dir, mode):
+
+        # The manifest lists exactly the files written, with their hashes.
+
+        files = read_tree(output_dir, (MANIFEST, "partsfactory.index.json"))
+
+        self.assertEqual(self.manifest_files(output_dir),
+                         {path.replace(os.sep, "/"):
+                          (hashlib.sha256(data).hexdigest(), len(data))
+                          for path, data in files.items()}, mode)
+
+    def test_incremental_build(self):
+
+        for mode in ([], ["--compress", "6"], ["--shard"], ["--bundle"],
+                     ["--merge"], ["-j", "2"]):
+
+            incremental = self.output_dir("incremental")
+
+            full = self.output_dir("full")
+
+            # The same files as a full build, and the manifest agrees.
+
+            run(incremental, "--incremental", *(CATALOG + mode))
+
+            run(full, *(CATALOG + mode))
+
+            skip = (MANIFEST,)
+
+            self.assertEqual(read_tree(incremental, skip),
+                             read_tree(full, skip), mode)
+
+            self.check_manifest(incremental, mode)
+
+            # Nothing changed, so nothing is written again.
+
+            before = file_stats(incremental)
+
+            run(incremental, "--incremental", *(CATALOG + mode))
+
+            self.assertEqual(file_stats(incremental), before, mode)
+
+            # A color dropped from the catalog has its files removed.
+
+            shutil.rmtree(full)
+
+            catalog = CATALOG[:-1] + ["BRN"]
+
+            run(incremental, "--incremental", *(catalog + mode))
+
+            run(full, *(catalog + mode))
+
+            self.assertEqual(read_tree(incremental, skip),
+                             read_tree(full, skip), mode)
+
+            self.check_manifest(incremental, mode)
+
+            shutil.rmtree(incremental)
+
+            shutil.rmtree(full)
+
+    def test_changed_options_rebuild(self):
+
+        output_dir = self.output_dir("incremental")
+
+        full = self.output_dir("full")
+
+        run(output_dir, "--incremental", *CATALOG)
+
+        run(output_dir, "--incremental", "--compact", *CATALOG)
+
+        run(full, "--compact", *CATALOG)
+
+        self.assertEqual(read_tree(output_dir, (MANIFEST,)), read_tree(full))
+
+        self.check_manifest(output_dir, "--compact")
+
+
+if __name__ == "__main__":
+
+    unittest.main()
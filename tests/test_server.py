@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+## The status codes of the part server (partsfactory.py serve.)
+
+import http.client
+import http.server
+import json
+import threading
+import unittest
+from unittest import mock
+
+import partsfactory
+
+
+class Handler(partsfactory.PartRequestHandler,
+              http.server.BaseHTTPRequestHandler):
+
+    # The handler serve() makes, with a cache of its own.
+
+    cache = partsfactory.PartCache(16 * 1024 * 1024)
+
+
+class ServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0),
+                                                     Handler)
+
+        threading.Thread(target=cls.server.serve_forever,
+                         daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+
+        cls.server.shutdown()
+
+        cls.server.server_close()
+
+    def request(self, method, path, body=None, headers=None):
+
+        # Return the (status, headers, body) of a request.
+
+        connection = http.client.HTTPConnection(
+            *self.server.server_address, timeout=30)
+
+        try:
+
+            connection.request(method, path, body, headers or {})
+
+            response = connection.getresponse()
+
+            return response.status, dict(response.getheaders()), \
+                response.read()
+
+        finally:
+
+            connection.close()
+
+    def status(self, path, fields=None):
+
+        # The status of a GET of path, or a POST of fields as JSON to it.
+
+        if fields is None:
+
+            return self.request("GET", path)[0]
+
+        return self.request("POST", path, json.dumps(fields).encode())[0]
+
+    def test_part(self):
+
+        status, headers, body = self.request("GET", "/part?rows=2&view=fzp")
+
+        self.assertEqual(status, 200)
+
+        self.assertEqual(headers["Content-Type"], "application/xml")
+
+        self.assertTrue(body.startswith(b"<?xml"))
+
+        # The same part from the cache, and not at all if it hasn't changed.
+
+        self.assertEqual(self.request("GET", "/part?view=fzp&rows=2")[2],
+                         body)
+
+        self.assertEqual(self.request("GET", "/part?rows=2&view=fzp", None,
+                                      {"If-None-Match": headers["ETag"]})[0],
+                         304)
+
+        self.assertEqual(self.status("/part", {"rows": 2, "view": "fzp"}),
+                         200)
+
+    def test_bad_requests(self):
+
+        for path, fields in (("/part?rows=abc", None),
+                             ("/part?rows=2.7", None),
+                             ("/part?rows=0", None),
+                             ("/part?precision=9", None),
+                             ("/part?bogus=1", None),
+                             ("/part?view=gerber", None),
+                             ("/part?pcb=SMD", None),
+                             ("/part?pcb=SMD&pad=RECTANGLE", None),
+                             ("/part?part=FEMALE_HEADER", None),
+                             ("/part", {"rows": True}),
+                             ("/part", {"rows": 2.0}),
+                             ("/part", [1])):
+
+            self.assertEqual(self.status(path, fields), 400, (path, fields))
+
+        self.assertEqual(self.request("POST", "/part", b"{")[0], 400)
+
+        self.assertEqual(self.request("POST", "/part", b"{}",
+                                      {"Content-Length": "-1"})[0], 400)
+
+        self.assertEqual(self.request("POST", "/part", b"{}",
+                                      {"Content-Length": "x"})[0], 400)
+
+    def test_not_found(self):
+
+        self.assertEqual(self.status("/"), 404)
+
+        self.assertEqual(self.status("/parts?rows=2"), 404)
+
+        self.assertEqual(self.status("/parts", {}), 404)
+
+    def test_render_error(self):
+
+        def fail(spec, options):
+
+            raise RuntimeError("broken")
+
+        with mock.patch.object(partsfactory, "render_views", fail), \
+                self.assertLogs("partsfactory", "ERROR"):
+
+            self.assertEqual(self.status("/part?rows=7&columns=3"), 500)
+
+    def test_unmade_part(self):
+
+        with mock.patch.object(partsfactory, "render_views",
+                               return_value=None):
+
+            self.assertEqual(self.status("/part?rows=7&columns=4"), 501)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
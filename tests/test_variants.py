@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+## Merged paths and spliced color variants against the plain parts.
+
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import partsfactory
+import partsfactory_constants as constants
+import partsfactory_fixed as fixed
+
+# The output settings for render_part() and render_variants().
+
+OPTIONS = {"bundle": False, "compresslevel": None, "compact": False,
+           "precision": fixed.DIGITS, "vectorize": False, "instance": False,
+           "merge": False, "parallel_views": False}
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def spec(rows, columns, pad_type=constants.CIRCLE, pin_order=constants.ROW,
+         color="BRN", pitch=constants.PITCH_0_1IN):
+
+    return (constants.MALE_HEADER, rows, columns, pitch, constants.THT,
+            pin_order, pad_type, constants.COLORS[color])
+
+
+def render(part_spec, **settings):
+
+    # Return the {file name: bytes} of part_spec made in full.
+
+    moduleid, files = partsfactory.render_part(part_spec,
+                                               dict(OPTIONS, **settings))
+
+    return dict(files)
+
+
+def elements(data):
+
+    # Return the (ancestors, element) of every element of the svg data in
+    # document order, the ancestors as a tuple of their (tag, id).
+
+    found = []
+
+    def walk(element, ancestors):
+
+        found.append((ancestors, element))
+
+        for child in element:
+
+            walk(child, ancestors + ((element.tag, element.get("id")),))
+
+    walk(ElementTree.fromstring(data), ())
+
+    return found
+
+
+def path_key(ancestors, element):
+
+    # What coalesce_paths() merges paths by: their group and every
+    # attribute but the id and d.
+
+    return ancestors, tuple(sorted((name, value) for name, value
+                                   in element.attrib.items()
+                                   if name not in ("id", "d")))
+
+
+class MergeTest(unittest.TestCase):
+
+    def setUp(self):
+
+        partsfactory.set_uuid_source("deterministic")
+
+        self.addCleanup(partsfactory.set_uuid_source, "stdlib")
+
+    def test_merge_only_merges_paths(self):
+
+        for part_spec in (spec(1, 1), spec(4, 2), spec(3, 3, constants.OBLONG,
+                                                       constants.COLUMN)):
+
+            plain = render(part_spec)
+
+            merged = render(part_spec, merge=True)
+
+            self.assertEqual(list(plain), list(merged))
+
+            for filename in plain:
+
+                if not filename.startswith("svg."):
+
+                    # The fzp has no paths to merge.
+
+                    self.assertEqual(plain[filename], merged[filename])
+
+                    continue
+
+                self.check_merged(elements(plain[filename]),
+                                  elements(merged[filename]), filename)
+
+    def check_merged(self, plain, merged, filename):
+
+        # Everything but the paths (the connectors included) is the same,
+        # and the subpaths of the paths that were merged are the same, in
+        # the same order, with only their first move made absolute.
+
+        def others(found):
+
+            return [(ancestors, element.tag, element.attrib, element.text)
+                    for ancestors, element in found
+                    if element.tag != SVG + "path"]
+
+        self.assertEqual(others(plain), others(merged), filename)
+
+        def subpaths(found, absolute):
+
+            paths = {}
+
+            for ancestors, element in found:
+
+                if element.tag == SVG + "path":
+
+                    d = element.get("d")
+
+                    paths.setdefault(path_key(ancestors, element), []).append(
+                        partsfactory.absolute_path(d) if absolute else d)
+
+            return {key: " ".join(d) for key, d in paths.items()}
+
+        self.assertEqual(subpaths(plain, True), subpaths(merged, False),
+                         filename)
+
+        self.assertLessEqual(sum(element.tag == SVG + "path"
+                                 for ancestors, element in merged),
+                             sum(element.tag == SVG + "path"
+                                 for ancestors, element in plain))
+
+
+class ColorVariantTest(unittest.TestCase):
+
+    def setUp(self):
+
+        partsfactory.set_uuid_source("deterministic")
+
+        self.addCleanup(partsfactory.set_uuid_source, "stdlib")
+
+    def test_spliced_variants_match_full_renders(self):
+
+        for settings in ({}, {"compresslevel": 6}, {"bundle": True},
+                         {"compact": True, "precision": 1},
+                         {"instance": True}):
+
+            options = dict(OPTIONS, **settings)
+
+            for rows, columns, pad_type in ((1, 1, constants.CIRCLE),
+                                            (3, 2, constants.OBLONG)):
+
+                group = [spec(rows, columns, pad_type, color=color)
+                         for color in constants.COLORS]
+
+                self.assertTrue(partsfactory.splice_variants(group, options))
+
+                self.assertEqual(
+                    partsfactory.render_variants(group, options),
+                    [(part_spec, partsfactory.render_part(part_spec, options))
+                     for part_spec in group], (settings, rows, columns))
+
+    def test_merge_is_not_spliced(self):
+
+        group = [spec(2, 2, color=color) for color in ("BRN", "RED")]
+
+        self.assertFalse(partsfactory.splice_variants(
+            group, dict(OPTIONS, merge=True)))
+
+
+if __name__ == "__main__":
+
+    unittest.main()